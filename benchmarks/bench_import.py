@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+"""Times importing pvoutput in a fresh interpreter, and lists the HTTP libraries the import pulled in (there shouldn't be any).
+
+Run it with `python benchmarks/bench_import.py [runs]`, it defaults to 20 runs.
+"""
+
+import subprocess
+import sys
+import time
+
+MODULES = ["pvoutput", "pvoutput.asyncio", "pvoutput.multi", "pvoutput.asyncio.multi"]
+HEAVY = ["requests", "aiohttp", "httpx", "urllib3"]
+
+
+def best_time(code: str, runs: int) -> float:
+    """the quickest a fresh interpreter ran code, in seconds"""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """runs the benchmark"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    startup = best_time("pass", runs)
+    print(f"best of {runs}, less the {startup * 1000:.1f}ms the interpreter takes to start")
+    for module in MODULES:
+        code = f"import sys, {module}; print(' '.join(name for name in {HEAVY!r} if name in sys.modules))"
+        loaded = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.strip()
+        elapsed = best_time(f"import {module}", runs) - startup
+        print(f"{module:>24}: {elapsed * 1000:6.1f}ms, imported {loaded or 'no HTTP libraries'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""Compares parsing a big getstatus history response row by row into dicts, with parsing it into columns.
+
+Run it with `python benchmarks/bench_parse.py [rows]`, it defaults to 20,000 rows.
+"""
+
+from datetime import datetime, timedelta
+import sys
+import timeit
+from typing import Any, Dict, List, Tuple
+
+from pvoutput import utils
+from pvoutput.columnar import STATUS_LAYOUT, parse_status_columns
+
+
+def make_rows(count: int) -> List[str]:
+    """makes count rows of getstatus-style data, five minutes apart, with a few NaNs"""
+    start = datetime(2021, 1, 1)
+    rows = []
+    for index in range(count):
+        timestamp = start + timedelta(minutes=5 * index)
+        consumption = "NaN" if index % 7 == 0 else str(index % 3000)
+        rows.append(f"{timestamp:%Y%m%d},{timestamp:%H:%M},{index * 10},{index % 5000},{index * 3},{consumption},21.5,240.1,0.{index % 1000:03}")
+    return rows
+
+
+def strptime_rows(rows: List[str]) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """the row parser before parse_timestamp replaced strptime, for comparison"""
+    results = []
+    for row in rows:
+        d, t, v1, v2, v3, v4, v5, v6, normalised_output, *extras = row.split(",")  # pylint: disable=invalid-name
+        results.append(
+            (
+                {
+                    "d": d,
+                    "t": t,
+                    "timestamp": datetime.strptime(f"{d} {t}", "%Y%m%d %H:%M"),
+                    "v1": None if v1 == "NaN" else float(v1),
+                    "v2": None if v2 == "NaN" else float(v2),
+                    "v3": None if v3 == "NaN" else float(v3),
+                    "v4": None if v4 == "NaN" else float(v4),
+                    "v5": None if v5 == "NaN" else float(v5),
+                    "v6": None if v6 == "NaN" else float(v6),
+                    "normalised_output": float(normalised_output),
+                },
+                extras,
+            )
+        )
+    return results
+
+
+def main() -> None:
+    """runs the benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = make_rows(count)
+    body = ";".join(rows)
+
+    benchmarks = {
+        "strptime dicts": lambda: strptime_rows(rows),
+        "responsedata_to_response": lambda: [utils.responsedata_to_response(row.split(",")) for row in rows],
+        "parse_status_columns": lambda: parse_status_columns(body, STATUS_LAYOUT),
+        "parse_status_columns + dicts": lambda: list(parse_status_columns(body, STATUS_LAYOUT)),
+    }
+    print(f"parsing {count} rows, best of 5")
+    baseline = None
+    for name, func in benchmarks.items():
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        baseline = baseline or best
+        print(f"{name:>30}: {best * 1000:8.1f}ms  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+"""Times building requests with the sans-IO layer (validation included), and parsing responses, without any networking.
+
+Run it with `python benchmarks/bench_requests.py [calls]`, it defaults to 10,000 calls.
+"""
+
+from datetime import datetime, timedelta
+import sys
+import timeit
+
+from pvoutput import PVOutput
+from pvoutput.protocol import parse_getstatus, parse_getstatus_history_columns
+
+GETSTATUS = "20210101,12:00,12936,1476,11911,1051,0.111,21.5,240.1"
+
+
+def main() -> None:
+    """runs the benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    pvo = PVOutput(apikey="helloworld", systemid=1, donation_made=True)
+    now = datetime.now().replace(second=0, microsecond=0)
+    statuses = [{"d": f"{now - timedelta(minutes=5 * index):%Y%m%d}", "t": f"{now - timedelta(minutes=5 * index):%H:%M}", "v2": index} for index in range(100)]
+    payload = pvo.status_payload({"v2": 500, "v4": 450})
+    history = ";".join(f"{now:%Y%m%d},{now:%H:%M},{index},{index},{index},0.1,{index},{index},{index},NaN,21.5,240.1" for index in range(288))
+
+    benchmarks = {
+        "getstatus_request": lambda: pvo.getstatus_request(),  # pylint: disable=unnecessary-lambda
+        "addstatus_request": lambda: pvo.addstatus_request({"v2": 500, "v4": 450}),
+        "addstatus_request (prebuilt payload)": lambda: pvo.addstatus_request(payload),
+        "addstatuses_requests (x100)": lambda: pvo.addstatuses_requests(statuses),
+        "parse_getstatus": lambda: parse_getstatus(GETSTATUS),
+        "parse_getstatus_history_columns (x288)": lambda: parse_getstatus_history_columns(history),
+    }
+    print(f"{count} calls each, best of 5")
+    for name, func in benchmarks.items():
+        best = min(timeit.repeat(func, number=count, repeat=5))
+        print(f"{name:>40}: {best / count * 1_000_000:8.1f}us per call")
+
+
+if __name__ == "__main__":
+    main()
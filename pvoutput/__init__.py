@@ -1,28 +1,53 @@
 """Interface to the PVOutput API"""
 
 import datetime
-from typing import Any, Dict, Optional
-
-import requests
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union, cast
 
 from pvoutput.exceptions import UnknownMethodError
 
 from pvoutput.base import PVOutputBase
+from pvoutput.cache import ResponseCache
+from pvoutput.columnar import StatusColumns
+from pvoutput.protocol import (
+    BatchStatusResult,
+    Payload,
+    Request,
+    check_response,
+    parse_addbatchstatus,
+    parse_getstatus,
+    parse_getstatus_history_columns,
+    parse_getstatus_record,
+    parse_rate_limit,
+    rows_not_added,
+)
+from pvoutput.ratelimit import RateLimiter
+from pvoutput.retry import RetryPolicy
+from pvoutput.status import Status, StatusLike
+from pvoutput.transport import TRANSPORTS, httpx_client, requests_session
 from pvoutput.parameters import (
-    ADDBATCHSTATUS_PARAMETERS,
-    ADDSTATUS_PARAMETERS,
-    CALL_PARAMETERS,
+    CALL_SCHEMA,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
     DEFAULT_REQUEST_TIMEOUT,
-    ADDOUTPUT_PARAMETERS,
-    DELETE_NOTIFICATION_PARAMETERS,
-    DELETESTATUS_PARAMETERS,
-    REGISTER_NOTIFICATION_PARAMETERS,
+    STREAM_CHUNK_SIZE,
 )
 
 from . import utils
 
+if TYPE_CHECKING:  # pragma: no cover
+    import httpx
+    import requests
+    from urllib3.util import Retry
+
 __version__ = "0.0.8"
 
+T = TypeVar("T")
+
+# what the calls return, depending on the transport
+Response = Union["requests.Response", "httpx.Response"]
+
 
 class PVOutput(PVOutputBase):
     """This class provides an interface to the pvoutput.org API"""
@@ -34,7 +59,18 @@ class PVOutput(PVOutputBase):
         systemid: int,
         donation_made: bool = False,
         stats_period: int = 5,
-        session: Optional[requests.Session] = None,
+        session: Union["requests.Session", "httpx.Client", None] = None,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        max_retries: Union[int, "Retry"] = DEFAULT_MAX_RETRIES,
+        keep_alive: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        retry: Optional[RetryPolicy] = None,
+        clock: Optional[Callable[[], datetime.datetime]] = None,
+        base_url: str = utils.BASE_URL,
+        transport: str = "requests",
+        http2: bool = True,
     ):
         """Setup code
         :param apikey: API key (read or write)
@@ -43,25 +79,72 @@ class PVOutput(PVOutputBase):
         :type systemid: int
         :param donation_made: Whether to use the donation-required fields
         :type donation_made: bool
+        :param session: A session to make the calls with, if unset one is created. All calls go through this so connections are re-used.
+        :type session: requests.Session, or httpx.Client with the httpx transport
+        :param pool_connections: Number of connection pools to cache, only used when the session is created for you
+        :type pool_connections: int
+        :param pool_maxsize: Maximum number of connections to keep in each pool, only used when the session is created for you
+        :type pool_maxsize: int
+        :param max_retries: Retries for failed connections, or a urllib3 Retry object, only used when the session is created for you
+        :type max_retries: int or urllib3.util.Retry
+        :param keep_alive: Keep connections open between calls, if False sends "Connection: close"
+        :type keep_alive: bool
+        :param rate_limiter: If set, calls are delayed (or rejected) to stay inside the rate limit
+        :type rate_limiter: pvoutput.ratelimit.RateLimiter
+        :param cache: If set, getstatus and getstatus_history_columns responses are cached until the next stats_period
+        :type cache: pvoutput.cache.ResponseCache
+        :param retry: If set, failed calls which are safe to repeat are retried, see pvoutput.retry.RetryPolicy
+        :type retry: pvoutput.retry.RetryPolicy
+        :param clock: Returns the current local time, defaults to datetime.datetime.now, for testing
+        :type clock: callable
+        :param base_url: Where to send the calls, defaults to https://pvoutput.org/service/r2/
+        :type base_url: str
+        :param transport: The HTTP library to use, "requests" or "httpx", see pvoutput.transport
+        :type transport: str
+        :param http2: Use HTTP/2 if the server supports it, only used when the httpx client is created for you
+        :type http2: bool
         """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"transport should be one of {', '.join(TRANSPORTS)}, got {transport}")
         super().__init__(
             apikey=apikey,
             systemid=systemid,
             donation_made=donation_made,
             stats_period=stats_period,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            retry=retry,
+            clock=clock,
+            base_url=base_url,
         )
+        self.keep_alive = keep_alive
+        self.transport = transport
+        if session is None and transport == "httpx":
+            session = httpx_client(http2=http2, pool_maxsize=pool_maxsize, keep_alive=keep_alive)
+        elif session is None:
+            session = requests_session(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
         self.session = session
-        if session is None:
-            self.session = requests.Session()
+
+    def __enter__(self) -> "PVOutput":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the session, and any connections it's holding open."""
+        self.session.close()
 
     def _call(
         self,
         endpoint: str,
         method: str = "POST",
-        **kwargs: Dict[str, Any],
-    ) -> requests.Response:
+        **kwargs: Any,
+    ) -> Response:
         """Makes a call to a URL endpoint with the data/headers/method you require.
 
+        If there's a retry policy, failed calls are retried as it says.
+
         :param endpoint: The URL to call
         :type endpoint: str
 
@@ -74,41 +157,129 @@ class PVOutput(PVOutputBase):
         :param method: specify a method if you want to use something other than POST
         :type method: str
 
+        :param stream: don't read the body straight away, so it can be streamed with iter_content
+        :type stream: bool
+
         :returns: The response object
-        :rtype: requests.Response
+        :rtype: requests.Response or httpx.Response
 
         :raises TypeError: if the data you pass is of the wrong format.
-        :raises ValueError: if the call throws a HTTP 400 error.
+        :raises pvoutput.exceptions.PVOutputError: if PVOutput returns an error, the HTTP 400 ones are also ValueErrors.
         :raises requests.exception: if method throws an exception.
         """
 
-        self.validate_data(kwargs, CALL_PARAMETERS)
+        self.validate_data(kwargs, CALL_SCHEMA)
+        request = Request(
+            "",
+            method,
+            endpoint,
+            params=kwargs.get("params"),
+            data=kwargs.get("data"),
+            headers=kwargs.get("headers", self._headers()),
+            stream=bool(kwargs.get("stream", False)),
+        )
+        return self.send(request)
+
+    def send(self, request: Request) -> Response:
+        """Sends a request built by one of the `*_request` methods, retrying it if there's a retry policy.
 
-        if method == "GET":
-            response = requests.get(
-                endpoint,
-                data=kwargs.get("data"),
-                headers=kwargs.get("headers", self._headers()),
-                params=kwargs.get("params"),
-                timeout=DEFAULT_REQUEST_TIMEOUT,
-            )
-        elif method == "POST":
-            response = requests.post(
-                endpoint,
-                data=kwargs.get("data"),
-                headers=kwargs.get("headers", self._headers()),
-                timeout=DEFAULT_REQUEST_TIMEOUT,
-            )
-        else:
-            raise UnknownMethodError(f"unknown method {kwargs['method']}")
+        :returns: The response object
+        :rtype: requests.Response or httpx.Response
 
-        if response.status_code == 400:
-            # TODO: work out how to get the specific response and provide useful answers
-            raise ValueError(f"HTTP400: {response.text.strip()}")
-        # likely errors - https://pvoutput.org/help/api_specification.html#error-messages
+        :raises pvoutput.exceptions.PVOutputError: if PVOutput returns an error, the HTTP 400 ones are also ValueErrors.
+        :raises requests.exception: if method throws an exception.
+        """
+        if self.retry is None:
+            return self._send(request)
+
+        started = self.retry.clock()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._send(request)
+            except Exception as error:  # pylint: disable=broad-except
+                retry_delay = self.retry.delay(attempt, error, started, request.url, request.method, request.data)
+                if retry_delay is None:
+                    raise
+                time.sleep(retry_delay)
+
+    def _send(self, request: Request) -> Response:
+        """makes one attempt at sending a request, see send"""
+        delay = self._rate_limit_delay()
+        if delay > 0:
+            time.sleep(delay)
+
+        if request.method not in ("GET", "POST"):
+            raise UnknownMethodError(f"unknown method {request.method}")
+        response: Response
+        if self.transport == "httpx":
+            response = self._send_httpx(request)
+        else:
+            response = self._send_requests(request)
+
+        self._update_rate_limit(response)
+        if response.status_code >= 400:
+            try:
+                check_response(response.status_code, self._text(response), response.headers)
+            except Exception:
+                response.close()
+                raise
         response.raise_for_status()
+        if request.method == "POST":
+            # anything sent to PVOutput could change what the read calls return
+            self.invalidate_cache()
         return response
 
+    def _send_requests(self, request: Request) -> "requests.Response":
+        """sends a request with requests"""
+        session = cast("requests.Session", self.session)
+        headers = dict(request.headers)
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+        if request.method == "GET":
+            return session.get(
+                request.url,
+                data=request.data,
+                headers=headers,
+                params=request.params,
+                timeout=DEFAULT_REQUEST_TIMEOUT,
+                stream=request.stream,
+            )
+        return session.post(
+            request.url,
+            data=request.body,
+            headers=headers,
+            timeout=DEFAULT_REQUEST_TIMEOUT,
+        )
+
+    def _send_httpx(self, request: Request) -> "httpx.Response":
+        """sends a request with httpx, connections are kept open (or not) by the client's limits rather than a header"""
+        session = cast("httpx.Client", self.session)
+        built = session.build_request(
+            request.method,
+            request.url,
+            params=request.params,
+            content=request.body if request.method == "POST" else None,
+            headers=request.headers,
+            timeout=DEFAULT_REQUEST_TIMEOUT,
+        )
+        return session.send(built, stream=request.stream)
+
+    def _text(self, response: Response) -> str:
+        """the body of a response, reading it first if it's an httpx response that's being streamed"""
+        if self.transport == "httpx":
+            cast("httpx.Response", response).read()
+        return response.text
+
+    def _get_text(self, request: Request, use_cache: bool = True) -> str:
+        """makes a read call, returning the body, from the cache if it's there (and allowed), and caching it if not"""
+        text = self._cache_get(request.url, request.params or {}, use_cache)
+        if text is None:
+            text = self.send(request).text
+            self._cache_set(request.url, request.params or {}, text)
+        return text
+
     def check_rate_limit(self) -> Dict[str, str]:
         """Makes a call to the site, checking if you have hit the rate limit.
 
@@ -117,22 +288,17 @@ class PVOutput(PVOutputBase):
         :returns: the headers relating to the rate limit.
         :rtype: dict
         """
-        headers = self._headers()
-        headers["X-Rate-Limit"] = "1"
-
-        url, method = utils.URLS["getsystem"]
+        response = self.send(self.check_rate_limit_request())
+        return parse_rate_limit(response.headers)
 
-        response = self._call(endpoint=url, params={}, headers=headers, method=method)
-        retval = utils.get_rate_limit_header(response)
-        return retval
-
-    def addbatchstatus(self, data: str, c1: bool = False, n: bool = False) -> requests.Response:
+    def addbatchstatus(self, data: Union[str, Payload], c1: bool = False, n: bool = False) -> Response:
         """
         # Add Batch Status Service
 
         The Add Batch Status service adds up to 30 statuses in a single request.
         See the documentation on the page for what it means, and what it responds with.
-        This hasn't been tested.
+        If you've got a list of statuses rather than a pre-built data string, use addstatuses.
+        data can also be a Payload from batch_status_payload or batch_payloads, which is sent without being checked again.
         <https://pvoutput.org/help/api_specification.html#add-batch-status-service>
 
         ## Data Structure
@@ -156,64 +322,115 @@ class PVOutput(PVOutputBase):
         * Maximum power consumption v4 value increased to 2,000,000W
         * Increased batch status size to 100 from 30
         """
-        payload = {
-            "data": data,
-        }
-        if c1:
-            payload["c1"] = "1"
-        if n:
-            payload["n"] = "1"
-
-        url, method = utils.URLS["addbatchstatus"]
-        self.validate_data(payload, ADDBATCHSTATUS_PARAMETERS)
-        url, method = utils.URLS["addstatus"]
-        return self._call(endpoint=url, data=payload, method=method)
+        return self.send(self.addbatchstatus_request(data, c1=c1, n=n))
+
+    def addstatuses(self, statuses: Iterable[StatusLike], c1: bool = False, n: bool = False) -> List[Response]:
+        """Uploads any number of statuses using the Add Batch Status service.
+
+        Each status is validated like it would be for addstatus, then they're sent in batches of up to
+        30 statuses per request (100 if you've donated). Nothing is sent if any of the statuses are invalid.
+
+        API Spec: https://pvoutput.org/help/api_specification.html#add-batch-status-service
+
+        :param statuses: The statuses, as you'd pass to addstatus - only the d, t and v1-v12 fields are supported
+        :type statuses: iterable of dicts or pvoutput.status.Status
+
+        :param c1: Set the cumulative flag for the batch
+        :type c1: bool
+
+        :param n: Set the net flag for the batch
+        :type n: bool
+
+        :returns: The response objects, one per batch
+        :rtype: list of requests.Response or httpx.Response
+        """
+        return [self.send(request) for request in self.addstatuses_requests(statuses, c1=c1, n=n)]
+
+    def addstatuses_results(self, statuses: Iterable[StatusLike], c1: bool = False, n: bool = False, retries: int = 1) -> List[BatchStatusResult]:
+        """Uploads any number of statuses like addstatuses, returning what PVOutput did with each of them.
+
+        Statuses PVOutput says it didn't add are collected and sent again, in new batches of just those statuses, up to
+        retries times - one bad status doesn't mean resending the whole batch. See addbatchstatus_rows.
+
+        :raises pvoutput.exceptions.BatchValidationError: if any of the statuses are invalid, nothing's sent
+        """
+        return self.addbatchstatus_rows(self.prepare_batch_statuses(statuses, c1=c1), c1=c1, n=n, retries=retries)
+
+    def addbatchstatus_rows(self, rows: List[Dict[str, Any]], c1: bool = False, n: bool = False, retries: int = 1) -> List[BatchStatusResult]:
+        """Sends statuses which have already been through prepare_batch_status(es), in batches, without validating them again.
+
+        PVOutput responds to each batch with whether it added each status. The ones it didn't add are collected and
+        sent again, in new batches, up to retries times. pvoutput.protocol.rows_not_added gives you the statuses
+        which still weren't added.
+
+        :param rows: the validated statuses
+        :type rows: list of dicts
+        :param c1: set the cumulative flag for the batches, it should match what the statuses were prepared with
+        :type c1: bool
+        :param n: set the net flag for the batches
+        :type n: bool
+        :param retries: how many more times to send statuses PVOutput didn't add
+        :type retries: int
+
+        :returns: the last result PVOutput gave for each status, empty if its responses didn't include any
+        :rtype: list of pvoutput.protocol.BatchStatusResult
+
+        If a batch fails part way through, the error's raised with the results so far attached, see
+        pvoutput.protocol.batch_results.
+        """
+        results: Dict[Tuple[str, str], BatchStatusResult] = {}
+        try:
+            for _ in range(retries + 1):
+                not_added: List[Dict[str, Any]] = []
+                for batch in self._row_batches(rows):
+                    response = self.addbatchstatus(self.batch_payloads(batch, c1=c1, n=n)[0])
+                    batch_results = parse_addbatchstatus(self._text(response))
+                    results.update(((result.d, result.t), result) for result in batch_results)
+                    not_added.extend(rows_not_added(batch, batch_results))
+                rows = not_added
+                if not rows:
+                    break
+        except Exception as error:
+            # keep what PVOutput said about the statuses it's already had, see pvoutput.protocol.batch_results
+            error.batch_results = list(results.values())  # type: ignore[attr-defined]
+            raise
+        return list(results.values())
 
     def addstatus(
         self,
-        data: Dict[str, Any],
-    ) -> requests.Response:
+        data: Union[StatusLike, Payload],
+    ) -> Response:
         """The Add Status service accepts live output data
         at the Status Interval (5 to 15 minutes) configured for the system.
 
         API Spec: https://pvoutput.org/help/api_specification.html#add-status-service
 
         :param data: The status data
-        :type data: dict
+        :type data: dict, pvoutput.status.Status or pvoutput.protocol.Payload
 
         :returns: The response object
-        :rtype: requests.Response
+        :rtype: requests.Response or httpx.Response
         """
-        # if you don't set a time, set it to now
-        # can't push this through the validator as it relies on the class config
-        if "t" not in data:
-            data["t"] = self.get_time_by_base()
-        self.validate_data(data, ADDSTATUS_PARAMETERS)
-
-        url, method = utils.URLS["addstatus"]
-
-        return self._call(endpoint=url, data=data, method=method)
+        return self.send(self.addstatus_request(data))
 
     def addoutput(
         self,
-        data: Dict[str, Any],
-    ) -> requests.Response:
+        data: Union[Dict[str, Any], Payload],
+    ) -> Response:
         """The Add Output service uploads end of day output information.
         It allows all of the information provided on the Add Output page to be uploaded.
 
         API Spec: https://pvoutput.org/help/api_specification.html#add-output-service
 
         :param data: The output data to upload
-        :type data: dict
+        :type data: dict or pvoutput.protocol.Payload
 
         :returns: The response object
-        :rtype: requests.Response
+        :rtype: requests.Response or httpx.Response
         """
-        self.validate_data(data, ADDOUTPUT_PARAMETERS)
-        url, method = utils.URLS["addoutput"]
-        return self._call(endpoint=url, data=data, method=method)
+        return self.send(self.addoutput_request(data))
 
-    def delete_status(self, date_val: datetime.date, time_val: Optional[datetime.time] = None) -> requests.Response:
+    def delete_status(self, date_val: datetime.date, time_val: Optional[datetime.time] = None) -> Response:
         """
         Deletes a given status, based on the provided parameters
         needs a datetime() object
@@ -228,51 +445,129 @@ class PVOutput(PVOutputBase):
         :type time_val: datetime.datetime.time
 
         :returns: The response object
-        :rtype: requests.Response
+        :rtype: requests.Response or httpx.Response
         """
-        self.validate_data(
-            {
-                "date_val": date_val,
-                "time_val": time_val,
-            },
-            DELETESTATUS_PARAMETERS,
-        )
-
-        data = {"d": date_val.strftime("%Y%m%d")}
-        if time_val is not None:
-            data["t"] = time_val.strftime("%H:%M")
-
-        url, method = utils.URLS["deletestatus"]
-
-        return self._call(endpoint=url, data=data, method=method)
+        return self.send(self.delete_status_request(date_val, time_val))
 
-    def getstatus(self) -> Dict[str, Any]:
+    def getstatus(self, use_cache: bool = True) -> Dict[str, Any]:
         """The Get Status service retrieves system status information and live output data.
 
         API spec: https://pvoutput.org/help/api_specification.html#get-status-service
 
+        :param use_cache: if False, skip the cache (if there is one) and fetch a fresh status, which is then cached
+        :type use_cache: bool
+
         :returns: the last updated data
         :rtype: dict
         """
-        # TODO: extend this, you can do history searches and all sorts with this endpoint
-
-        params = {}
-        if self.donation_made:
-            params["ext"] = 1
-            params["sid"] = self.systemid
-        url, method = utils.URLS["getstatus"]
-        response = self._call(endpoint=url, params=params, method=method)
-        response.raise_for_status()
-        # grab all the things
-        responsedata, extras = utils.responsedata_to_response(response.text.split(","))
+        # for history searches, see getstatus_history
+        return parse_getstatus(self._get_text(self.getstatus_request(), use_cache))
+
+    def getstatus_record(self, use_cache: bool = True) -> Status:
+        """The same as getstatus, but returns a pvoutput.status.Status rather than a dict.
 
-        # if we're fancy, we get more data
-        if extras:
-            for i in range(1, 7):
-                responsedata[f"v{i + 6}"] = None if extras[i - 1] == "NaN" else float(extras[i - 1])
-        return responsedata
+        :param use_cache: if False, skip the cache (if there is one) and fetch a fresh status, which is then cached
+        :type use_cache: bool
+
+        :returns: the last updated data
+        :rtype: pvoutput.status.Status
+        """
+        return parse_getstatus_record(self._get_text(self.getstatus_request(), use_cache))
 
-    def register_notification(self, appid: str, url: str, alerttype: int) -> requests.Response:
+    # pylint: disable=too-many-arguments
+    def getstatus_history(
+        self,
+        date_val: Optional[datetime.date] = None,
+        from_time: Optional[datetime.time] = None,
+        to_time: Optional[datetime.time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """The Get Status service in history mode, which retrieves a day's statuses.
+
+        The rows are parsed as the response streams in, so a whole day of data is never held in memory.
+        Each row is a dict with the same keys as getstatus, plus energy_efficiency and average_power.
+
+        API spec: https://pvoutput.org/help/api_specification.html#get-status-service
+
+        `for status in pvo.getstatus_history(limit=288, ascending=True): ...`
+
+        :param date_val: The date to get the statuses for, defaults to today
+        :type date_val: datetime.date
+
+        :param from_time: The earliest time to get
+        :type from_time: datetime.time
+
+        :param to_time: The latest time to get
+        :type to_time: datetime.time
+
+        :param limit: The most statuses to get, up to 288
+        :type limit: int
+
+        :param ascending: Return the oldest status first, otherwise the newest is first
+        :type ascending: bool
+
+        :returns: the statuses
+        :rtype: iterator of dicts
+        """
+        request = self.getstatus_history_request(date_val, from_time, to_time, limit, ascending, stream=True)
+        return self._iter_getstatus_history(request, utils.history_row_to_response)
+
+    # pylint: disable=too-many-arguments
+    def getstatus_history_records(
+        self,
+        date_val: Optional[datetime.date] = None,
+        from_time: Optional[datetime.time] = None,
+        to_time: Optional[datetime.time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+    ) -> Iterator[Status]:
+        """The same as getstatus_history, but each row is a pvoutput.status.Status rather than a dict,
+        which takes less than half the memory if you're keeping them.
+
+        See getstatus_history for the parameters.
+
+        :returns: the statuses
+        :rtype: iterator of pvoutput.status.Status
+        """
+        request = self.getstatus_history_request(date_val, from_time, to_time, limit, ascending, stream=True)
+        return self._iter_getstatus_history(request, utils.history_row_to_status)
+
+    def _iter_getstatus_history(self, request: Request, parse_row: Callable[[List[str]], T]) -> Iterator[T]:
+        """makes the getstatus history call, and parses the rows as they arrive"""
+        response = self.send(request)
+        try:
+            if self.transport == "httpx":
+                chunks = cast("httpx.Response", response).iter_bytes(chunk_size=STREAM_CHUNK_SIZE)
+            else:
+                chunks = cast("requests.Response", response).iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            for row in utils.iter_delimited(chunks, encoding=response.encoding or "utf-8"):
+                yield parse_row(row.split(","))
+        finally:
+            response.close()
+
+    # pylint: disable=too-many-arguments
+    def getstatus_history_columns(
+        self,
+        date_val: Optional[datetime.date] = None,
+        from_time: Optional[datetime.time] = None,
+        to_time: Optional[datetime.time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+        use_cache: bool = True,
+    ) -> StatusColumns:
+        """The same as getstatus_history, but the statuses are parsed into columns (one array per field) rather than dicts,
+        which is much faster when you're processing a lot of history.
+
+        See getstatus_history for the parameters, and getstatus for use_cache.
+
+        :returns: the statuses
+        :rtype: pvoutput.columnar.StatusColumns
+        """
+        request = self.getstatus_history_request(date_val, from_time, to_time, limit, ascending)
+        return parse_getstatus_history_columns(self._get_text(request, use_cache))
+
+    def register_notification(self, appid: str, url: str, alerttype: int) -> Response:
         """The Register Notification Service allows a third party application
         to receive PVOutput alert callbacks via a HTTP end point.
 
@@ -290,7 +585,7 @@ class PVOutput(PVOutputBase):
         :type alerttype: int
 
         :return: The response object
-        :rtype: requests.Response
+        :rtype: requests.Response or httpx.Response
 
         Alert Type list:
 
@@ -317,20 +612,9 @@ class PVOutput(PVOutputBase):
         =====   ====
         """
 
-        self.validate_data(
-            {
-                "appid": appid,
-                "url": url,
-                "alerttype": alerttype,
-            },
-            REGISTER_NOTIFICATION_PARAMETERS,
-        )
-
-        call_url, method = utils.URLS["registernotification"]
-        params = {"appid": appid, "type": alerttype, "url": url}
-        return self._call(endpoint=call_url, params=params, method=method)
+        return self.send(self.register_notification_request(appid, url, alerttype))
 
-    def deregister_notification(self, appid: str, alerttype: int) -> requests.Response:
+    def deregister_notification(self, appid: str, alerttype: int) -> Response:
         """The Deregister Notification Service removes registered notifications under an application id for a system.
 
         API spec: https://pvoutput.org/help/api_specification.html#deregister-notification-service
@@ -344,7 +628,7 @@ class PVOutput(PVOutputBase):
         :type alerttype: int
 
         :return: The response object
-        :rtype: requests.Response
+        :rtype: requests.Response or httpx.Response
 
         Alert Type list:
 
@@ -371,14 +655,4 @@ class PVOutput(PVOutputBase):
         =====   ====
         """
 
-        self.validate_data(
-            {
-                "appid": appid,
-                "alerttype": alerttype,
-            },
-            DELETE_NOTIFICATION_PARAMETERS,
-        )
-
-        url, method = utils.URLS["deregisternotification"]
-        params = {"appid": appid, "type": alerttype}
-        return self._call(endpoint=url, params=params, method=method)
+        return self.send(self.deregister_notification_request(appid, alerttype))
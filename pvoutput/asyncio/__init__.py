@@ -1,24 +1,46 @@
 """AsyncIO interface to the PVOutput API"""
 
+import asyncio
 import datetime
-from typing import Any, Dict, Optional
-
-import aiohttp
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, Union, cast
 
 from pvoutput.exceptions import UnknownMethodError
 from pvoutput.base import PVOutputBase
+from pvoutput.cache import ResponseCache
+from pvoutput.columnar import StatusColumns
+from pvoutput.protocol import (
+    BatchStatusResult,
+    Payload,
+    Request,
+    check_response,
+    parse_addbatchstatus,
+    parse_getstatus,
+    parse_getstatus_history_columns,
+    parse_getstatus_record,
+    parse_rate_limit,
+    rows_not_added,
+)
+from pvoutput.ratelimit import RateLimiter
+from pvoutput.retry import RetryPolicy
+from pvoutput.status import Status, StatusLike
+from pvoutput.transport import ASYNC_TRANSPORTS, aiohttp_session, httpx_async_client
+from pvoutput.asyncio.singleflight import SingleFlight
 from pvoutput import utils
 from pvoutput.parameters import (
-    ADDBATCHSTATUS_PARAMETERS,
-    ADDSTATUS_PARAMETERS,
-    CALL_PARAMETERS,
+    CALL_SCHEMA,
     DEFAULT_REQUEST_TIMEOUT,
-    ADDOUTPUT_PARAMETERS,
-    DELETE_NOTIFICATION_PARAMETERS,
-    DELETESTATUS_PARAMETERS,
-    REGISTER_NOTIFICATION_PARAMETERS,
+    STREAM_CHUNK_SIZE,
 )
 
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+    import httpx
+
+T = TypeVar("T")
+
+# what the calls return, depending on the transport
+Response = Union["aiohttp.ClientResponse", "httpx.Response"]
+
 
 class PVOutput(PVOutputBase):
     """This class provides an interface to the pvoutput.org API"""
@@ -30,7 +52,15 @@ class PVOutput(PVOutputBase):
         systemid: int,
         donation_made: bool = False,
         stats_period: int = 5,
-        session: Optional[aiohttp.ClientSession] = None,
+        session: Union["aiohttp.ClientSession", "httpx.AsyncClient", None] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        coalesce: bool = True,
+        retry: Optional[RetryPolicy] = None,
+        clock: Optional[Callable[[], datetime.datetime]] = None,
+        base_url: str = utils.BASE_URL,
+        transport: str = "aiohttp",
+        http2: bool = True,
     ) -> None:
         """Setup code
 
@@ -40,26 +70,88 @@ class PVOutput(PVOutputBase):
         :type systemid: int
         :param donation_made: Whether to use the donation-required fields
         :type donation_made: bool
+        :param session: A session to make the calls with, if unset one is created
+        :type session: aiohttp.ClientSession, or httpx.AsyncClient with the httpx transport
+        :param rate_limiter: If set, calls are delayed (or rejected) to stay inside the rate limit
+        :type rate_limiter: pvoutput.ratelimit.RateLimiter
+        :param cache: If set, getstatus and getstatus_history_columns responses are cached until the next stats_period
+        :type cache: pvoutput.cache.ResponseCache
+        :param coalesce: If True, concurrent identical getstatus/getstatus_history_columns/check_rate_limit calls share one request
+        :type coalesce: bool
+        :param retry: If set, failed calls which are safe to repeat are retried, see pvoutput.retry.RetryPolicy
+        :type retry: pvoutput.retry.RetryPolicy
+        :param clock: Returns the current local time, defaults to datetime.datetime.now, for testing
+        :type clock: callable
+        :param base_url: Where to send the calls, defaults to https://pvoutput.org/service/r2/
+        :type base_url: str
+        :param transport: The HTTP library to use, "aiohttp" or "httpx", see pvoutput.transport
+        :type transport: str
+        :param http2: Use HTTP/2 if the server supports it, only used when the httpx client is created for you
+        :type http2: bool
         """
+        if transport not in ASYNC_TRANSPORTS:
+            raise ValueError(f"transport should be one of {', '.join(ASYNC_TRANSPORTS)}, got {transport}")
         super().__init__(
             apikey=apikey,
             systemid=systemid,
             donation_made=donation_made,
             stats_period=stats_period,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            retry=retry,
+            clock=clock,
+            base_url=base_url,
         )
-        if session is None:
-            self.session = aiohttp.ClientSession()
+        self.transport = transport
+        if session is None and transport == "httpx":
+            session = httpx_async_client(http2=http2)
+        elif session is None:
+            session = aiohttp_session()
+        self.session = session
+        self.coalesce = coalesce
+        self._singleflight = SingleFlight()
+
+    async def close(self) -> None:
+        """Closes the session, and any connections it's holding open."""
+        if self.transport == "httpx":
+            await cast("httpx.AsyncClient", self.session).aclose()
         else:
-            self.session = session
+            await cast("aiohttp.ClientSession", self.session).close()
+
+    async def _coalesced(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """runs func, sharing the call with any others running with the same key if coalescing's turned on"""
+        if not self.coalesce:
+            return await func()
+        return await self._singleflight.do(key, func)
+
+    async def _get_text(self, request: Request, use_cache: bool = True) -> str:
+        """makes a read call, returning the body, from the cache if it's there (and allowed), and caching it if not
+
+        Concurrent calls for the same thing share one request, if coalescing's turned on.
+        """
+        params = request.params or {}
+        text = self._cache_get(request.url, params, use_cache)
+        if text is None:
+            text = await self._coalesced(self._cache_key(request.url, params), lambda: self._fetch_text(request))
+        return text
+
+    async def _fetch_text(self, request: Request) -> str:
+        """sends a read call, returning (and caching) the body"""
+        response = await self.send(request)
+        text = await self._text(response)
+        self._cache_set(request.url, request.params or {}, text)
+        return text
 
     async def _call(
         self,
         endpoint: str,
         method: str = "POST",
-        **kwargs: Dict[str, Any],
-    ) -> aiohttp.ClientResponse:
+        **kwargs: Any,
+    ) -> Response:
         """Makes a call to a URL endpoint with the data/headers/method you require.
 
+        If there's a retry policy, failed calls are retried as it says.
+
         :param endpoint: The URL to call
         :type endpoint: str
 
@@ -73,40 +165,126 @@ class PVOutput(PVOutputBase):
         :type method: str
 
         :returns: The response object
-        :rtype: aiohttp.ClientResponse
+        :rtype: aiohttp.ClientResponse or httpx.Response
 
         :raises TypeError: if the data you pass is of the wrong format.
-        :raises ValueError: if the call throws a HTTP 400 error.
+        :raises pvoutput.exceptions.PVOutputError: if PVOutput returns an error, the HTTP 400 ones are also ValueErrors.
         :raises requests.exception: if method throws an exception.
         """
 
-        self.validate_data(kwargs, CALL_PARAMETERS)
+        self.validate_data(kwargs, CALL_SCHEMA)
+        request = Request(
+            "",
+            method,
+            endpoint,
+            params=kwargs.get("params"),
+            data=kwargs.get("data"),
+            headers=kwargs.get("headers", self._headers()),
+            stream=bool(kwargs.get("stream", False)),
+        )
+        return await self.send(request)
+
+    async def send(self, request: Request) -> Response:
+        """Sends a request built by one of the `*_request` methods, retrying it if there's a retry policy.
 
-        if method == "GET":
-            response = await self.session.get(
-                url=endpoint,
-                data=kwargs.get("data"),
-                headers=kwargs.get("headers", self._headers()),
-                params=kwargs.get("params"),
-                timeout=aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT),
-            )
-        elif method == "POST":
-            response = await self.session.post(
-                url=endpoint,
-                data=kwargs.get("data"),
-                headers=kwargs.get("headers", self._headers()),
-                timeout=aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT),
-            )
-        else:
-            raise UnknownMethodError(f"unknown method {kwargs['method']}")
+        :returns: The response object
+        :rtype: aiohttp.ClientResponse or httpx.Response
 
-        if response.status == 400:
-            # TODO: work out how to get the specific response and provide useful answers
-            raise ValueError(f"HTTP400: {(await response.text()).strip()}")
-        # likely errors - https://pvoutput.org/help/api_specification.html#error-messages
+        :raises pvoutput.exceptions.PVOutputError: if PVOutput returns an error, the HTTP 400 ones are also ValueErrors.
+        :raises aiohttp.ClientError: if the call fails.
+        """
+        if self.retry is None:
+            return await self._send(request)
+
+        started = self.retry.clock()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await self._send(request)
+            except Exception as error:  # pylint: disable=broad-except
+                retry_delay = self.retry.delay(attempt, error, started, request.url, request.method, request.data)
+                if retry_delay is None:
+                    raise
+                await asyncio.sleep(retry_delay)
+
+    async def _send(self, request: Request) -> Response:
+        """makes one attempt at sending a request, see send"""
+        delay = self._rate_limit_delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if request.method not in ("GET", "POST"):
+            raise UnknownMethodError(f"unknown method {request.method}")
+        response: Response
+        if self.transport == "httpx":
+            httpx_response = await self._send_httpx(request)
+            response, status = httpx_response, httpx_response.status_code
+        else:
+            aiohttp_response = await self._send_aiohttp(request)
+            response, status = aiohttp_response, aiohttp_response.status
+
+        self._update_rate_limit(response)
+        if status >= 400:
+            try:
+                check_response(status, await self._text(response), response.headers)
+            except Exception:
+                await self._release(response)
+                raise
         response.raise_for_status()
+        if request.method == "POST":
+            # anything sent to PVOutput could change what the read calls return
+            self.invalidate_cache()
         return response
 
+    async def _send_aiohttp(self, request: Request) -> "aiohttp.ClientResponse":
+        """sends a request with aiohttp"""
+        import aiohttp  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        session = cast("aiohttp.ClientSession", self.session)
+        if request.method == "GET":
+            return await session.get(
+                url=request.url,
+                data=request.data,
+                headers=request.headers,
+                params=request.params,
+                timeout=aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT),
+            )
+        return await session.post(
+            url=request.url,
+            data=request.body,
+            headers=request.headers,
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT),
+        )
+
+    async def _send_httpx(self, request: Request) -> "httpx.Response":
+        """sends a request with httpx"""
+        session = cast("httpx.AsyncClient", self.session)
+        built = session.build_request(
+            request.method,
+            request.url,
+            params=request.params,
+            content=request.body if request.method == "POST" else None,
+            headers=request.headers,
+            timeout=DEFAULT_REQUEST_TIMEOUT,
+        )
+        return await session.send(built, stream=request.stream)
+
+    async def _text(self, response: Response) -> str:
+        """the body of a response"""
+        if self.transport == "httpx":
+            response = cast("httpx.Response", response)
+            await response.aread()
+            return response.text
+        return await cast("aiohttp.ClientResponse", response).text()
+
+    async def _release(self, response: Response) -> None:
+        """gives a response's connection back to the pool"""
+        if self.transport == "httpx":
+            await cast("httpx.Response", response).aclose()
+        else:
+            cast("aiohttp.ClientResponse", response).release()
+
     async def check_rate_limit(self) -> Dict[str, str]:
         """Makes a call to the site, checking if you have hit the rate limit.
 
@@ -115,22 +293,23 @@ class PVOutput(PVOutputBase):
         :returns: the headers relating to the rate limit.
         :rtype: dict
         """
-        headers = self._headers()
-        headers["X-Rate-Limit"] = "1"
+        request = self.check_rate_limit_request()
 
-        url, method = utils.URLS["getsystem"]
+        async def get_rate_limit() -> Dict[str, str]:
+            response = await self.send(request)
+            return parse_rate_limit(response.headers)
 
-        response = await self._call(endpoint=url, params={}, headers=headers, method=method)
-        retval = utils.get_rate_limit_header(response)
-        return retval
+        # everyone waiting gets their own copy
+        return dict(await self._coalesced(f"{self._cache_prefix()}check_rate_limit", get_rate_limit))
 
-    async def addbatchstatus(self, data: str, c1: bool = False, n: bool = False) -> aiohttp.ClientResponse:
+    async def addbatchstatus(self, data: Union[str, Payload], c1: bool = False, n: bool = False) -> Response:
         """
         # Add Batch Status Service
 
         The Add Batch Status service adds up to 30 statuses in a single request.
         See the documentation on the page for what it means, and what it responds with.
-        This hasn't been tested.
+        If you've got a list of statuses rather than a pre-built data string, use addstatuses.
+        data can also be a Payload from batch_status_payload or batch_payloads, which is sent without being checked again.
         <https://pvoutput.org/help/api_specification.html#add-batch-status-service>
 
         ## Data Structure
@@ -154,64 +333,116 @@ class PVOutput(PVOutputBase):
         * Maximum power consumption v4 value increased to 2,000,000W
         * Increased batch status size to 100 from 30
         """
-        payload = {
-            "data": data,
-        }
-        if c1:
-            payload["c1"] = "1"
-        if n:
-            payload["n"] = "1"
-
-        url, method = utils.URLS["addbatchstatus"]
-        self.validate_data(payload, ADDBATCHSTATUS_PARAMETERS)
-        return await self._call(endpoint=url, data=payload, method=method)
+        return await self.send(self.addbatchstatus_request(data, c1=c1, n=n))
+
+    async def addstatuses(self, statuses: Iterable[StatusLike], c1: bool = False, n: bool = False) -> List[Response]:
+        """Uploads any number of statuses using the Add Batch Status service.
+
+        Each status is validated like it would be for addstatus, then they're sent in batches of up to
+        30 statuses per request (100 if you've donated). Nothing is sent if any of the statuses are invalid.
+
+        API Spec: https://pvoutput.org/help/api_specification.html#add-batch-status-service
+
+        :param statuses: The statuses, as you'd pass to addstatus - only the d, t and v1-v12 fields are supported
+        :type statuses: iterable of dicts or pvoutput.status.Status
+
+        :param c1: Set the cumulative flag for the batch
+        :type c1: bool
+
+        :param n: Set the net flag for the batch
+        :type n: bool
+
+        :returns: The response objects, one per batch
+        :rtype: list of aiohttp.ClientResponse or httpx.Response
+        """
+        return [await self.send(request) for request in self.addstatuses_requests(statuses, c1=c1, n=n)]
+
+    async def addstatuses_results(self, statuses: Iterable[StatusLike], c1: bool = False, n: bool = False, retries: int = 1) -> List[BatchStatusResult]:
+        """Uploads any number of statuses like addstatuses, returning what PVOutput did with each of them.
+
+        Statuses PVOutput says it didn't add are collected and sent again, in new batches of just those statuses, up to
+        retries times - one bad status doesn't mean resending the whole batch. See addbatchstatus_rows.
+
+        :raises pvoutput.exceptions.BatchValidationError: if any of the statuses are invalid, nothing's sent
+        """
+        return await self.addbatchstatus_rows(self.prepare_batch_statuses(statuses, c1=c1), c1=c1, n=n, retries=retries)
+
+    async def addbatchstatus_rows(self, rows: List[Dict[str, Any]], c1: bool = False, n: bool = False, retries: int = 1) -> List[BatchStatusResult]:
+        """Sends statuses which have already been through prepare_batch_status(es), in batches, without validating them again.
+
+        PVOutput responds to each batch with whether it added each status. The ones it didn't add are collected and
+        sent again, in new batches, up to retries times. pvoutput.protocol.rows_not_added gives you the statuses
+        which still weren't added.
+
+        :param rows: the validated statuses
+        :type rows: list of dicts
+        :param c1: set the cumulative flag for the batches, it should match what the statuses were prepared with
+        :type c1: bool
+        :param n: set the net flag for the batches
+        :type n: bool
+        :param retries: how many more times to send statuses PVOutput didn't add
+        :type retries: int
+
+        :returns: the last result PVOutput gave for each status, empty if its responses didn't include any
+        :rtype: list of pvoutput.protocol.BatchStatusResult
+
+        If a batch fails part way through, the error's raised with the results so far attached, see
+        pvoutput.protocol.batch_results.
+        """
+        results: Dict[Tuple[str, str], BatchStatusResult] = {}
+        try:
+            for _ in range(retries + 1):
+                not_added: List[Dict[str, Any]] = []
+                for batch in self._row_batches(rows):
+                    response = await self.addbatchstatus(self.batch_payloads(batch, c1=c1, n=n)[0])
+                    batch_results = parse_addbatchstatus(await self._text(response))
+                    results.update(((result.d, result.t), result) for result in batch_results)
+                    not_added.extend(rows_not_added(batch, batch_results))
+                rows = not_added
+                if not rows:
+                    break
+        except Exception as error:
+            # keep what PVOutput said about the statuses it's already had, see pvoutput.protocol.batch_results
+            error.batch_results = list(results.values())  # type: ignore[attr-defined]
+            raise
+        return list(results.values())
 
     async def addstatus(
         self,
-        data: Dict[str, Any],
-    ) -> aiohttp.ClientResponse:
+        data: Union[StatusLike, Payload],
+    ) -> Response:
         """The Add Status service accepts live output data
         at the Status Interval (5 to 15 minutes) configured for the system.
 
         API Spec: https://pvoutput.org/help/api_specification.html#add-status-service
 
         :param data: The status data
-        :type data: dict
+        :type data: dict, pvoutput.status.Status or pvoutput.protocol.Payload
 
         :returns: The response object
-        :rtype: aiohttp.ClientResponse
+        :rtype: aiohttp.ClientResponse or httpx.Response
         """
-        # if you don't set a time, set it to now
-        # can't push this through the validator as it relies on the class config
-        if "t" not in data:
-            data["t"] = self.get_time_by_base()
-        self.validate_data(data, ADDSTATUS_PARAMETERS)
+        return await self.send(self.addstatus_request(data))
 
-        url, method = utils.URLS["addstatus"]
-
-        return await self._call(endpoint=url, data=data, method=method)
-
-    async def addoutput(self, data: Dict[str, Any]) -> aiohttp.ClientResponse:
+    async def addoutput(self, data: Union[Dict[str, Any], Payload]) -> Response:
         """The Add Output service uploads end of day output information.
         It allows all of the information provided on the Add Output page to be uploaded.
 
         API Spec: https://pvoutput.org/help/api_specification.html#add-output-service
 
         :param data: The output data to upload
-        :type data: dict
+        :type data: dict or pvoutput.protocol.Payload
 
         :returns: The response object
-        :rtype: aiohttp.ClientResponse
+        :rtype: aiohttp.ClientResponse or httpx.Response
         """
-        self.validate_data(data, ADDOUTPUT_PARAMETERS)
-        url, method = utils.URLS["addoutput"]
-        return await self._call(endpoint=url, data=data, method=method)
+        return await self.send(self.addoutput_request(data))
 
     async def delete_status(
         self,
         date_val: datetime.date,
         time_val: Optional[datetime.time] = None,
-    ) -> aiohttp.ClientResponse:
+    ) -> Response:
         """Deletes a given status, based on the provided parameters
         needs a datetime() object
         set the hours/minutes to non-zero to delete a specific time
@@ -225,51 +456,131 @@ class PVOutput(PVOutputBase):
         :type time_val: datetime.datetime.time
 
         :returns: The response object
-        :rtype: aiohttp.ClientResponse
+        :rtype: aiohttp.ClientResponse or httpx.Response
         """
-        self.validate_data(
-            {
-                "date_val": date_val,
-                "time_val": time_val,
-            },
-            DELETESTATUS_PARAMETERS,
-        )
-
-        data = {"d": date_val.strftime("%Y%m%d")}
-        if time_val is not None:
-            data["t"] = time_val.strftime("%H:%M")
-
-        url, method = utils.URLS["deletestatus"]
+        return await self.send(self.delete_status_request(date_val, time_val))
 
-        return await self._call(endpoint=url, data=data, method=method)
-
-    async def getstatus(self) -> Dict[str, Any]:
+    async def getstatus(self, use_cache: bool = True) -> Dict[str, Any]:
         """The Get Status service retrieves system status information and live output data.
 
         API spec: https://pvoutput.org/help/api_specification.html#get-status-service
 
+        :param use_cache: if False, skip the cache (if there is one) and fetch a fresh status, which is then cached
+        :type use_cache: bool
+
         :returns: the last updated data
         :rtype: dict
         """
-        # TODO: extend this, you can do history searches and all sorts with this endpoint
-        params = {}
-        if self.donation_made:
-            params["ext"] = 1
-            params["sid"] = self.systemid
-        url, method = utils.URLS["getstatus"]
-        response = await self._call(endpoint=url, params=params, method=method)
-        response.raise_for_status()
-        # grab all the things
-        text = await response.text()
-        responsedata, extras = utils.responsedata_to_response(text.split(","))
+        # for history searches, see getstatus_history
+        return parse_getstatus(await self._get_text(self.getstatus_request(), use_cache))
+
+    async def getstatus_record(self, use_cache: bool = True) -> Status:
+        """The same as getstatus, but returns a pvoutput.status.Status rather than a dict.
+
+        :param use_cache: if False, skip the cache (if there is one) and fetch a fresh status, which is then cached
+        :type use_cache: bool
+
+        :returns: the last updated data
+        :rtype: pvoutput.status.Status
+        """
+        return parse_getstatus_record(await self._get_text(self.getstatus_request(), use_cache))
+
+    # pylint: disable=too-many-arguments
+    def getstatus_history(
+        self,
+        date_val: Optional[datetime.date] = None,
+        from_time: Optional[datetime.time] = None,
+        to_time: Optional[datetime.time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """The Get Status service in history mode, which retrieves a day's statuses.
+
+        The rows are parsed as the response streams in, so a whole day of data is never held in memory.
+        Each row is a dict with the same keys as getstatus, plus energy_efficiency and average_power.
 
-        # if we're fancy, we get more data
-        if extras:
-            for i in range(1, 7):
-                responsedata[f"v{i + 6}"] = None if extras[i - 1] == "NaN" else float(extras[i - 1])
-        return responsedata
+        API spec: https://pvoutput.org/help/api_specification.html#get-status-service
+
+        `async for status in pvo.getstatus_history(limit=288, ascending=True): ...`
+
+        :param date_val: The date to get the statuses for, defaults to today
+        :type date_val: datetime.date
+
+        :param from_time: The earliest time to get
+        :type from_time: datetime.time
+
+        :param to_time: The latest time to get
+        :type to_time: datetime.time
+
+        :param limit: The most statuses to get, up to 288
+        :type limit: int
 
-    async def register_notification(self, appid: str, url: str, alerttype: int) -> aiohttp.ClientResponse:
+        :param ascending: Return the oldest status first, otherwise the newest is first
+        :type ascending: bool
+
+        :returns: the statuses
+        :rtype: async iterator of dicts
+        """
+        request = self.getstatus_history_request(date_val, from_time, to_time, limit, ascending, stream=True)
+        return self._aiter_getstatus_history(request, utils.history_row_to_response)
+
+    # pylint: disable=too-many-arguments
+    def getstatus_history_records(
+        self,
+        date_val: Optional[datetime.date] = None,
+        from_time: Optional[datetime.time] = None,
+        to_time: Optional[datetime.time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+    ) -> AsyncIterator[Status]:
+        """The same as getstatus_history, but each row is a pvoutput.status.Status rather than a dict,
+        which takes less than half the memory if you're keeping them.
+
+        See getstatus_history for the parameters.
+
+        :returns: the statuses
+        :rtype: async iterator of pvoutput.status.Status
+        """
+        request = self.getstatus_history_request(date_val, from_time, to_time, limit, ascending, stream=True)
+        return self._aiter_getstatus_history(request, utils.history_row_to_status)
+
+    async def _aiter_getstatus_history(self, request: Request, parse_row: Callable[[List[str]], T]) -> AsyncIterator[T]:
+        """makes the getstatus history call, and parses the rows as they arrive"""
+        response = await self.send(request)
+        try:
+            if self.transport == "httpx":
+                httpx_response = cast("httpx.Response", response)
+                chunks, encoding = httpx_response.aiter_bytes(STREAM_CHUNK_SIZE), httpx_response.encoding
+            else:
+                aiohttp_response = cast("aiohttp.ClientResponse", response)
+                chunks, encoding = aiohttp_response.content.iter_chunked(STREAM_CHUNK_SIZE), aiohttp_response.charset
+            async for row in utils.aiter_delimited(chunks, encoding=encoding or "utf-8"):
+                yield parse_row(row.split(","))
+        finally:
+            await self._release(response)
+
+    # pylint: disable=too-many-arguments
+    async def getstatus_history_columns(
+        self,
+        date_val: Optional[datetime.date] = None,
+        from_time: Optional[datetime.time] = None,
+        to_time: Optional[datetime.time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+        use_cache: bool = True,
+    ) -> StatusColumns:
+        """The same as getstatus_history, but the statuses are parsed into columns (one array per field) rather than dicts,
+        which is much faster when you're processing a lot of history.
+
+        See getstatus_history for the parameters, and getstatus for use_cache.
+
+        :returns: the statuses
+        :rtype: pvoutput.columnar.StatusColumns
+        """
+        request = self.getstatus_history_request(date_val, from_time, to_time, limit, ascending)
+        return parse_getstatus_history_columns(await self._get_text(request, use_cache))
+
+    async def register_notification(self, appid: str, url: str, alerttype: int) -> Response:
         """The Register Notification Service allows a third party application
         to receive PVOutput alert callbacks via a HTTP end point.
 
@@ -287,7 +598,7 @@ class PVOutput(PVOutputBase):
         :type alerttype: int
 
         :return: The response object
-        :rtype: aiohttp.ClientResponse
+        :rtype: aiohttp.ClientResponse or httpx.Response
 
         Alert Type list:
 
@@ -314,20 +625,9 @@ class PVOutput(PVOutputBase):
         =====   ====
         """
 
-        self.validate_data(
-            {
-                "appid": appid,
-                "url": url,
-                "alerttype": alerttype,
-            },
-            REGISTER_NOTIFICATION_PARAMETERS,
-        )
-
-        call_url, method = utils.URLS["registernotification"]
-        params = {"appid": appid, "type": alerttype, "url": url}
-        return await self._call(endpoint=call_url, params=params, method=method)
+        return await self.send(self.register_notification_request(appid, url, alerttype))
 
-    async def deregister_notification(self, appid: str, alerttype: int) -> aiohttp.ClientResponse:
+    async def deregister_notification(self, appid: str, alerttype: int) -> Response:
         """The Deregister Notification Service removes registered notifications under an application id for a system.
 
         API spec: https://pvoutput.org/help/api_specification.html#deregister-notification-service
@@ -341,7 +641,7 @@ class PVOutput(PVOutputBase):
         :type alerttype: int
 
         :return: The response object
-        :rtype: aiohttp.ClientResponse
+        :rtype: aiohttp.ClientResponse or httpx.Response
 
         Alert Type list:
 
@@ -368,14 +668,4 @@ class PVOutput(PVOutputBase):
         =====   ====
         """
 
-        self.validate_data(
-            {
-                "appid": appid,
-                "alerttype": alerttype,
-            },
-            DELETE_NOTIFICATION_PARAMETERS,
-        )
-
-        url, method = utils.URLS["deregisternotification"]
-        params = {"appid": appid, "type": alerttype}
-        return await self._call(endpoint=url, params=params, method=method)
+        return await self.send(self.deregister_notification_request(appid, alerttype))
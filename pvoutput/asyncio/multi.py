@@ -0,0 +1,187 @@
+"""Calling the PVOutput API for many systems at once, with the asyncio client"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar, Union, cast
+
+from pvoutput.asyncio import PVOutput
+from pvoutput.base import copy_arguments
+from pvoutput.cache import ResponseCache
+from pvoutput.ratelimit import RateLimiter
+from pvoutput.transport import aiohttp_session, httpx_async_client
+
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+    import httpx
+
+__all__ = [
+    "MultiSystemPVOutput",
+]
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+T = TypeVar("T")
+
+
+class MultiSystemPVOutput:
+    """Manages a PVOutput client per system, all sharing one aiohttp session (and rate limiter and cache, if you set them),
+    and runs calls against many systems at once.
+
+    ```python
+    async with MultiSystemPVOutput(apikey=apikey, systemids=[1234, 5678]) as multi:
+        statuses = await multi.getstatus()  # {1234: {...}, 5678: {...}}
+    ```
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        apikey: str,
+        systemids: Iterable[int] = (),
+        donation_made: bool = False,
+        stats_period: int = 5,
+        session: Union["aiohttp.ClientSession", "httpx.AsyncClient", None] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        per_system_concurrency: int = 1,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        transport: str = "aiohttp",
+    ) -> None:
+        """Setup code
+
+        :param apikey: API key used for the systems, unless add_system is given another one
+        :type apikey: str
+        :param systemids: the systems to manage, more can be added with add_system
+        :type systemids: iterable of ints
+        :param donation_made: Whether to use the donation-required fields
+        :type donation_made: bool
+        :param session: the session all the clients share, it's left open by close() - if unset one's created with a limit of max_concurrency connections
+        :type session: aiohttp.ClientSession
+        :param max_concurrency: the most calls to run at once, across all the systems
+        :type max_concurrency: int
+        :param per_system_concurrency: the most calls to run at once for any one system
+        :type per_system_concurrency: int
+        :param rate_limiter: shared by all the clients, it keeps a separate budget per system
+        :type rate_limiter: pvoutput.ratelimit.RateLimiter
+        :param cache: shared by all the clients, see pvoutput.cache
+        :type cache: pvoutput.cache.ResponseCache
+        :param transport: the HTTP library the clients use, with "httpx" they share HTTP/2 connections, see pvoutput.transport
+        :type transport: str
+        """
+        # only a session that's created here is closed by close()
+        self._owns_session = session is None
+        if session is None and transport == "httpx":
+            session = httpx_async_client(pool_maxsize=max_concurrency)
+        elif session is None:
+            session = aiohttp_session(limit=max_concurrency)
+        self.session = session
+        self.transport = transport
+        self.apikey = apikey
+        self.donation_made = donation_made
+        self.stats_period = stats_period
+        self.per_system_concurrency = per_system_concurrency
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.clients: Dict[int, PVOutput] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        for systemid in systemids:
+            self.add_system(systemid)
+
+    async def __aenter__(self) -> "MultiSystemPVOutput":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Closes the shared session, if it was created here rather than passed in."""
+        if not self._owns_session:
+            return
+        if self.transport == "httpx":
+            await cast("httpx.AsyncClient", self.session).aclose()
+        else:
+            await cast("aiohttp.ClientSession", self.session).close()
+
+    def add_system(self, systemid: int, apikey: Optional[str] = None, donation_made: Optional[bool] = None) -> PVOutput:
+        """Adds a system, returning its client.
+
+        :param systemid: system ID
+        :type systemid: int
+        :param apikey: if this system needs a different API key
+        :type apikey: str
+        :param donation_made: if this system's account is different
+        :type donation_made: bool
+        """
+        client = PVOutput(
+            apikey=self.apikey if apikey is None else apikey,
+            systemid=systemid,
+            donation_made=self.donation_made if donation_made is None else donation_made,
+            stats_period=self.stats_period,
+            session=self.session,
+            rate_limiter=self.rate_limiter,
+            cache=self.cache,
+            transport=self.transport,
+        )
+        self.clients[systemid] = client
+        self._semaphores[systemid] = asyncio.Semaphore(self.per_system_concurrency)
+        return client
+
+    def client(self, systemid: int) -> PVOutput:
+        """Returns the client for a system.
+
+        :raises KeyError: if the system hasn't been added
+        """
+        return self.clients[systemid]
+
+    async def _run(self, systemid: int, func: Callable[[PVOutput], Awaitable[T]]) -> T:
+        """runs func for a system, inside the global and the system's concurrency limits"""
+        async with self._semaphores[systemid], self._semaphore:
+            return await func(self.clients[systemid])
+
+    async def gather(
+        self,
+        func: Callable[[PVOutput], Awaitable[T]],
+        systemids: Optional[Iterable[int]] = None,
+        return_exceptions: bool = False,
+    ) -> Dict[int, Union[T, BaseException]]:
+        """Calls func with the client for each system, concurrently.
+
+        :param func: called with each system's client, eg `lambda client: client.getstatus()`
+        :type func: callable returning an awaitable
+        :param systemids: the systems to call it for, defaults to all of them
+        :type systemids: iterable of ints
+        :param return_exceptions: if True, a failed call's exception is returned in its place, otherwise the first one is raised
+        :type return_exceptions: bool
+
+        :returns: the results, keyed by system ID
+        :rtype: dict
+        """
+        systemid_list: List[int] = list(self.clients if systemids is None else systemids)
+        for systemid in systemid_list:
+            if systemid not in self.clients:
+                raise KeyError(f"system {systemid} hasn't been added")
+        results = await asyncio.gather(*[self._run(systemid, func) for systemid in systemid_list], return_exceptions=return_exceptions)
+        return dict(zip(systemid_list, results))
+
+    async def call(self, method: str, *args: Any, systemids: Optional[Iterable[int]] = None, return_exceptions: bool = False, **kwargs: Any) -> Dict[int, Any]:
+        """Calls a PVOutput method with the same arguments for each system, eg `await multi.call("addstatus", {"v2": 500})`
+
+        Dict arguments are copied for each system, as the clients fill in things like the time.
+
+        :returns: the results, keyed by system ID
+        :rtype: dict
+        """
+
+        def run(client: PVOutput) -> Any:
+            call_args, call_kwargs = copy_arguments(args, kwargs)
+            return getattr(client, method)(*call_args, **call_kwargs)
+
+        return await self.gather(run, systemids=systemids, return_exceptions=return_exceptions)
+
+    async def getstatus(self, systemids: Optional[Iterable[int]] = None, return_exceptions: bool = False) -> Dict[int, Any]:
+        """Gets the status of each system, see PVOutput.getstatus
+
+        :returns: the statuses, keyed by system ID
+        :rtype: dict
+        """
+        return await self.gather(lambda client: client.getstatus(), systemids=systemids, return_exceptions=return_exceptions)
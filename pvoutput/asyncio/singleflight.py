@@ -0,0 +1,55 @@
+"""Sharing one in-flight call between everyone who asks for the same thing at once"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+__all__ = [
+    "SingleFlight",
+]
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key, so only the first one runs and the rest wait for its result.
+
+    Once the call's finished the key's forgotten, so the next call runs again - this isn't a cache.
+
+    ```python
+    flight = SingleFlight()
+    statuses = await asyncio.gather(*[flight.do("getstatus", pvo.getstatus) for _ in range(100)])  # one request
+    ```
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    def __len__(self) -> int:
+        """the number of calls in flight"""
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Runs func, unless there's already a call running with the same key, in which case its result is shared.
+
+        If the call raises, everyone waiting gets the exception. Cancelling one of the waiters doesn't cancel the call
+        for the others.
+
+        :param key: what identifies the call, eg the URL and parameters
+        :type key: hashable
+        :param func: makes the call
+        :type func: callable returning an awaitable
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        result: T = await asyncio.shield(task)
+        return result
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        """drops a finished call, and marks its exception as retrieved in case every waiter was cancelled"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,218 @@
+"""Batch uploading of statuses for the asyncio client"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Union
+
+from pvoutput.exceptions import StatusesNotAddedError
+from pvoutput.protocol import batch_results, rows_added, rows_not_added
+from pvoutput.status import StatusLike
+
+if TYPE_CHECKING:
+    from pvoutput.asyncio import PVOutput
+
+__all__ = [
+    "StatusUploader",
+]
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_LINGER = 60.0
+
+_STOP = object()
+
+
+class StatusUploader:
+    """Collects statuses from any number of coroutines and uploads them in batches from a consumer task.
+
+    A batch is sent with PVOutput.addbatchstatus when max_batch_size statuses are waiting, or when the oldest waiting
+    status has lingered for linger seconds, whichever comes first. Up to concurrency batches are uploaded at once,
+    so batches may arrive out of order.
+
+    ```python
+    async with StatusUploader(PVOutput(apikey=apikey, systemid=systemid, session=session)) as uploader:
+        await asyncio.gather(*[uploader.put(await sensor.read()) for sensor in sensors])
+    ```
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        client: "PVOutput",
+        max_batch_size: Optional[int] = None,
+        linger: float = DEFAULT_LINGER,
+        concurrency: int = 1,
+        max_queue_size: int = 0,
+        c1: bool = False,
+        n: bool = False,
+        on_error: Optional[Callable[[Exception, List[Dict[str, Any]]], None]] = None,
+        retries: int = 1,
+    ) -> None:
+        """Setup code
+
+        :param client: the client to upload with
+        :type client: pvoutput.asyncio.PVOutput
+        :param max_batch_size: upload once this many statuses are waiting, defaults to the most the account can send in one batch
+        :type max_batch_size: int
+        :param linger: upload once the oldest waiting status has waited this many seconds
+        :type linger: float
+        :param concurrency: the most batches to upload at once
+        :type concurrency: int
+        :param max_queue_size: the most statuses to hold before put() waits for space, 0 is unlimited
+        :type max_queue_size: int
+        :param c1: send the batches with the cumulative flag set
+        :type c1: bool
+        :param n: send the batches with the net flag set
+        :type n: bool
+        :param on_error: called with the exception and the statuses when an upload fails, otherwise the error is logged and the statuses are dropped
+        :type on_error: callable
+        :param retries: how many more times to send statuses PVOutput says it didn't add, then they're passed to on_error with a StatusesNotAddedError
+        :type retries: int
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.client = client
+        self.max_batch_size = max_batch_size or client.batch_status_size
+        self.linger = linger
+        self.concurrency = concurrency
+        self.c1 = c1
+        self.n = n
+        self.on_error = on_error
+        self.retries = retries
+        self._queue: "asyncio.Queue[Union[Dict[str, Any], asyncio.Event, object]]" = asyncio.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._consumer: Optional["asyncio.Task[None]"] = None
+        self._uploads: Set["asyncio.Task[None]"] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "StatusUploader":
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        """Starts the consumer task, this is done for you by put() or using the uploader as a context manager."""
+        if self._consumer is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._consumer = asyncio.get_running_loop().create_task(self._run())
+
+    async def put(self, status: StatusLike) -> None:
+        """Queues a status for upload.
+
+        The status is validated straight away, so errors are raised here rather than in the consumer.
+        If no time is set, it's set to now (rounded to the stats period), not the time it's sent.
+
+        :param status: the status, as you'd pass to PVOutput.addstatus - only the d, t and v1-v12 fields are supported
+        :type status: dict or pvoutput.status.Status
+
+        :raises ValueError: if the status is invalid, or the uploader's been closed
+        """
+        if self._closed:
+            raise ValueError("StatusUploader is closed")
+        row = self.client.prepare_batch_status(status, c1=self.c1)
+        self.start()
+        await self._queue.put(row)
+
+    async def flush(self) -> None:
+        """Uploads everything queued so far, waiting for it to finish.
+
+        :raises ValueError: if the uploader's been closed, as there's nothing left to flush it
+        """
+        if self._closed:
+            raise ValueError("StatusUploader is closed")
+        self.start()
+        done = asyncio.Event()
+        await self._queue.put(done)
+        await done.wait()
+
+    async def close(self) -> None:
+        """Uploads anything that's waiting and stops the consumer task."""
+        if not self._closed:
+            self._closed = True
+            if self._consumer is None:
+                return
+            await self._queue.put(_STOP)
+        if self._consumer is not None:
+            await self._consumer
+
+    def _failed(self, error: Exception, rows: List[Dict[str, Any]]) -> None:
+        """passes statuses which couldn't be uploaded to on_error, or logs them"""
+        if self.on_error is None:
+            LOGGER.error("Failed to upload %d statuses", len(rows), exc_info=error)
+            return
+        try:
+            self.on_error(error, rows)
+        except Exception:  # pylint: disable=broad-except
+            # it mustn't end the upload task with an exception nobody's waiting for
+            LOGGER.exception("on_error raised handling %d statuses which failed to upload", len(rows))
+
+    async def _upload(self, batch: List[Dict[str, Any]]) -> None:
+        """sends a batch, passing any errors to on_error"""
+        try:
+            # the statuses were validated by put, so they're not checked again
+            results = await self.client.addbatchstatus_rows(batch, c1=self.c1, n=self.n, retries=self.retries)
+            not_added = rows_not_added(batch, results)
+            if not_added:
+                raise StatusesNotAddedError(not_added)
+        except StatusesNotAddedError as error:
+            # only the statuses which weren't added need handling
+            self._failed(error, error.rows)
+        except Exception as error:  # pylint: disable=broad-except
+            # statuses PVOutput added before it went wrong don't need handling either
+            added = {id(row) for row in rows_added(batch, batch_results(error))}
+            self._failed(error, [row for row in batch if id(row) not in added])
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    async def _dispatch(self, batch: List[Dict[str, Any]]) -> None:
+        """starts uploading a batch, waiting if there's already `concurrency` uploads running"""
+        if not batch or self._semaphore is None:
+            return
+        await self._semaphore.acquire()
+        task = asyncio.get_running_loop().create_task(self._upload(batch))
+        self._uploads.add(task)
+        task.add_done_callback(self._uploads.discard)
+
+    async def _drain(self) -> None:
+        """waits for the running uploads to finish"""
+        if self._uploads:
+            await asyncio.wait(set(self._uploads))
+
+    async def _run(self) -> None:
+        """the consumer task, collects statuses and dispatches the uploads"""
+        loop = asyncio.get_running_loop()
+        batch: List[Dict[str, Any]] = []
+        deadline = 0.0
+        getter: Optional["asyncio.Future[Any]"] = None
+        while True:
+            # the getter's kept between loops so a status is never lost to a timeout
+            if getter is None:
+                getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=max(0.0, deadline - loop.time()) if batch else None)
+            if not done:
+                # the oldest status has waited long enough
+                await self._dispatch(batch)
+                batch = []
+                continue
+            item = getter.result()
+            getter = None
+
+            if isinstance(item, dict):
+                if not batch:
+                    deadline = loop.time() + self.linger
+                batch.append(item)
+                if len(batch) >= self.max_batch_size:
+                    await self._dispatch(batch)
+                    batch = []
+            elif isinstance(item, asyncio.Event):
+                await self._dispatch(batch)
+                batch = []
+                await self._drain()
+                item.set()
+            else:
+                await self._dispatch(batch)
+                await self._drain()
+                return
@@ -1,11 +1,39 @@
 """base class for pvoutput"""
 
-from datetime import datetime, time
+import datetime as datetime_module
+from datetime import date, datetime, time
 from math import floor
 import re
-from typing import Any, Dict, Union
+from urllib.parse import urlencode
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
 
-from .exceptions import InvalidRegexpError, DonationRequired
+from . import utils
+from .cache import ResponseCache
+from .exceptions import BatchValidationError, DonationRequired, InvalidRegexpError
+from .parameters import (
+    ADDBATCHSTATUS_MAX_SIZE,
+    ADDBATCHSTATUS_MAX_SIZE_DONATION,
+    ADDBATCHSTATUS_SCHEMA,
+    ADDOUTPUT_SCHEMA,
+    ADDSTATUS_MAX_AGE_DAYS,
+    ADDSTATUS_MAX_AGE_DAYS_DONATION,
+    ADDSTATUS_SCHEMA,
+    DELETE_NOTIFICATION_SCHEMA,
+    DELETESTATUS_SCHEMA,
+    GETSTATUS_HISTORY_SCHEMA,
+    REGISTER_NOTIFICATION_SCHEMA,
+    ParameterSchema,
+    compile_parameters,
+)
+from .protocol import _BUILDER, Payload, Request, parse_rate_limit
+from .ratelimit import RateLimiter, rate_limit_key
+from .retry import RetryPolicy
+from .status import Status, StatusLike
+
+
+def _now() -> datetime:
+    """the current local time, looked up through the datetime module on each call so patching datetime.datetime works"""
+    return datetime_module.datetime.now()
 
 
 def round_to_base(number: Union[int, float], base: Union[int, float]) -> float:
@@ -15,6 +43,11 @@ def round_to_base(number: Union[int, float], base: Union[int, float]) -> float:
     return base * round(floor(number / base))
 
 
+def copy_arguments(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+    """Copies any dict arguments, so each of several calls made with them gets its own to fill in (eg addstatus sets t and d)."""
+    return tuple(dict(arg) if isinstance(arg, dict) else arg for arg in args), {key: dict(value) if isinstance(value, dict) else value for key, value in kwargs.items()}
+
+
 class PVOutputBase:
     """base class for the PVOutput API"""
 
@@ -24,6 +57,11 @@ class PVOutputBase:
         systemid: int,
         donation_made: bool = False,
         stats_period: int = 5,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        retry: Optional[RetryPolicy] = None,
+        clock: Optional[Callable[[], datetime]] = None,
+        base_url: str = utils.BASE_URL,
     ) -> None:
         if not isinstance(systemid, int):
             raise TypeError("systemid should be int")
@@ -33,22 +71,101 @@ class PVOutputBase:
         self.systemid = systemid
         self.donation_made = donation_made
         self.stats_period = stats_period
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.retry = retry
+        # the current (local) time, statuses default to it and dates are checked against it
+        self.clock: Callable[[], datetime] = clock if clock is not None else _now
+        # where the calls are sent, eg a proxy or a test server
+        self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+        # the X-Rate-Limit headers from the last response that had them
+        self.rate_limit: Dict[str, str] = {}
+        # the headers and rate limit key are needed for every call, so they're built once for each apikey/systemid
+        self._headers_cache: Optional[Tuple[Tuple[str, int, bool], Dict[str, str]]] = None
+        self._rate_limit_key_cache: Optional[Tuple[Tuple[str, int], str]] = None
 
     def _headers(self) -> Dict[str, str]:
         """Relevant documentation: https://pvoutput.org/help/api_specification.html#http-headers
 
-        :return: headers for calls to the API
+        :return: headers for calls to the API, this is a copy so it's safe to change
         :rtype: dict
         """
-        headers = {
-            "X-Pvoutput-Apikey": self.apikey,
-            "X-Pvoutput-SystemId": str(self.systemid),
-        }
-        return headers
+        # the rate limiter and retry policy both need the rate limit headers
+        wants_rate_limit = self.rate_limiter is not None or self.retry is not None
+        identity = (self.apikey, self.systemid, wants_rate_limit)
+        if self._headers_cache is None or self._headers_cache[0] != identity:
+            headers = {
+                "X-Pvoutput-Apikey": self.apikey,
+                "X-Pvoutput-SystemId": str(self.systemid),
+            }
+            if wants_rate_limit:
+                # ask for the rate limit headers on every call, so the limiter stays up to date
+                headers["X-Rate-Limit"] = "1"
+            self._headers_cache = (identity, headers)
+        return dict(self._headers_cache[1])
+
+    def _update_rate_limit(self, response: Any) -> None:
+        """picks the X-Rate-Limit headers out of a response and passes them to the rate limiter"""
+        rate_limit = parse_rate_limit(response.headers)
+        if rate_limit:
+            self.rate_limit = rate_limit
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(rate_limit, key=self._rate_limit_key())
+
+    def _rate_limit_key(self) -> str:
+        """the key this client's rate limit state is kept under"""
+        identity = (self.apikey, self.systemid)
+        if self._rate_limit_key_cache is None or self._rate_limit_key_cache[0] != identity:
+            self._rate_limit_key_cache = (identity, rate_limit_key(self.apikey, self.systemid))
+        return self._rate_limit_key_cache[1]
+
+    def _rate_limit_delay(self) -> float:
+        """reserves a call with the rate limiter, returning how long to wait before making it"""
+        if self.rate_limiter is None:
+            return 0.0
+        return self.rate_limiter.acquire(key=self._rate_limit_key())
+
+    def _cache_prefix(self) -> str:
+        """every cache key for this apikey/systemid starts with this"""
+        return f"{self._rate_limit_key()}:"
+
+    def _cache_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """the cache key for a read call"""
+        return f"{self._cache_prefix()}{endpoint}?{urlencode(sorted(params.items()))}"
+
+    def _cache_get(self, endpoint: str, params: Dict[str, Any], use_cache: bool = True) -> Optional[str]:
+        """the cached response body for a read call, if there's a cache, it's allowed, and there's something there"""
+        if self.cache is None or not use_cache:
+            return None
+        return self.cache.get(self._cache_key(endpoint, params))
+
+    def _cache_set(self, endpoint: str, params: Dict[str, Any], text: str) -> None:
+        """caches the response body for a read call, until the next stats_period"""
+        if self.cache is not None:
+            self.cache.set(self._cache_key(endpoint, params), text, self.cache.expires_in(self.stats_period))
+
+    def invalidate_cache(self) -> None:
+        """Drops this system's cached responses, this happens automatically whenever data's sent to PVOutput."""
+        if self.cache is not None:
+            self.cache.invalidate(self._cache_prefix())
+
+    @property
+    def batch_status_size(self) -> int:
+        """the maximum number of statuses in a single addbatchstatus call"""
+        if self.donation_made:
+            return ADDBATCHSTATUS_MAX_SIZE_DONATION
+        return ADDBATCHSTATUS_MAX_SIZE
+
+    @property
+    def status_max_age_days(self) -> int:
+        """how many days back statuses can be added"""
+        if self.donation_made:
+            return ADDSTATUS_MAX_AGE_DAYS_DONATION
+        return ADDSTATUS_MAX_AGE_DAYS
 
     def get_time_by_base(self) -> str:
         """rounds the current time to the base specified (ie, to 15 minutes or 5 minutes etc)"""
-        now = datetime.now()
+        now = self.clock()
         hour = int(now.strftime("%H"))
         # round the minute to the current stats period
         minute = int(round_to_base(now.minute, self.stats_period))
@@ -69,8 +186,7 @@ class PVOutputBase:
         except re.error as error:
             raise InvalidRegexpError("Error for key '{key}' with format '{format_string!r}': {error}") from error
 
-    # pylint: disable=too-many-branches
-    def validate_data(self, data: Dict[str, Any], apiset: Dict[str, Any]) -> bool:
+    def validate_data(self, data: Dict[str, Any], apiset: Union[Dict[str, Any], ParameterSchema]) -> bool:
         """Does a super-simple validation based on the api def raises errors if it's wrong, returns True if it's OK
 
         This'll only raise an error on the first error it finds
@@ -78,77 +194,279 @@ class PVOutputBase:
         :param data: the data to validate.
         :type data: dict
 
-        :param apiset: A set of validation rules, eg: pvoutput.ADDSTATUS_PARAMETERS
-        :type apiset: dict
+        :param apiset: A set of validation rules, eg: pvoutput.ADDSTATUS_PARAMETERS, or a compiled schema like pvoutput.parameters.ADDSTATUS_SCHEMA
+        :type apiset: dict or pvoutput.parameters.ParameterSchema
 
         :raises TypeError: if the type testing fails.
         :raises ValueError: if you're trying to pass an invalid value.
         :raises pvoutput.InvalidRegexpError: if value does not match the regexp in format.
         """
-        # if you set a 'required_oneof' key in apiset, validation will require at least one of those keys to be set
-        if "required_oneof" in apiset.keys() and (len([key for key in data.keys() if key in apiset["required_oneof"]["keys"]]) == 0):
-            raise ValueError(f"one of {','.join(apiset['required_oneof']['keys'])} MUST be set")
-        for key in apiset.keys():
-            # check that that required values are set
-            if apiset[key].get("required", False) and key not in data.keys():
-                if "default" in apiset[key]:
-                    if callable(apiset[key]["default"]):
-                        # if the default is a callable, call it to get the value
-                        data[key] = apiset[key]["default"]()
-                    else:
-                        # set a default value
-                        data[key] = apiset[key]["default"]
-                else:
-                    raise ValueError(f"key {key} required in data")
-
-            # check maxlen
-            if "maxlen" in apiset[key] and key in data:
-                if len(data[key]) > apiset[key]["maxlen"]:
-                    raise ValueError(f"Value too long for key {key} {len(data[key])}>{apiset[key]['maxlen']}")
-
-            # check the value is in the set of valid choices
-            if "choices" in apiset[key] and key in data:
-                if data[key] not in apiset[key]["choices"]:
-                    raise ValueError(f"Invalid value for key {key}: '{data[key]}', should be in {apiset[key]['choices']} ")
-
-        # check there's no extra fields in the data
-        for key in data:
-            if key not in apiset.keys():
-                raise ValueError(f"key {key} isn't valid in the API spec")
-
-            if apiset[key].get("type") and not isinstance(data[key], apiset[key]["type"]):
-                if data[key] is not None:
-                    raise TypeError(f"data[{key}] type ({type(data[key])} is invalid - should be {str(apiset[key]['type'])})")
-
-        for key in data:
-            if "format" in apiset[key]:
-                self._validate_format(apiset[key]["format"], key, data[key])
-            # can run additional functions over the data
-            if "additional_validators" in apiset[key]:
-                for validator in apiset[key]["additional_validators"]:
-                    validator(data[key])
-
-            # TODO: 'd' can't be more than 14 days ago, if a donator, goes out to 90
-            # check if donation_made == True and age of thing
-            # if self.donation_made:
-            #     # check if more than 90 days ago
-            # else:
-            #     # check if more than 14 days ago
-
-            # check for donation-only keys
-            if apiset[key].get("donation_required") and not self.donation_made:
-                raise DonationRequired(f"key {key} requires an account which has donated")
-
-            # check max/min value constraints
-            # Special case: When c1 flag is set, v3 represents cumulative lifetime energy values
-            # which can exceed the normal maximum validation limit of 200000 Wh
-            should_skip_maxval_check = key == "v3" and data.get("c1") is not None
-
-            if not should_skip_maxval_check:
-                if apiset[key].get("maxval") is not None and data.get(key) > apiset[key].get("maxval"):
-                    raise ValueError(f"{key} cannot be higher than {apiset[key]['maxval']}, is {data[key]}")
-
-            if apiset[key].get("minval") is not None and data.get(key) < apiset[key].get("minval"):
-                raise ValueError(f"{key} cannot be lower than {apiset[key]['minval']}, is {data[key]}")
-
-        return True
+        schema = compile_parameters(apiset)
+        if self is None:
+            return schema.validate(data)
+        return schema.validate(data, donation_made=self.donation_made, today=self.clock().date())
+
+    def prepare_batch_status(self, status: StatusLike, c1: bool = False) -> Dict[str, Any]:
+        """Validates a single addstatus-style dict for use in a batch status upload
+
+        :param status: the status, the same as you'd pass to addstatus, without the n/c1/m1 fields
+        :type status: dict or pvoutput.status.Status
+
+        :param c1: whether the batch is being sent with the cumulative flag set
+        :type c1: bool
+
+        :returns: a validated copy of the status, with the defaults filled in
+        :rtype: dict
+
+        :raises ValueError: if there's a field which can't be sent in a batch, or the data is invalid
+        """
+        row = status.to_wire() if isinstance(status, Status) else dict(status)
+        for key in row:
+            if key not in utils.BATCH_STATUS_FIELDS:
+                raise ValueError(f"key {key} isn't valid in a batch status")
+        # can't push this through the validator as it relies on the class config
+        if "t" not in row:
+            row["t"] = self.get_time_by_base()
+        if c1:
+            row["c1"] = 1
+        self.validate_data(row, ADDSTATUS_SCHEMA)
+        row.pop("c1", None)
+        return row
+
+    def prepare_batch_statuses(self, statuses: Iterable[StatusLike], c1: bool = False) -> List[Dict[str, Any]]:
+        """Validates a set of statuses with prepare_batch_status, checking all of them before raising
+
+        :param statuses: the statuses
+        :type statuses: iterable of dicts or pvoutput.status.Status
+
+        :param c1: whether the batch is being sent with the cumulative flag set
+        :type c1: bool
+
+        :returns: the validated copies of the statuses
+        :rtype: list of dicts
+
+        :raises pvoutput.exceptions.BatchValidationError: if any are invalid, it has every error, and the valid statuses
+        """
+        rows = []
+        errors: List[Tuple[int, StatusLike, Exception]] = []
+        for index, status in enumerate(statuses):
+            try:
+                rows.append(self.prepare_batch_status(status, c1=c1))
+            except (ValueError, TypeError, DonationRequired) as error:
+                errors.append((index, status, error))
+        if errors:
+            raise BatchValidationError(errors, rows)
+        return rows
+
+    @staticmethod
+    def _batch_fields(data: str, c1: bool = False, n: bool = False) -> Dict[str, str]:
+        """the fields of an addbatchstatus call"""
+        fields = {"data": data}
+        if c1:
+            fields["c1"] = "1"
+        if n:
+            fields["n"] = "1"
+        return fields
+
+    def status_payload(self, data: StatusLike) -> Payload:
+        """Validates a status for addstatus, see it for the fields - the payload can be sent any number of times without being checked again.
+
+        If no time is set, it's set to now (rounded to the stats period).
+
+        :raises ValueError: if the status is invalid
+        """
+        # the caller's dict is left alone, the time and date are filled in on a copy
+        data = data.to_wire() if isinstance(data, Status) else dict(data)
+        # if you don't set a time, set it to now
+        # can't push this through the validator as it relies on the class config
+        if "t" not in data:
+            data["t"] = self.get_time_by_base()
+        self.validate_data(data, ADDSTATUS_SCHEMA)
+        return Payload("addstatus", data, _BUILDER)
+
+    def output_payload(self, data: Dict[str, Any]) -> Payload:
+        """Validates an end of day output for addoutput, see status_payload."""
+        data = dict(data)
+        self.validate_data(data, ADDOUTPUT_SCHEMA)
+        return Payload("addoutput", data, _BUILDER)
+
+    def batch_status_payload(self, data: str, c1: bool = False, n: bool = False) -> Payload:
+        """Validates the data string and flags for addbatchstatus, see status_payload."""
+        fields = self._batch_fields(data, c1=c1, n=n)
+        self.validate_data(fields, ADDBATCHSTATUS_SCHEMA)
+        statuses = data.count(";") + 1
+        if statuses > self.batch_status_size:
+            raise ValueError(f"addbatchstatus accepts up to {self.batch_status_size} statuses, got {statuses}")
+        return Payload("addbatchstatus", fields, _BUILDER)
+
+    def batch_payloads(self, rows: List[Dict[str, Any]], c1: bool = False, n: bool = False) -> List[Payload]:
+        """Chunks statuses which have already been through prepare_batch_status(es) into addbatchstatus payloads,
+        of up to batch_status_size statuses, without validating them again.
+
+        :param rows: the validated statuses
+        :type rows: list of dicts
+        :param c1: set the cumulative flag for the batches, it should match what the statuses were prepared with
+        :type c1: bool
+        :param n: set the net flag for the batches
+        :type n: bool
+        """
+        return [Payload("addbatchstatus", self._batch_fields(utils.batch_status_data(batch), c1=c1, n=n), _BUILDER) for batch in self._row_batches(rows)]
+
+    def _row_batches(self, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """validated statuses chunked into batches of up to batch_status_size"""
+        size = self.batch_status_size
+        return [rows[index : index + size] for index in range(0, len(rows), size)]
+
+    def statuses_payloads(self, statuses: Iterable[StatusLike], c1: bool = False, n: bool = False) -> List[Payload]:
+        """Validates all the statuses, then chunks them into addbatchstatus payloads, see addstatuses."""
+        return self.batch_payloads(self.prepare_batch_statuses(statuses, c1=c1), c1=c1, n=n)
+
+    # pylint: disable=too-many-arguments
+    def _getstatus_history_params(
+        self,
+        date_val: Optional[date] = None,
+        from_time: Optional[time] = None,
+        to_time: Optional[time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+    ) -> Dict[str, Any]:
+        """validates the getstatus history options and turns them into the query parameters"""
+        options = {
+            "date_val": date_val,
+            "from_time": from_time,
+            "to_time": to_time,
+            "limit": limit,
+            "ascending": ascending,
+        }
+        self.validate_data({key: value for key, value in options.items() if value is not None}, GETSTATUS_HISTORY_SCHEMA)
+
+        params: Dict[str, Any] = {"h": 1}
+        if date_val is not None:
+            params["d"] = date_val.strftime("%Y%m%d")
+        if from_time is not None:
+            params["from"] = from_time.strftime("%H:%M")
+        if to_time is not None:
+            params["to"] = to_time.strftime("%H:%M")
+        if limit is not None:
+            params["limit"] = limit
+        if ascending:
+            params["asc"] = 1
+        if self.donation_made:
+            params["ext"] = 1
+            params["sid"] = self.systemid
+        return params
+
+    def _request(
+        self,
+        name: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Mapping[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+        body: Optional[bytes] = None,
+    ) -> Request:
+        """a request for one of the calls in utils.ENDPOINTS, to base_url"""
+        path, method = utils.ENDPOINTS[name]
+        return Request(
+            name,
+            method,
+            self.base_url + path,
+            params=params,
+            data=data,
+            headers=headers if headers is not None else self._headers(),
+            stream=stream,
+            body=body,
+        )
+
+    def _payload_request(self, name: str, payload: Payload) -> Request:
+        """the request which sends a payload"""
+        if payload.name != name:
+            raise ValueError(f"{name} can't send a {payload.name} payload")
+        return self._request(name, data=payload.fields, body=payload.body)
+
+    def check_rate_limit_request(self) -> Request:
+        """The request for check_rate_limit."""
+        headers = self._headers()
+        headers["X-Rate-Limit"] = "1"
+        return self._request("getsystem", params={}, headers=headers)
+
+    def addbatchstatus_request(self, data: Union[str, Payload], c1: bool = False, n: bool = False) -> Request:
+        """The request for addbatchstatus, see it for the parameters. c1 and n are ignored if data's a Payload."""
+        payload = data if isinstance(data, Payload) else self.batch_status_payload(data, c1=c1, n=n)
+        return self._payload_request("addbatchstatus", payload)
+
+    def addstatuses_requests(self, statuses: Iterable[StatusLike], c1: bool = False, n: bool = False) -> List[Request]:
+        """The requests for addstatuses, one per batch, see it for the parameters."""
+        return [self._payload_request("addbatchstatus", payload) for payload in self.statuses_payloads(statuses, c1=c1, n=n)]
+
+    def addstatus_request(self, data: Union[StatusLike, Payload]) -> Request:
+        """The request for addstatus, see it for the parameters."""
+        return self._payload_request("addstatus", data if isinstance(data, Payload) else self.status_payload(data))
+
+    def addoutput_request(self, data: Union[Dict[str, Any], Payload]) -> Request:
+        """The request for addoutput, see it for the parameters."""
+        return self._payload_request("addoutput", data if isinstance(data, Payload) else self.output_payload(data))
+
+    def delete_status_request(self, date_val: date, time_val: Optional[time] = None) -> Request:
+        """The request for delete_status, see it for the parameters."""
+        self.validate_data(
+            {
+                "date_val": date_val,
+                "time_val": time_val,
+            },
+            DELETESTATUS_SCHEMA,
+        )
+
+        data = {"d": date_val.strftime("%Y%m%d")}
+        if time_val is not None:
+            data["t"] = time_val.strftime("%H:%M")
+        return self._request("deletestatus", data=data)
+
+    def getstatus_request(self) -> Request:
+        """The request for getstatus, parse the response with pvoutput.protocol.parse_getstatus."""
+        # for history searches, see getstatus_history_request
+        params: Dict[str, Any] = {}
+        if self.donation_made:
+            params["ext"] = 1
+            params["sid"] = self.systemid
+        return self._request("getstatus", params=params)
+
+    # pylint: disable=too-many-arguments
+    def getstatus_history_request(
+        self,
+        date_val: Optional[date] = None,
+        from_time: Optional[time] = None,
+        to_time: Optional[time] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+        stream: bool = False,
+    ) -> Request:
+        """The request for getstatus_history, see it for the parameters.
+
+        Parse the response with pvoutput.protocol.parse_getstatus_history or parse_getstatus_history_columns.
+        """
+        params = self._getstatus_history_params(date_val, from_time, to_time, limit, ascending)
+        return self._request("getstatus", params=params, stream=stream)
+
+    def register_notification_request(self, appid: str, url: str, alerttype: int) -> Request:
+        """The request for register_notification, see it for the parameters."""
+        self.validate_data(
+            {
+                "appid": appid,
+                "url": url,
+                "alerttype": alerttype,
+            },
+            REGISTER_NOTIFICATION_SCHEMA,
+        )
+        return self._request("registernotification", params={"appid": appid, "type": alerttype, "url": url})
+
+    def deregister_notification_request(self, appid: str, alerttype: int) -> Request:
+        """The request for deregister_notification, see it for the parameters."""
+        self.validate_data(
+            {
+                "appid": appid,
+                "alerttype": alerttype,
+            },
+            DELETE_NOTIFICATION_SCHEMA,
+        )
+        return self._request("deregisternotification", params={"appid": appid, "type": alerttype})
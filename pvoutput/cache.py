@@ -0,0 +1,160 @@
+"""Caching responses from the read-only endpoints
+
+PVOutput only gets new data once every stats_period minutes, so by default a cached response lasts until the next
+stats_period boundary. Pass a cache to a client with `PVOutput(..., cache=TTLCache())`, or a SqliteCache to share
+it between processes.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Tuple, Union
+
+from .utils import user_dir
+
+__all__ = [
+    "ResponseCache",
+    "TTLCache",
+    "SqliteCache",
+    "seconds_until_next_period",
+]
+
+DEFAULT_MAXSIZE = 1024
+
+
+def seconds_until_next_period(stats_period: int, now: float) -> float:
+    """How long until the next stats_period boundary, eg with a 5 minute period at 10:03:30 it's 90 seconds.
+
+    :param stats_period: the system's status interval, in minutes
+    :type stats_period: int
+    :param now: the current unix time
+    :type now: float
+    """
+    period = stats_period * 60
+    return period - (now % period)
+
+
+class ResponseCache(ABC):
+    """Somewhere to keep response bodies until they expire. Subclasses implement get/set/invalidate/clear."""
+
+    def __init__(self, ttl: Optional[float] = None, clock: Callable[[], float] = time.time) -> None:
+        """Setup code
+
+        :param ttl: how long to keep responses for, in seconds, defaults to the start of the client's next stats_period
+        :type ttl: float
+        :param clock: returns the current unix time, for testing
+        :type clock: callable
+        """
+        self.ttl = ttl
+        self.clock = clock
+
+    def expires_in(self, stats_period: int) -> float:
+        """how long a response cached now should be kept"""
+        if self.ttl is not None:
+            return self.ttl
+        return seconds_until_next_period(stats_period, self.clock())
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached value, or None if it's missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """Caches a value for ttl seconds."""
+
+    @abstractmethod
+    def invalidate(self, prefix: str = "") -> None:
+        """Drops every value with a key starting with prefix."""
+
+    def clear(self) -> None:
+        """Drops everything."""
+        self.invalidate("")
+
+
+class TTLCache(ResponseCache):
+    """An in-memory cache, dropping the least recently used values once there's more than maxsize of them."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: Optional[float] = None, clock: Callable[[], float] = time.time) -> None:
+        """Setup code
+
+        :param maxsize: the most values to keep
+        :type maxsize: int
+        :param ttl: how long to keep responses for, in seconds, defaults to the start of the client's next stats_period
+        :type ttl: float
+        :param clock: returns the current unix time, for testing
+        :type clock: callable
+        """
+        super().__init__(ttl=ttl, clock=clock)
+        self.maxsize = maxsize
+        self._values: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            if item[0] <= self.clock():
+                del self._values[key]
+                return None
+            self._values.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._values[key] = (self.clock() + ttl, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def invalidate(self, prefix: str = "") -> None:
+        with self._lock:
+            for key in [key for key in self._values if key.startswith(prefix)]:
+                del self._values[key]
+
+
+class SqliteCache(ResponseCache):
+    """An on-disk cache in a SQLite database, so it's shared between a user's processes, and survives restarts."""
+
+    def __init__(self, path: Union[str, Path, None] = None, ttl: Optional[float] = None, clock: Callable[[], float] = time.time) -> None:
+        """Setup code
+
+        :param path: the database file, defaults to responses.sqlite3 in the user's cache directory (see
+            pvoutput.utils.user_dir), which only they can use - anyone who can write to it can change what getstatus returns
+        :type path: str or pathlib.Path
+        :param ttl: how long to keep responses for, in seconds, defaults to the start of the client's next stats_period
+        :type ttl: float
+        :param clock: returns the current unix time, for testing
+        :type clock: callable
+        """
+        super().__init__(ttl=ttl, clock=clock)
+        self.path = Path(path) if path is not None else user_dir("cache") / "responses.sqlite3"
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)")
+
+    def close(self) -> None:
+        """Closes the database."""
+        self._connection.close()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, self.clock())).fetchone()
+        return None if row is None else str(row[0])
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = self.clock()
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._connection.execute("INSERT OR REPLACE INTO responses (key, expires_at, value) VALUES (?, ?, ?)", (key, now + ttl, value))
+
+    def invalidate(self, prefix: str = "") -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
@@ -0,0 +1,177 @@
+"""Column-oriented parsing of multi-row getstatus responses
+
+Parsing a row at a time into dicts (see utils.responsedata_to_response) is the slow part of downloading history,
+this parses a whole response into one array per field instead, and only builds dicts if you ask for them.
+"""
+
+from array import array
+import calendar
+from datetime import datetime, timedelta
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+__all__ = [
+    "StatusColumns",
+    "parse_status_columns",
+    "STATUS_LAYOUT",
+    "HISTORY_LAYOUT",
+    "epoch_seconds",
+]
+
+EXTENDED_FIELDS = ("v7", "v8", "v9", "v10", "v11", "v12")
+
+# the fields in each row of a getstatus response, see utils.responsedata_to_response
+STATUS_LAYOUT = ("d", "t", "v1", "v2", "v3", "v4", "v5", "v6", "normalised_output") + EXTENDED_FIELDS
+# the fields in each row of a getstatus history response, see utils.history_row_to_response
+HISTORY_LAYOUT = ("d", "t", "v1", "energy_efficiency", "v2", "average_power", "normalised_output", "v3", "v4", "v5", "v6") + EXTENDED_FIELDS
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    """days since 1970-01-01 for a date in the proleptic Gregorian calendar
+    based on http://howardhinnant.github.io/date_algorithms.html#days_from_civil
+    """
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _date_seconds(date_string: str) -> int:
+    """seconds from the epoch to the start of a YYYYMMDD date"""
+    if len(date_string) != 8 or not date_string.isdigit():
+        raise ValueError(f"Invalid date '{date_string}'")
+    year, month, day = int(date_string[:4]), int(date_string[4:6]), int(date_string[6:])
+    # the same dates utils.parse_timestamp (and datetime) accepts, so 20240231 isn't quietly read as March
+    if year < 1 or not 1 <= month <= 12 or not 1 <= day <= calendar.monthrange(year, month)[1]:
+        raise ValueError(f"Invalid date '{date_string}'")
+    return _days_from_civil(year, month, day) * 86400
+
+
+def _time_seconds(time_string: str) -> int:
+    """seconds from midnight for a HH:MM time"""
+    hour, minute = time_string.split(":")
+    if not 0 <= int(hour) <= 23 or not 0 <= int(minute) <= 59:
+        raise ValueError(f"Invalid time '{time_string}'")
+    return int(hour) * 3600 + int(minute) * 60
+
+
+def epoch_seconds(date_string: str, time_string: str) -> int:
+    """Turns a PVOutput date (YYYYMMDD) and time (HH:MM) into seconds since 1970-01-01 00:00.
+
+    PVOutput's times are local to the system, and so is this - it's the same as treating the naive datetime as UTC.
+    """
+    return _date_seconds(date_string) + _time_seconds(time_string)
+
+
+class StatusColumns:
+    """A multi-row getstatus response, stored as one array per field.
+
+    `timestamps` is an array('q') of epoch_seconds, and `columns` maps each numeric field to an array('d'), with
+    NaN where PVOutput had no data. Rows are only turned into dicts (the same as utils.responsedata_to_response or
+    utils.history_row_to_response would give you) when you index or iterate.
+    """
+
+    __slots__ = ("timestamps", "columns")
+
+    def __init__(self, timestamps: "array[int]", columns: Dict[str, "array[float]"]) -> None:
+        self.timestamps = timestamps
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def column(self, name: str) -> "array[float]":
+        """returns the array for a field, eg "v2" """
+        return self.columns[name]
+
+    def datetimes(self) -> List[datetime]:
+        """the timestamps as naive datetimes"""
+        return [_EPOCH + timedelta(seconds=timestamp) for timestamp in self.timestamps]
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """builds the dict for a row, with NaN turned into None"""
+        timestamp = _EPOCH + timedelta(seconds=self.timestamps[index])
+        row: Dict[str, Any] = {
+            "d": f"{timestamp.year:04}{timestamp.month:02}{timestamp.day:02}",
+            "t": f"{timestamp.hour:02}:{timestamp.minute:02}",
+            "timestamp": timestamp,
+        }
+        for name, values in self.columns.items():
+            value = values[index]
+            row[name] = None if math.isnan(value) else value
+        return row
+
+
+def parse_status_columns(data: Union[str, Iterable[str]], layout: Sequence[str] = HISTORY_LAYOUT) -> StatusColumns:
+    """Parses a multi-row getstatus response into columns.
+
+    :param data: the response body (rows separated by `;`), or the rows themselves
+    :type data: str or iterable of str
+
+    :param layout: the names of the fields in each row, HISTORY_LAYOUT or STATUS_LAYOUT
+    :type layout: tuple of str
+
+    :returns: the columns, only including the extended fields if the rows had them
+    :rtype: StatusColumns
+
+    :raises ValueError: if a date, time or value can't be parsed
+    """
+    if isinstance(data, str):
+        fields = _split_uniform(data)
+        if fields is not None:
+            return _build_columns(fields, layout)
+        data = data.split(";")
+    rows = [row.strip().split(",") for row in data if row.strip()]
+    if not rows:
+        return StatusColumns(array("q"), {name: array("d") for name in layout[2:] if name not in EXTENDED_FIELDS})
+
+    width = min(max(len(row) for row in rows), len(layout))
+    for row in rows:
+        if len(row) < width:
+            row.extend(["NaN"] * (width - len(row)))
+    return _build_columns(list(zip(*rows)), layout)
+
+
+def _split_uniform(data: str) -> Optional[List[Sequence[str]]]:
+    """splits a response body straight into fields, if every row's the same width, otherwise returns None
+
+    Splitting the whole body at once and slicing out each field is a lot quicker than splitting each row.
+    """
+    data = data.strip().strip(";")
+    if not data:
+        return None
+    row_count = data.count(";") + 1
+    flat = data.replace(";", ",").split(",")
+    width, remainder = divmod(len(flat), row_count)
+    if remainder or width < 2:
+        return None
+    fields: List[Sequence[str]] = [flat[index::width] for index in range(width)]
+    # only the times have a colon in them, so if every row's lined up they'll all be in the second field
+    if not all(":" in time_string for time_string in fields[1]):
+        return None
+    return fields
+
+
+def _build_columns(fields: List[Sequence[str]], layout: Sequence[str]) -> StatusColumns:
+    """turns the fields (one sequence of strings per field, all the same length) into a StatusColumns"""
+    dates, times = fields[0], fields[1]
+    # most rows share a date, and there's only 1440 possible times, so each one is only parsed once
+    date_seconds = {date_string: _date_seconds(date_string) for date_string in set(dates)}
+    time_seconds = {time_string: _time_seconds(time_string) for time_string in set(times)}
+    timestamps = array("q", [date_seconds[date_string] + time_seconds[time_string] for date_string, time_string in zip(dates, times)])
+
+    # float() parses "NaN" to nan, so no special-casing is needed
+    width = min(len(fields), len(layout))
+    columns = {name: array("d", map(float, fields[index])) for index, name in enumerate(layout[2:width], start=2)}
+    return StatusColumns(timestamps, columns)
@@ -0,0 +1,226 @@
+"""Turning lifetime energy meter readings into what PVOutput wants
+
+Meters and inverters usually count energy since they were installed, and the counters wrap around (or get reset
+when the hardware's replaced). PVOutput takes either the energy so far today, or lifetime totals with the c1 flag
+set (see pvoutput.parameters.ADDSTATUS_PARAMETERS). A CumulativeConverter takes the raw readings as they come,
+unwraps them into a total which only goes up (ignoring the odd reading that's a little lower than the last), and
+gives you either.
+
+It can keep its state in a small JSON file, so a restart carries on from the last reading rather than losing
+the day's total.
+
+```python
+converter = CumulativeConverter(path="/var/lib/pvoutput/meter.json", rollover=1_000_000_000)
+converter.update(datetime.now(), generation=read_generation_meter())
+pvo.addstatus(converter.status())        # v1 is today's generation
+# or
+pvo.addstatus(converter.c1_status())     # v1 is the lifetime generation, with c1 set
+```
+"""
+
+from datetime import date, datetime
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .status import Status
+
+__all__ = [
+    "CumulativeConverter",
+]
+
+COUNTERS = ("generation", "consumption")
+
+LOGGER = logging.getLogger(__name__)
+
+# drops in a reading of up to this many Wh are taken as jitter, never a meter starting again
+DEFAULT_JITTER = 1000.0
+# and bigger ones only when the reading's fallen below this fraction of the last one
+RESET_FRACTION = 0.5
+
+# the c1 flag for which of the counters are lifetime totals, see ADDSTATUS_PARAMETERS
+C1_FLAGS = {("generation", "consumption"): 1, ("generation",): 2, ("consumption",): 3}
+
+
+class _Counter:
+    """the unwrapped state of one meter"""
+
+    __slots__ = ("last", "offset", "today")
+
+    def __init__(self, last: Optional[float] = None, offset: float = 0.0, today: float = 0.0) -> None:
+        # the last raw reading
+        self.last = last
+        # added to the raw reading to get the unwrapped total, it goes up each time the meter wraps or resets
+        self.offset = offset
+        # energy since the start of the day
+        self.today = today
+
+    @property
+    def total(self) -> Optional[float]:
+        """the unwrapped lifetime total"""
+        return None if self.last is None else self.last + self.offset
+
+    def update(self, reading: float, rollover: Optional[float], jitter: float) -> float:
+        """takes a raw reading, returning the energy since the last one"""
+        if reading < 0:
+            raise ValueError(f"meter readings can't be negative, got {reading}")
+        if self.last is None:
+            self.last = reading
+            return 0.0
+        previous = self.last + self.offset
+        if reading < self.last:
+            if rollover is not None and reading + rollover - self.last < rollover / 2:
+                # the meter wrapped around, and it's not gone far since
+                self.offset += rollover
+            elif self.last - reading > jitter and reading < self.last * RESET_FRACTION:
+                # the meter's started again from zero, eg it was replaced
+                self.offset += self.last
+            else:
+                # jitter, or a bad reading - wait for the meter to catch up with the last one
+                LOGGER.warning("Ignoring a meter reading of %s Wh, it's lower than the last one (%s Wh)", reading, self.last)
+                return 0.0
+        self.last = reading
+        return reading + self.offset - previous
+
+    def reset(self) -> None:
+        """the meter's been reset, so the next reading carries on from the total so far"""
+        if self.last is not None:
+            self.offset += self.last
+            self.last = 0.0
+
+
+class CumulativeConverter:
+    """Turns lifetime generation and consumption meter readings (in Wh) into daily totals, or c1 lifetime totals.
+
+    If a reading's lower than the last one, it's treated as:
+
+    * the meter wrapping around, if you set rollover (the value it wraps at) and the reading's less than half of
+      rollover past the last one
+    * the meter starting again from zero (eg it was replaced), if it's dropped by more than jitter and to less than
+      half of the last reading
+    * otherwise jitter or a bad reading, which is logged and ignored until the meter's back past the last reading
+
+    and the totals carry on from where they were. Call reset() if you know a meter's been reset. Readings need to be
+    in order.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None, rollover: Optional[float] = None, jitter: float = DEFAULT_JITTER) -> None:
+        """Setup code
+
+        :param path: a JSON file to keep the state in, it's read now if it exists and written after each update
+        :type path: str or pathlib.Path
+        :param rollover: the reading the meters wrap around at, in Wh, eg 1,000,000,000 for a six digit kWh meter
+        :type rollover: float
+        :param jitter: drops in a reading of up to this many Wh are ignored, rather than taken as the meter starting again
+        :type jitter: float
+        """
+        self.path = Path(path) if path is not None else None
+        self.rollover = rollover
+        self.jitter = jitter
+        self.counters = {name: _Counter() for name in COUNTERS}
+        self.day: Optional[date] = None
+        self.timestamp: Optional[datetime] = None
+        if self.path is not None and self.path.exists():
+            self.load_state(self._read(self.path))
+
+    @staticmethod
+    def _read(path: Path) -> Dict[str, Any]:
+        """the saved state, or nothing if the file's broken"""
+        try:
+            state: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            # a half-written or otherwise broken file, start again
+            return {}
+        return state
+
+    def state(self) -> Dict[str, Any]:
+        """The state as a JSON-friendly dict, if you'd rather keep it somewhere other than a file, see load_state."""
+        return {
+            "timestamp": None if self.timestamp is None else self.timestamp.isoformat(),
+            "counters": {name: {"last": counter.last, "offset": counter.offset, "today": counter.today} for name, counter in self.counters.items()},
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Carries on from a state from the state method."""
+        if state.get("timestamp"):
+            self.timestamp = datetime.fromisoformat(state["timestamp"])
+            self.day = self.timestamp.date()
+        for name, values in state.get("counters", {}).items():
+            if name in self.counters:
+                self.counters[name] = _Counter(values.get("last"), values.get("offset", 0.0), values.get("today", 0.0))
+
+    def save(self) -> None:
+        """Writes the state to path, replacing the file in one go so it's never half-written."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file_handle:
+                json.dump(self.state(), file_handle)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def update(self, timestamp: datetime, generation: Optional[float] = None, consumption: Optional[float] = None) -> None:
+        """Takes a reading from one or both meters.
+
+        :param timestamp: when the readings were taken, in the system's local time
+        :type timestamp: datetime.datetime
+        :param generation: the generation meter's reading, in Wh
+        :type generation: float
+        :param consumption: the consumption meter's reading, in Wh
+        :type consumption: float
+
+        :raises ValueError: if the readings are older than the last ones, or negative
+        """
+        if self.timestamp is not None and timestamp < self.timestamp:
+            raise ValueError(f"readings need to be in order, got {timestamp} after {self.timestamp}")
+        if timestamp.date() != self.day:
+            self.day = timestamp.date()
+            for counter in self.counters.values():
+                counter.today = 0.0
+        for name, reading in (("generation", generation), ("consumption", consumption)):
+            if reading is not None:
+                counter = self.counters[name]
+                counter.today += counter.update(reading, self.rollover, self.jitter)
+        self.timestamp = timestamp
+        self.save()
+
+    def reset(self, generation: bool = True, consumption: bool = True) -> None:
+        """Marks meters as having been reset (eg replaced), so their next readings carry on from the totals so far."""
+        for name, chosen in (("generation", generation), ("consumption", consumption)):
+            if chosen:
+                self.counters[name].reset()
+        self.save()
+
+    def _tracked(self) -> Tuple[datetime, Dict[str, _Counter]]:
+        """the time of the last readings, and the counters which have had a reading"""
+        if self.timestamp is None:
+            raise ValueError("there haven't been any readings yet")
+        return self.timestamp, {name: counter for name, counter in self.counters.items() if counter.last is not None}
+
+    def status(self) -> Status:
+        """A status for the last readings, with the energy generated (v1) and consumed (v3) so far today."""
+        timestamp, tracked = self._tracked()
+        values: Dict[str, Any] = {
+            field: float(round(tracked[name].today)) for name, field in (("generation", "v1"), ("consumption", "v3")) if name in tracked
+        }
+        return Status(timestamp.replace(second=0, microsecond=0), **values)
+
+    def c1_status(self) -> Dict[str, Any]:
+        """addstatus data for the last readings, with the lifetime totals in v1 and v3 and the matching c1 flag.
+
+        For addstatuses or addbatchstatus, take the c1 key out and pass c1=True instead.
+        """
+        timestamp, tracked = self._tracked()
+        data: Dict[str, Any] = {"d": timestamp.strftime("%Y%m%d"), "t": timestamp.strftime("%H:%M")}
+        for name, field in (("generation", "v1"), ("consumption", "v3")):
+            if name in tracked:
+                data[field] = round(tracked[name].total or 0.0)
+        data["c1"] = C1_FLAGS[tuple(tracked)]
+        return data
@@ -0,0 +1,245 @@
+"""Downsampling high-frequency inverter readings into one status per stats period
+
+Inverters can report every second, but PVOutput takes one status every stats_period minutes. A Downsampler takes
+the readings as they arrive and gives you a pvoutput.status.Status for each period once it's over, ready for
+addstatus or a StatusUploader. Only the period that's still open is kept, as running totals, so memory use doesn't
+grow with the number of readings.
+
+```python
+downsampler = Downsampler(stats_period=pvo.stats_period)
+with StatusUploader(pvo) as uploader:
+    for timestamp, watts, temperature in read_inverter():
+        status = downsampler.add(timestamp, power=watts, temperature=temperature)
+        if status is not None:
+            uploader.put(status)
+```
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from .status import STATUS_VALUES, Status
+
+__all__ = [
+    "Downsampler",
+    "Sample",
+    "DEFAULT_MAX_GAP",
+]
+
+# (timestamp, power (W), energy (Wh), temperature (C), voltage (V)), anything but the timestamp can be None
+Sample = Tuple[datetime, Optional[float], Optional[float], Optional[float], Optional[float]]
+
+# readings further apart than this (in seconds) are treated as a gap in the data, and the energy isn't integrated across it
+DEFAULT_MAX_GAP = 300.0
+
+
+def timestamp_seconds(end: datetime, start: datetime) -> float:
+    """the seconds from start to end"""
+    return (end - start).total_seconds()
+
+
+# pylint: disable=too-many-instance-attributes
+class Downsampler:
+    """Turns a stream of readings into a Status per stats period.
+
+    Each status is timestamped with the end of its period, so readings from 10:00:00 up to 10:04:59 are in the
+    10:05 status (the last one of the day is 23:59, as PVOutput doesn't take 24:00). Its values are:
+
+    * v1 (energy generated today, Wh) - the last energy reading in the period if you pass them (eg the inverter's
+      daily total), otherwise power integrated over time (by the trapezoidal rule) since the first reading of the day,
+      left out until there's been two power readings within max_gap of each other
+    * v2 (power, W) - the time-weighted average power over the period
+    * v5 (temperature, C) and v6 (voltage, V) - the average of the readings
+    * the peak power, in peak_field (eg "v7", which needs a donation) if it's set
+
+    Readings have to arrive in order, and a period's only emitted once a reading from a later one arrives (or you
+    call flush). Periods without any power or energy readings aren't emitted at all, as PVOutput needs one of v1-v4.
+    If the reading that closes a period doesn't have a power value, the last power reading's held to the end of the
+    period (as long as that's within max_gap).
+    """
+
+    def __init__(self, stats_period: int = 5, max_gap: float = DEFAULT_MAX_GAP, peak_field: Optional[str] = None) -> None:
+        """Setup code
+
+        :param stats_period: the length of each period in minutes, the same as the client's stats_period
+        :type stats_period: int
+        :param max_gap: readings further apart than this many seconds aren't integrated between, as the data's missing
+        :type max_gap: float
+        :param peak_field: the field to put the peak power in, eg "v7", or None to leave it out
+        :type peak_field: str
+        """
+        if stats_period <= 0 or 1440 % stats_period:
+            raise ValueError(f"stats_period should divide a day into whole periods, got {stats_period}")
+        if peak_field is not None and peak_field not in STATUS_VALUES:
+            raise ValueError(f"peak_field should be one of v1-v12, got {peak_field}")
+        self.period = timedelta(minutes=stats_period)
+        self.max_gap = max_gap
+        self.peak_field = peak_field
+
+        # the last reading, to check they're in order
+        self._last_time: Optional[datetime] = None
+        # the last power reading, across periods, for integrating from
+        self._power_time: Optional[datetime] = None
+        self._last_power = 0.0
+        # energy integrated since the start of the day (Wh)
+        self._day: Optional[date] = None
+        self._day_energy = 0.0
+        # whether any of the day's energy has been integrated, rather than the readings being too far apart
+        self._day_integrated = False
+        # the open period
+        self._start: Optional[datetime] = None
+        self._reset_period()
+
+    def _reset_period(self) -> None:
+        """clears the running totals for a new period"""
+        self._energy = 0.0
+        self._seconds = 0.0
+        self._peak: Optional[float] = None
+        self._powers = 0
+        self._power_total = 0.0
+        self._energy_reading: Optional[float] = None
+        self._temperature_total = 0.0
+        self._temperatures = 0
+        self._voltage_total = 0.0
+        self._voltages = 0
+
+    def _period_start(self, timestamp: datetime) -> datetime:
+        """the start of the period a reading's in"""
+        midnight = datetime.combine(timestamp.date(), time(), tzinfo=timestamp.tzinfo)
+        return midnight + ((timestamp - midnight) // self.period) * self.period
+
+    def _energy_between(self, start: datetime, end: datetime, next_time: datetime, next_power: float) -> float:
+        """the energy (Wh) from start to end, interpolating linearly between the last power reading and the next one"""
+        if self._power_time is None or timestamp_seconds(end, start) <= 0:
+            return 0.0
+        slope = (next_power - self._last_power) / timestamp_seconds(next_time, self._power_time)
+        start_power = self._last_power + slope * timestamp_seconds(start, self._power_time)
+        end_power = self._last_power + slope * timestamp_seconds(end, self._power_time)
+        return (start_power + end_power) / 2 * timestamp_seconds(end, start) / 3600
+
+    def _integrate(self, start: datetime, end: datetime, next_time: datetime, next_power: float) -> None:
+        """adds the energy from start to end to the open period, and the day's total"""
+        energy = self._energy_between(start, end, next_time, next_power)
+        self._energy += energy
+        self._day_energy += energy
+        self._day_integrated = True
+        self._seconds += timestamp_seconds(end, start)
+
+    def _open(self, start: datetime) -> None:
+        """opens a new period, starting a new day's energy total if it's the first period of the day"""
+        if start.date() != self._day:
+            self._day = start.date()
+            self._day_energy = 0.0
+            self._day_integrated = False
+        self._start = start
+        self._reset_period()
+
+    def add(
+        self,
+        timestamp: datetime,
+        power: Optional[float] = None,
+        energy: Optional[float] = None,
+        temperature: Optional[float] = None,
+        voltage: Optional[float] = None,
+    ) -> Optional[Status]:
+        """Adds a reading, returning the status for the previous period if this reading's the first in a new one.
+
+        :param timestamp: when the reading was taken, in the system's local time
+        :type timestamp: datetime.datetime
+        :param power: power generation, in W
+        :type power: float
+        :param energy: energy generated today so far, in Wh
+        :type energy: float
+        :param temperature: temperature, in C
+        :type temperature: float
+        :param voltage: voltage, in V
+        :type voltage: float
+
+        :raises ValueError: if the reading's older than the last one
+        """
+        if self._last_time is not None and timestamp < self._last_time:
+            raise ValueError(f"readings need to be in order, got {timestamp} after {self._last_time}")
+        self._last_time = timestamp
+
+        # only integrate between power readings which are close enough together
+        integrate = power is not None and self._power_time is not None and 0 < timestamp_seconds(timestamp, self._power_time) <= self.max_gap
+        finished = None
+        start = self._period_start(timestamp)
+        if start != self._start:
+            if self._start is not None:
+                end = self._start + self.period
+                if integrate and power is not None and self._power_time is not None:
+                    # the energy up to the end of the open period is part of it
+                    self._integrate(max(self._power_time, self._start), end, timestamp, power)
+                    if start.date() == self._start.date():
+                        # anything in the (empty) periods between is still part of the day
+                        self._day_energy += self._energy_between(end, start, timestamp, power)
+                elif power is None and self._power_time is not None and timestamp_seconds(end, self._power_time) <= self.max_gap:
+                    # there's no power reading to interpolate to, so the last one's held to the end of the period
+                    self._integrate(max(self._power_time, self._start), end, end, self._last_power)
+                finished = self._emit()
+            self._open(start)
+
+        if power is not None:
+            if integrate and self._power_time is not None:
+                self._integrate(max(self._power_time, start), timestamp, timestamp, power)
+            self._power_time = timestamp
+            self._last_power = power
+            self._powers += 1
+            self._power_total += power
+            self._peak = power if self._peak is None else max(self._peak, power)
+        if energy is not None:
+            self._energy_reading = energy
+        if temperature is not None:
+            self._temperature_total += temperature
+            self._temperatures += 1
+        if voltage is not None:
+            self._voltage_total += voltage
+            self._voltages += 1
+        return finished
+
+    def _emit(self) -> Optional[Status]:
+        """the status for the open period, or None if it didn't have any power or energy readings"""
+        if self._start is None:
+            return None
+        if not (self._powers or self._seconds or self._energy_reading is not None):
+            # a status with only temperature or voltage isn't one PVOutput will take
+            self._start = None
+            return None
+        end = self._start + self.period
+        if end.date() != self._start.date():
+            end = datetime.combine(self._start.date(), time(23, 59), tzinfo=self._start.tzinfo)
+        values: Dict[str, Any] = {}
+        if self._energy_reading is not None:
+            values["v1"] = float(round(self._energy_reading))
+        elif self._day_integrated:
+            # without any integrated energy there's no telling what's been generated, rather than it being nothing
+            values["v1"] = float(round(self._day_energy))
+        if self._seconds:
+            values["v2"] = float(round(self._energy * 3600 / self._seconds))
+        elif self._powers:
+            values["v2"] = float(round(self._power_total / self._powers))
+        if self._temperatures:
+            values["v5"] = self._temperature_total / self._temperatures
+        if self._voltages:
+            values["v6"] = self._voltage_total / self._voltages
+        if self.peak_field is not None and self._peak is not None:
+            values[self.peak_field] = float(round(self._peak))
+        self._start = None
+        return Status(end, **values)
+
+    def flush(self) -> Optional[Status]:
+        """Closes the open period early, returning its status (or None if there wasn't one), eg when you're shutting down."""
+        status = self._emit()
+        self._reset_period()
+        return status
+
+    def downsample(self, samples: Iterable[Sample]) -> Iterator[Status]:
+        """Yields the statuses for a stream of (timestamp, power, energy, temperature, voltage) readings, flushing at the end."""
+        for timestamp, power, energy, temperature, voltage in samples:
+            status = self.add(timestamp, power, energy, temperature, voltage)
+            if status is not None:
+                yield status
+        status = self.flush()
+        if status is not None:
+            yield status
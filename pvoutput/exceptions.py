@@ -1,5 +1,10 @@
 """Custom exceptions."""
 
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple, Type
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .status import StatusLike
+
 
 class DonationRequired(Exception):
     """A custom exception for when you call a method that requires a donation-enabled account"""
@@ -15,3 +20,194 @@ class InvalidRegexpError(Exception):
 
 class UnknownAlertTypeError(Exception):
     """The provided Alert Type is not supported"""
+
+
+class RateLimitExceeded(Exception):
+    """The call would go over the rate limit, and the rate limiter isn't allowed to wait"""
+
+    # the budget comes back, so it's worth trying again later
+    retryable = True
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BatchValidationError(ValueError):
+    """Some of a set of statuses are invalid.
+
+    `errors` has an (index, status, exception) for each invalid one, and `valid` has the rest, validated and ready to send.
+    """
+
+    def __init__(self, errors: List[Tuple[int, "StatusLike", Exception]], valid: List[Dict[str, Any]]) -> None:
+        summary = "; ".join(f"status {index}: {error}" for index, _, error in errors[:5])
+        if len(errors) > 5:
+            summary += f"; and {len(errors) - 5} more"
+        super().__init__(f"{len(errors)} of {len(errors) + len(valid)} statuses are invalid - {summary}")
+        self.errors = errors
+        self.valid = valid
+
+
+class StatusesNotAddedError(Exception):
+    """PVOutput didn't add some statuses from a batch upload, even after they were sent again.
+
+    `rows` has the statuses it didn't add, as they were sent.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        summary = ", ".join(f"{row.get('d', '')} {row['t']}".strip() for row in rows[:5])
+        if len(rows) > 5:
+            summary += f" and {len(rows) - 5} more"
+        super().__init__(f"PVOutput didn't add {len(rows)} statuses - {summary}")
+        self.rows = rows
+
+
+class PVOutputError(Exception):
+    """An error response from PVOutput.
+
+    The subclasses say what went wrong, and `retryable` says whether making the same call again could work.
+    The message is the same as the body PVOutput sent, prefixed with the HTTP status, eg "HTTP400: Bad request 400: Invalid date format".
+    """
+
+    retryable = False
+
+    def __init__(self, status: int, body: str, headers: Optional[Mapping[str, str]] = None) -> None:
+        super().__init__(f"HTTP{status}: {body}")
+        self.status = status
+        self.body = body
+        self.headers: Dict[str, str] = dict(headers or {})
+
+
+class BadRequestError(PVOutputError, ValueError):
+    """HTTP 400, the call was wrong. It's a ValueError, as that's what was raised before these existed."""
+
+
+class DateTooOldError(BadRequestError):
+    """The date's further back than PVOutput accepts, 14 days (or 90 if you've donated)"""
+
+
+class DateInFutureError(BadRequestError):
+    """The date or time's in the future"""
+
+
+class InvalidDateTimeError(BadRequestError):
+    """The date or time isn't in a format PVOutput understands"""
+
+
+class InvalidDataError(BadRequestError):
+    """One of the values is invalid, or out of range"""
+
+
+class NoStatusFoundError(BadRequestError):
+    """There's no status for the date/time asked for"""
+
+
+class InvalidSystemError(BadRequestError):
+    """The system ID's invalid, or doesn't belong to the API key"""
+
+
+class DonationRequiredError(BadRequestError, DonationRequired):
+    """The call, or one of its values, needs a donation-enabled account"""
+
+
+class AuthenticationError(PVOutputError):
+    """HTTP 401, the API key's missing, invalid or disabled"""
+
+
+class UnauthorisedSystemError(AuthenticationError, InvalidSystemError):
+    """HTTP 401 for the system ID, it's both an AuthenticationError (as it's a 401) and an InvalidSystemError"""
+
+
+class ForbiddenError(PVOutputError):
+    """HTTP 403, the API key's not allowed to do this"""
+
+
+class ReadOnlyKeyError(ForbiddenError):
+    """The call needs a read/write API key"""
+
+
+class RateLimitedError(ForbiddenError):
+    """The rate limit's been hit, `reset_at` is the unix time it resets (from X-Rate-Limit-Reset, None if it wasn't sent)"""
+
+    retryable = True
+
+    def __init__(self, status: int, body: str, headers: Optional[Mapping[str, str]] = None) -> None:
+        super().__init__(status, body, headers)
+        self.reset_at: Optional[float] = None
+        for name, value in self.headers.items():
+            if name.lower() == "x-rate-limit-reset":
+                try:
+                    self.reset_at = float(value)
+                except ValueError:
+                    pass
+
+
+class MethodNotAllowedError(PVOutputError):
+    """HTTP 405, the wrong HTTP method was used"""
+
+
+class ServerError(PVOutputError):
+    """HTTP 5xx, something went wrong at PVOutput's end"""
+
+    retryable = True
+
+
+# bits of PVOutput's error messages, and what they mean
+# <https://pvoutput.org/help/api_specification.html#error-messages>
+ERROR_MESSAGES: Tuple[Tuple[int, str, Type[PVOutputError]], ...] = (
+    (400, "date is older than", DateTooOldError),
+    (400, "date too old", DateTooOldError),
+    (400, "in the future", DateInFutureError),
+    (400, "date too new", DateInFutureError),
+    (400, "invalid date", InvalidDateTimeError),
+    (400, "invalid time", InvalidDateTimeError),
+    (400, "no status found", NoStatusFoundError),
+    (400, "invalid system id", InvalidSystemError),
+    (400, "donation", DonationRequiredError),
+    (400, "invalid", InvalidDataError),
+    (400, "too large", InvalidDataError),
+    (400, "too high", InvalidDataError),
+    (400, "moon powered", InvalidDataError),
+    (401, "invalid system id", UnauthorisedSystemError),
+    (403, "exceeded number", RateLimitedError),
+    (403, "read only key", ReadOnlyKeyError),
+    (403, "donation", DonationRequiredError),
+)
+
+# the fallback for each status, if the message isn't recognised
+ERROR_STATUSES: Dict[int, Type[PVOutputError]] = {
+    400: BadRequestError,
+    401: AuthenticationError,
+    403: ForbiddenError,
+    405: MethodNotAllowedError,
+}
+
+
+def error_from_response(status: int, body: str, headers: Optional[Mapping[str, str]] = None) -> Optional[PVOutputError]:
+    """Turns an error response into the matching exception.
+
+    :param status: the HTTP status
+    :type status: int
+    :param body: the response body
+    :type body: str
+    :param headers: the response headers
+    :type headers: dict
+
+    :returns: the exception to raise, None if it's not an error (or not one PVOutput documents)
+    :rtype: PVOutputError
+    """
+    body = body.strip()
+    message = body.lower()
+    # PVOutput says you're over the rate limit with a 403, but the headers are the surest way to tell
+    for name, value in (headers or {}).items():
+        if status == 403 and name.lower() == "x-rate-limit-remaining" and value.strip() == "0":
+            return RateLimitedError(status, body, headers)
+    for error_status, text, error_class in ERROR_MESSAGES:
+        if status == error_status and text in message:
+            return error_class(status, body, headers)
+    if status >= 500:
+        return ServerError(status, body, headers)
+    fallback = ERROR_STATUSES.get(status)
+    if fallback is None:
+        return None
+    return fallback(status, body, headers)
@@ -0,0 +1,103 @@
+"""Turning status history into NumPy arrays or pandas DataFrames
+
+NumPy and pandas aren't installed with pvoutput, install them with `pip install pvoutput[numpy]` or `pip install pvoutput[pandas]`.
+The arrays are built straight from the columns in a pvoutput.columnar.StatusColumns, so no dicts are made along the way.
+
+```python
+frame = to_dataframe(pvo.getstatus_history_columns(date_val=datetime.date(2021, 2, 28)))
+```
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Sequence, Union
+
+from .columnar import HISTORY_LAYOUT, StatusColumns, parse_status_columns
+
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy
+    import pandas
+
+__all__ = [
+    "to_numpy",
+    "to_dataframe",
+]
+
+ExportData = Union[str, StatusColumns, Iterable[StatusColumns]]
+
+
+def _import(module: str, extra: str) -> Any:
+    """imports an optional dependency, with a helpful error if it's not there"""
+    try:
+        return importlib.import_module(module)
+    except ImportError as error:
+        raise ImportError(f"{module} is needed for this, install it with `pip install pvoutput[{extra}]`") from error
+
+
+def _numpy_columns(data: ExportData, layout: Sequence[str], extra: str) -> Dict[str, "numpy.ndarray[Any, Any]"]:
+    """turns the data into a numpy array per field, starting with the timestamps as datetime64[s]
+
+    Several StatusColumns (eg, a day each) are joined together, with NaN filling any fields which some of them are missing.
+    """
+    np = _import("numpy", extra)
+    if isinstance(data, str):
+        data = parse_status_columns(data, layout)
+    parts: List[StatusColumns] = [data] if isinstance(data, StatusColumns) else list(data)
+
+    names: List[str] = []
+    for part in parts:
+        names.extend(name for name in part.columns if name not in names)
+    # keep the fields in the order PVOutput sends them
+    names.sort(key=lambda name: layout.index(name) if name in layout else len(layout))
+
+    result: Dict[str, "numpy.ndarray[Any, Any]"] = {
+        "timestamp": np.concatenate([np.frombuffer(part.timestamps, dtype=np.int64) for part in parts] or [np.empty(0, dtype=np.int64)]).view(
+            "datetime64[s]"
+        )
+    }
+    for name in names:
+        result[name] = np.concatenate(
+            [np.frombuffer(part.columns[name], dtype=np.float64) if name in part.columns else np.full(len(part), np.nan) for part in parts]
+        )
+    return result
+
+
+def to_numpy(data: ExportData, layout: Sequence[str] = HISTORY_LAYOUT) -> "numpy.ndarray[Any, Any]":
+    """Turns status history into a NumPy structured array.
+
+    :param data: the output of getstatus_history_columns, a list of them (eg, a day each) or a raw getstatus history response
+    :type data: pvoutput.columnar.StatusColumns, list of them, or str
+
+    :param layout: if data is a raw response, the layout to parse it with, see pvoutput.columnar.parse_status_columns
+    :type layout: tuple of str
+
+    :returns: an array with a datetime64[s] "timestamp" field, then a float64 field for each value, with NaN where there's no data
+    :rtype: numpy.ndarray
+
+    :raises ImportError: if NumPy isn't installed
+    """
+    np = _import("numpy", "numpy")
+    columns = _numpy_columns(data, layout, "numpy")
+    result = np.empty(len(columns["timestamp"]), dtype=[(name, values.dtype) for name, values in columns.items()])
+    for name, values in columns.items():
+        result[name] = values
+    return result  # type: ignore[no-any-return]
+
+
+def to_dataframe(data: ExportData, layout: Sequence[str] = HISTORY_LAYOUT) -> "pandas.DataFrame":
+    """Turns status history into a pandas DataFrame.
+
+    :param data: the output of getstatus_history_columns, a list of them (eg, a day each) or a raw getstatus history response
+    :type data: pvoutput.columnar.StatusColumns, list of them, or str
+
+    :param layout: if data is a raw response, the layout to parse it with, see pvoutput.columnar.parse_status_columns
+    :type layout: tuple of str
+
+    :returns: a frame indexed by "timestamp", with a float64 column for each value, with NaN where there's no data
+    :rtype: pandas.DataFrame
+
+    :raises ImportError: if pandas isn't installed
+    """
+    pd = _import("pandas", "pandas")
+    columns = _numpy_columns(data, layout, "pandas")
+    index = pd.DatetimeIndex(columns.pop("timestamp"), name="timestamp")
+    return pd.DataFrame(columns, index=index)  # type: ignore[no-any-return]
@@ -0,0 +1,195 @@
+"""Calling the PVOutput API for many systems at once, with the synchronous client"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional, TypeVar, Union
+
+from pvoutput import PVOutput
+from pvoutput.base import copy_arguments
+from pvoutput.cache import ResponseCache
+from pvoutput.ratelimit import RateLimiter
+from pvoutput.transport import httpx_client, requests_session
+
+if TYPE_CHECKING:  # pragma: no cover
+    import httpx
+    import requests
+
+__all__ = [
+    "MultiSystemPVOutput",
+]
+
+DEFAULT_MAX_WORKERS = 8
+
+T = TypeVar("T")
+
+
+class MultiSystemPVOutput:
+    """Manages a PVOutput client per system, all sharing one connection pool (and rate limiter and cache, if you set them),
+    and runs calls against many systems at once from a thread pool.
+
+    ```python
+    with MultiSystemPVOutput(apikey=apikey, systemids=[1234, 5678]) as multi:
+        statuses = multi.getstatus()  # {1234: {...}, 5678: {...}}
+    ```
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        apikey: str,
+        systemids: Iterable[int] = (),
+        donation_made: bool = False,
+        stats_period: int = 5,
+        session: Union["requests.Session", "httpx.Client", None] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        per_system_concurrency: int = 1,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        transport: str = "requests",
+    ) -> None:
+        """Setup code
+
+        :param apikey: API key used for the systems, unless add_system is given another one
+        :type apikey: str
+        :param systemids: the systems to manage, more can be added with add_system
+        :type systemids: iterable of ints
+        :param donation_made: Whether to use the donation-required fields
+        :type donation_made: bool
+        :param session: the session all the clients share, it's left open by close() - if unset one's created with a pool of max_workers connections
+        :type session: requests.Session
+        :param max_workers: the most calls to run at once, across all the systems
+        :type max_workers: int
+        :param per_system_concurrency: the most calls to run at once for any one system
+        :type per_system_concurrency: int
+        :param rate_limiter: shared by all the clients, it keeps a separate budget per system
+        :type rate_limiter: pvoutput.ratelimit.RateLimiter
+        :param cache: shared by all the clients, see pvoutput.cache
+        :type cache: pvoutput.cache.ResponseCache
+        :param transport: the HTTP library the clients use, with "httpx" they share HTTP/2 connections, see pvoutput.transport
+        :type transport: str
+        """
+        # only a session that's created here is closed by close()
+        self._owns_session = session is None
+        if session is None and transport == "httpx":
+            session = httpx_client(pool_maxsize=max_workers)
+        elif session is None:
+            # requests' defaults, apart from the pool size
+            session = requests_session(pool_connections=10, pool_maxsize=max_workers, max_retries=0)
+        self.session = session
+        self.transport = transport
+        self.apikey = apikey
+        self.donation_made = donation_made
+        self.stats_period = stats_period
+        self.per_system_concurrency = per_system_concurrency
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.clients: Dict[int, PVOutput] = {}
+        self._semaphores: Dict[int, threading.Semaphore] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pvoutput-multi")
+        for systemid in systemids:
+            self.add_system(systemid)
+
+    def __enter__(self) -> "MultiSystemPVOutput":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops the thread pool and closes the shared session, if it was created here rather than passed in."""
+        self._executor.shutdown(wait=True)
+        if self._owns_session:
+            self.session.close()
+
+    def add_system(self, systemid: int, apikey: Optional[str] = None, donation_made: Optional[bool] = None) -> PVOutput:
+        """Adds a system, returning its client.
+
+        :param systemid: system ID
+        :type systemid: int
+        :param apikey: if this system needs a different API key
+        :type apikey: str
+        :param donation_made: if this system's account is different
+        :type donation_made: bool
+        """
+        client = PVOutput(
+            apikey=self.apikey if apikey is None else apikey,
+            systemid=systemid,
+            donation_made=self.donation_made if donation_made is None else donation_made,
+            stats_period=self.stats_period,
+            session=self.session,
+            rate_limiter=self.rate_limiter,
+            cache=self.cache,
+            transport=self.transport,
+        )
+        self.clients[systemid] = client
+        self._semaphores[systemid] = threading.Semaphore(self.per_system_concurrency)
+        return client
+
+    def client(self, systemid: int) -> PVOutput:
+        """Returns the client for a system.
+
+        :raises KeyError: if the system hasn't been added
+        """
+        return self.clients[systemid]
+
+    def _run(self, systemid: int, func: Callable[[PVOutput], T]) -> T:
+        """runs func for a system, inside the system's concurrency limit"""
+        with self._semaphores[systemid]:
+            return func(self.clients[systemid])
+
+    def map(
+        self,
+        func: Callable[[PVOutput], T],
+        systemids: Optional[Iterable[int]] = None,
+        return_exceptions: bool = False,
+    ) -> Dict[int, Union[T, Exception]]:
+        """Calls func with the client for each system, concurrently.
+
+        :param func: called with each system's client, eg `lambda client: client.getstatus()`
+        :type func: callable
+        :param systemids: the systems to call it for, defaults to all of them
+        :type systemids: iterable of ints
+        :param return_exceptions: if True, a failed call's exception is returned in its place, otherwise the first one is raised
+        :type return_exceptions: bool
+
+        :returns: the results, keyed by system ID
+        :rtype: dict
+        """
+        systemids = list(self.clients if systemids is None else systemids)
+        for systemid in systemids:
+            if systemid not in self.clients:
+                raise KeyError(f"system {systemid} hasn't been added")
+        futures = {systemid: self._executor.submit(self._run, systemid, func) for systemid in systemids}
+        results: Dict[int, Union[T, Exception]] = {}
+        for systemid, future in futures.items():
+            error = future.exception()
+            if error is None:
+                results[systemid] = future.result()
+            elif return_exceptions and isinstance(error, Exception):
+                results[systemid] = error
+            else:
+                raise error
+        return results
+
+    def call(self, method: str, *args: Any, systemids: Optional[Iterable[int]] = None, return_exceptions: bool = False, **kwargs: Any) -> Dict[int, Any]:
+        """Calls a PVOutput method with the same arguments for each system, eg `multi.call("addstatus", {"v2": 500})`
+
+        Dict arguments are copied for each system, as the clients fill in things like the time.
+
+        :returns: the results, keyed by system ID
+        :rtype: dict
+        """
+
+        def run(client: PVOutput) -> Any:
+            call_args, call_kwargs = copy_arguments(args, kwargs)
+            return getattr(client, method)(*call_args, **call_kwargs)
+
+        return self.map(run, systemids=systemids, return_exceptions=return_exceptions)
+
+    def getstatus(self, systemids: Optional[Iterable[int]] = None, return_exceptions: bool = False) -> Dict[int, Any]:
+        """Gets the status of each system, see PVOutput.getstatus
+
+        :returns: the statuses, keyed by system ID
+        :rtype: dict
+        """
+        return self.map(lambda client: client.getstatus(), systemids=systemids, return_exceptions=return_exceptions)
@@ -2,21 +2,56 @@
 
 from copy import copy
 from datetime import date, datetime, time
+import re
+from typing import Any, Callable, Dict, FrozenSet, Optional, Pattern, Tuple, Union
 
-
-from .utils import ALERT_TYPES, validate_delete_status_date
+from .exceptions import DonationRequired, InvalidRegexpError
+from .utils import ALERT_TYPES, parse_date, validate_delete_status_date
 
 __all__ = [
     "ADDOUTPUT_PARAMETERS",
     "ADDSTATUS_PARAMETERS",
     "CALL_PARAMETERS",
     "DELETESTATUS_PARAMETERS",
+    "GETSTATUS_HISTORY_PARAMETERS",
     "DELETE_NOTIFICATION_PARAMETERS",
     "REGISTER_NOTIFICATION_PARAMETERS",
     "DEFAULT_REQUEST_TIMEOUT",
+    "STREAM_CHUNK_SIZE",
+    "DEFAULT_POOL_CONNECTIONS",
+    "DEFAULT_POOL_MAXSIZE",
+    "DEFAULT_MAX_RETRIES",
+    "ADDBATCHSTATUS_MAX_SIZE",
+    "ADDBATCHSTATUS_MAX_SIZE_DONATION",
+    "ADDSTATUS_MAX_AGE_DAYS",
+    "ADDSTATUS_MAX_AGE_DAYS_DONATION",
+    "ParameterSchema",
+    "compile_parameters",
+    "ADDSTATUS_SCHEMA",
+    "ADDBATCHSTATUS_SCHEMA",
+    "ADDOUTPUT_SCHEMA",
+    "CALL_SCHEMA",
+    "DELETESTATUS_SCHEMA",
+    "GETSTATUS_HISTORY_SCHEMA",
+    "DELETE_NOTIFICATION_SCHEMA",
+    "REGISTER_NOTIFICATION_SCHEMA",
 ]
 
 DEFAULT_REQUEST_TIMEOUT = 30
+# how much of a streamed response to read at a time, in bytes
+STREAM_CHUNK_SIZE = 8192
+# connection pooling defaults for the synchronous client's requests.Session
+DEFAULT_POOL_CONNECTIONS = 1
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_MAX_RETRIES = 0
+
+# the maximum number of statuses in an addbatchstatus call, donators get more
+ADDBATCHSTATUS_MAX_SIZE = 30
+ADDBATCHSTATUS_MAX_SIZE_DONATION = 100
+
+# how far back statuses can be added, donators can go further
+ADDSTATUS_MAX_AGE_DAYS = 14
+ADDSTATUS_MAX_AGE_DAYS_DONATION = 90
 
 standard_parameters = {
     "d": {
@@ -54,6 +89,47 @@ CALL_PARAMETERS = {
         "type": dict,
         "donation_required": False,
     },
+    "stream": {
+        "required": False,
+        "type": bool,
+        "donation_required": False,
+    },
+}
+
+# <https://pvoutput.org/help/api_specification.html#get-status-service> history mode
+GETSTATUS_HISTORY_PARAMETERS = {
+    "date_val": {
+        "required": False,
+        "description": "Date",
+        "type": date,
+        "donation_required": False,
+    },
+    "from_time": {
+        "required": False,
+        "description": "From",
+        "type": time,
+        "donation_required": False,
+    },
+    "to_time": {
+        "required": False,
+        "description": "To",
+        "type": time,
+        "donation_required": False,
+    },
+    "limit": {
+        "required": False,
+        "description": "Limit",
+        "type": int,
+        "donation_required": False,
+        "minval": 1,
+        "maxval": 288,
+    },
+    "ascending": {
+        "required": False,
+        "description": "Ascending",
+        "type": bool,
+        "donation_required": False,
+    },
 }
 
 DELETESTATUS_PARAMETERS = {
@@ -81,16 +157,19 @@ ADDBATCHSTATUS_PARAMETERS = {
     },
     "c1": {
         "required": False,
-        "type": bool,
+        "type": str,
+        "format": r"^1$",
     },
     "n": {
         "required": False,
-        "type": bool,
+        "type": str,
+        "format": r"^1$",
     },
 }
 
 ADDSTATUS_PARAMETERS = {
-    "d": copy(standard_parameters["d"]),
+    # statuses can only be added for the last 14 days, or 90 for donators
+    "d": {**standard_parameters["d"], "max_age_days": (ADDSTATUS_MAX_AGE_DAYS, ADDSTATUS_MAX_AGE_DAYS_DONATION)},
     "t": copy(standard_parameters["t"]),
     "v1": {
         "required": False,
@@ -321,3 +400,174 @@ REGISTER_NOTIFICATION_PARAMETERS["url"] = {
     "type": str,
     "maxlen": 150,
 }
+
+
+# pylint: disable=too-many-instance-attributes,too-few-public-methods
+class ParameterSchema:
+    """A parameter set (eg, ADDSTATUS_PARAMETERS) compiled into lookup tables.
+
+    Walking the raw parameter dicts for every call is slow, so this does all the
+    dict-walking and regexp compilation once, and :meth:`validate` only touches the
+    keys which actually have checks configured.
+    """
+
+    __slots__ = (
+        "apiset",
+        "allowed",
+        "required_oneof",
+        "required_oneof_keys",
+        "presence_checks",
+        "types",
+        "value_checks",
+        "date_windows",
+    )
+
+    def __init__(self, apiset: Dict[str, Any]) -> None:
+        self.apiset = apiset
+        self.allowed: FrozenSet[str] = frozenset(key for key in apiset if key != "required_oneof")
+
+        self.required_oneof: Optional[FrozenSet[str]] = None
+        self.required_oneof_keys: Tuple[str, ...] = ()
+        if "required_oneof" in apiset:
+            self.required_oneof_keys = tuple(apiset["required_oneof"]["keys"])
+            self.required_oneof = frozenset(self.required_oneof_keys)
+
+        # (key, required, has_default, default, maxlen, choices), in the order of the apiset
+        self.presence_checks: Tuple[Tuple[str, bool, bool, Any, Optional[int], Any], ...] = tuple(
+            (
+                key,
+                bool(apiset[key].get("required", False)),
+                "default" in apiset[key],
+                apiset[key].get("default"),
+                apiset[key].get("maxlen"),
+                apiset[key].get("choices"),
+            )
+            for key in apiset
+            if key != "required_oneof" and (apiset[key].get("required", False) or "maxlen" in apiset[key] or "choices" in apiset[key])
+        )
+
+        self.types: Dict[str, Any] = {key: apiset[key]["type"] for key in self.allowed if apiset[key].get("type")}
+
+        # key: (compiled format, format string, validators, donation_required, maxval, minval)
+        self.value_checks: Dict[str, Tuple[Optional[Pattern[str]], Any, Tuple[Callable[[Any], Any], ...], bool, Any, Any]] = {}
+        for key in self.allowed:
+            spec = apiset[key]
+            pattern = self._compile_format(key, spec["format"]) if "format" in spec else None
+            validators = tuple(spec.get("additional_validators", ()))
+            donation_required = bool(spec.get("donation_required"))
+            if pattern is None and not validators and not donation_required and spec.get("maxval") is None and spec.get("minval") is None:
+                continue
+            self.value_checks[key] = (pattern, spec.get("format"), validators, donation_required, spec.get("maxval"), spec.get("minval"))
+
+        # key: (max age in days, max age in days for donators), for YYYYMMDD dates
+        self.date_windows: Dict[str, Tuple[int, int]] = {key: tuple(apiset[key]["max_age_days"]) for key in self.allowed if "max_age_days" in apiset[key]}
+
+    @staticmethod
+    def _compile_format(key: str, format_string: Any) -> Pattern[str]:
+        """compiles the regular expression for a format check"""
+        try:
+            return re.compile(str(format_string))
+        except re.error as error:
+            raise InvalidRegexpError(f"Error for key '{key}' with format '{format_string!r}': {error}") from error
+
+    # pylint: disable=too-many-branches
+    def validate(self, data: Dict[str, Any], donation_made: bool = False, today: Optional[date] = None) -> bool:
+        """Validates data against the compiled parameter set, see :meth:`pvoutput.base.PVOutputBase.validate_data`
+
+        If today is set, dates default to it, and are checked against how far back PVOutput accepts them.
+        """
+        if self.required_oneof is not None and self.required_oneof.isdisjoint(data):
+            raise ValueError(f"one of {','.join(self.required_oneof_keys)} MUST be set")
+
+        for key, required, has_default, default, maxlen, choices in self.presence_checks:
+            if required and key not in data:
+                if not has_default:
+                    raise ValueError(f"key {key} required in data")
+                if today is not None and key in self.date_windows:
+                    # dates default to the caller's idea of today
+                    data[key] = today.strftime("%Y%m%d")
+                else:
+                    # if the default is a callable, call it to get the value
+                    data[key] = default() if callable(default) else default
+            if key not in data:
+                continue
+            if maxlen is not None and len(data[key]) > maxlen:
+                raise ValueError(f"Value too long for key {key} {len(data[key])}>{maxlen}")
+            if choices is not None and data[key] not in choices:
+                raise ValueError(f"Invalid value for key {key}: '{data[key]}', should be in {choices} ")
+
+        # check there's no extra fields in the data
+        allowed = self.allowed
+        types = self.types
+        for key, value in data.items():
+            if key not in allowed:
+                raise ValueError(f"key {key} isn't valid in the API spec")
+            if key in types and value is not None and not isinstance(value, types[key]):
+                raise TypeError(f"data[{key}] type ({type(value)} is invalid - should be {str(types[key])})")
+
+        value_checks = self.value_checks
+        for key, value in data.items():
+            if key not in value_checks:
+                continue
+            pattern, format_string, validators, donation_required, maxval, minval = value_checks[key]
+            if pattern is not None and pattern.match(str(value)) is None:
+                raise ValueError(f"key '{key}', with value '{value}' does not match '{format_string!r}'")
+            # can run additional functions over the data
+            for validator in validators:
+                validator(value)
+
+            if today is not None and key in self.date_windows:
+                max_age_days = self.date_windows[key][1 if donation_made else 0]
+                age = (today - parse_date(value)).days
+                if age > max_age_days:
+                    raise ValueError(f"{key} {value} is {age} days ago, PVOutput only accepts up to {max_age_days} days")
+
+            # check for donation-only keys
+            if donation_required and not donation_made:
+                raise DonationRequired(f"key {key} requires an account which has donated")
+
+            # Special case: When c1 flag is set, v3 represents cumulative lifetime energy values
+            # which can exceed the normal maximum validation limit of 200000 Wh
+            if maxval is not None and not (key == "v3" and data.get("c1") is not None) and value > maxval:
+                raise ValueError(f"{key} cannot be higher than {maxval}, is {value}")
+            if minval is not None and value < minval:
+                raise ValueError(f"{key} cannot be lower than {minval}, is {value}")
+        return True
+
+
+ADDSTATUS_SCHEMA = ParameterSchema(ADDSTATUS_PARAMETERS)
+ADDBATCHSTATUS_SCHEMA = ParameterSchema(ADDBATCHSTATUS_PARAMETERS)
+ADDOUTPUT_SCHEMA = ParameterSchema(ADDOUTPUT_PARAMETERS)
+CALL_SCHEMA = ParameterSchema(CALL_PARAMETERS)
+DELETESTATUS_SCHEMA = ParameterSchema(DELETESTATUS_PARAMETERS)
+GETSTATUS_HISTORY_SCHEMA = ParameterSchema(GETSTATUS_HISTORY_PARAMETERS)
+DELETE_NOTIFICATION_SCHEMA = ParameterSchema(DELETE_NOTIFICATION_PARAMETERS)
+REGISTER_NOTIFICATION_SCHEMA = ParameterSchema(REGISTER_NOTIFICATION_PARAMETERS)
+
+# the module-level parameter sets are compiled once, keyed by identity as they live for the life of the process
+_COMPILED_SCHEMAS = {
+    id(schema.apiset): schema
+    for schema in (
+        ADDSTATUS_SCHEMA,
+        ADDBATCHSTATUS_SCHEMA,
+        ADDOUTPUT_SCHEMA,
+        CALL_SCHEMA,
+        DELETESTATUS_SCHEMA,
+        GETSTATUS_HISTORY_SCHEMA,
+        DELETE_NOTIFICATION_SCHEMA,
+        REGISTER_NOTIFICATION_SCHEMA,
+    )
+}
+
+
+def compile_parameters(apiset: Union[Dict[str, Any], ParameterSchema]) -> ParameterSchema:
+    """Returns the compiled schema for a parameter set.
+
+    The built-in parameter sets return their precompiled schema, anything else is compiled on the fly.
+    """
+    if isinstance(apiset, ParameterSchema):
+        return apiset
+    schema = _COMPILED_SCHEMAS.get(id(apiset))
+    if schema is not None and schema.apiset is apiset:
+        return schema
+    return ParameterSchema(apiset)
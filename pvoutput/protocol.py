@@ -0,0 +1,282 @@
+"""The PVOutput API without any networking (sans-IO)
+
+Each call's turned into a Request (the method, URL, query parameters, form data and headers) by the
+`*_request` methods on pvoutput.base.PVOutputBase, and the functions here turn what comes back into Python objects.
+The clients only have to send the request and hand back the response, so any HTTP library can be used, and
+building or parsing calls can be tested (and benchmarked) without a socket in sight.
+
+Uploads are validated and form-encoded once, into a Payload, when the request's built - retrying or resending it
+doesn't check or encode it again.
+
+```python
+request = pvo.getstatus_request()
+response = httpx.request(request.method, request.url, params=request.params, headers=request.headers)
+check_response(response.status_code, response.text, response.headers)
+status = parse_getstatus(response.text)
+```
+"""
+
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+from urllib.parse import urlencode
+
+from . import utils
+from .columnar import HISTORY_LAYOUT, StatusColumns, parse_status_columns
+from .exceptions import error_from_response
+from .status import Status
+
+__all__ = [
+    "FORM_CONTENT_TYPE",
+    "BatchStatusResult",
+    "batch_results",
+    "Payload",
+    "Request",
+    "encode_form",
+    "check_response",
+    "parse_addbatchstatus",
+    "parse_getstatus",
+    "parse_getstatus_history",
+    "parse_getstatus_history_columns",
+    "parse_getstatus_history_records",
+    "parse_getstatus_record",
+    "parse_rate_limit",
+    "rows_added",
+    "rows_not_added",
+]
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+
+
+def encode_form(data: Mapping[str, Any]) -> bytes:
+    """Form-encodes data the same way requests does, leaving out anything that's None."""
+    return urlencode([(key, value) for key, value in data.items() if value is not None]).encode("utf-8")
+
+
+# only the *_payload methods on pvoutput.base.PVOutputBase, which validate the fields, pass this to Payload
+_BUILDER = object()
+
+
+class Payload:
+    """The validated fields of an upload (addstatus, addoutput or addbatchstatus), and the form body they encode to.
+
+    They're built by the `*_payload` methods on pvoutput.base.PVOutputBase, which validate a copy of the fields once -
+    they can't be made directly. A payload can then be passed to the matching call (or `*_request` method) any number
+    of times, without being checked again. The fields are read-only, so they always match the body that's sent.
+    """
+
+    __slots__ = ("name", "fields", "body")
+
+    def __init__(self, name: str, fields: Mapping[str, Any], builder: object = None) -> None:
+        """Setup code
+
+        :param name: the API call it's for, eg "addstatus"
+        :type name: str
+        :param fields: the validated fields, they're copied
+        :type fields: dict
+
+        :raises TypeError: if it's not being built by one of the `*_payload` methods
+        """
+        if builder is not _BUILDER:
+            raise TypeError("Payloads are built (and validated) by the client's *_payload methods, eg status_payload")
+        self.name = name
+        self.fields: Mapping[str, Any] = MappingProxyType(dict(fields))
+        self.body = encode_form(fields)
+
+    def __repr__(self) -> str:
+        return f"Payload({self.name} {self.body.decode('utf-8')})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Payload):
+            return NotImplemented
+        return (self.name, self.body) == (other.name, other.body)
+
+
+class BatchStatusResult:
+    """What PVOutput said it did with one of the statuses in an addbatchstatus call."""
+
+    __slots__ = ("d", "t", "added")
+
+    def __init__(self, d: str, t: str, added: bool) -> None:  # pylint: disable=invalid-name
+        """Setup code
+
+        :param d: the status's date, YYYYMMDD
+        :type d: str
+        :param t: the status's time, HH:MM
+        :type t: str
+        :param added: whether it was added, PVOutput doesn't say why when it's not
+        :type added: bool
+        """
+        self.d = d  # pylint: disable=invalid-name
+        self.t = t  # pylint: disable=invalid-name
+        self.added = added
+
+    def __repr__(self) -> str:
+        return f"BatchStatusResult({self.d} {self.t} added={self.added})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BatchStatusResult):
+            return NotImplemented
+        return (self.d, self.t, self.added) == (other.d, other.t, other.added)
+
+
+class Request:
+    """A call to PVOutput, ready to send."""
+
+    __slots__ = ("name", "method", "url", "params", "data", "headers", "stream", "body")
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Mapping[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+        body: Optional[bytes] = None,
+    ) -> None:
+        """Setup code
+
+        :param name: the API call, a key of pvoutput.utils.ENDPOINTS, eg "addstatus"
+        :type name: str
+        :param method: GET or POST
+        :type method: str
+        :param url: the full URL
+        :type url: str
+        :param params: the query string parameters
+        :type params: dict
+        :param data: the form data to POST
+        :type data: dict
+        :param headers: the headers to send
+        :type headers: dict
+        :param stream: whether the response can be read as it arrives, rather than all at once
+        :type stream: bool
+        :param body: the form-encoded data to POST, it's encoded from data if it's not set
+        :type body: bytes
+        """
+        self.name = name
+        self.method = method
+        self.url = url
+        self.params = params
+        self.data = data
+        self.headers = headers if headers is not None else {}
+        self.stream = stream
+        self.body = body
+        if method == "POST" and data is not None:
+            if body is None:
+                self.body = encode_form(data)
+            if "Content-Type" not in self.headers:
+                self.headers = {**self.headers, "Content-Type": FORM_CONTENT_TYPE}
+
+    def __repr__(self) -> str:
+        return f"Request({self.method} {self.url} params={self.params} data={self.data})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Request):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+def check_response(status: int, body: str, headers: Optional[Mapping[str, str]] = None) -> None:
+    """Raises the matching pvoutput.exceptions.PVOutputError if a response is one of PVOutput's documented errors.
+
+    Anything else that's not a success is left to the HTTP library's raise_for_status.
+
+    :param status: the HTTP status
+    :type status: int
+    :param body: the response body
+    :type body: str
+    :param headers: the response headers
+    :type headers: dict
+    """
+    if status >= 400:
+        # likely errors - https://pvoutput.org/help/api_specification.html#error-messages
+        error = error_from_response(status, body, headers)
+        if error is not None:
+            raise error
+
+
+def parse_rate_limit(headers: Mapping[str, str]) -> Dict[str, str]:
+    """The X-Rate-Limit headers from a response, named like X-Rate-Limit-Remaining whatever case they arrived in."""
+    return {"-".join(part.capitalize() for part in key.split("-")): str(value) for key, value in headers.items() if key.lower().startswith("x-rate-limit")}
+
+
+def parse_addbatchstatus(text: str) -> List[BatchStatusResult]:
+    """Turns an addbatchstatus response (date,time,added for each status, eg "20110112,10:00,1;20110112,10:05,0") into results.
+
+    Anything that's not a status's result is skipped, so a response without any (eg an empty body) gives an empty list.
+    """
+    results = []
+    for row in text.strip().split(";"):
+        fields = row.split(",")
+        if len(fields) == 3 and fields[2] in ("0", "1"):
+            results.append(BatchStatusResult(fields[0], fields[1], fields[2] == "1"))
+    return results
+
+
+def _confirmed(rows: List[Dict[str, Any]], results: List[BatchStatusResult]) -> List[bool]:
+    """whether there's a result saying each status was added"""
+    added = {(result.d, result.t) for result in results if result.added}
+    added_times = {t for _, t in added}
+    return [(str(row["d"]), str(row["t"])) in added if row.get("d") is not None else str(row["t"]) in added_times for row in rows]
+
+
+def rows_not_added(rows: List[Dict[str, Any]], results: List[BatchStatusResult]) -> List[Dict[str, Any]]:
+    """The statuses from a batch which PVOutput didn't add, going by the results for that batch.
+
+    A status counts as added if there's a result for its date (or just its time, if it was sent without a date) saying
+    so. If there aren't any results at all, there's nothing to go on, so they're all taken as added.
+    """
+    if not results:
+        return []
+    return [row for row, added in zip(rows, _confirmed(rows, results)) if not added]
+
+
+def rows_added(rows: List[Dict[str, Any]], results: List[BatchStatusResult]) -> List[Dict[str, Any]]:
+    """The statuses from a batch which the results say PVOutput added.
+
+    Unlike rows_not_added, a status only counts if there's a result saying so, so no results means none of them.
+    """
+    return [row for row, added in zip(rows, _confirmed(rows, results)) if added]
+
+
+def batch_results(error: BaseException) -> List[BatchStatusResult]:
+    """The results an addbatchstatus_rows call had already gathered when it raised error, empty if it didn't get any.
+
+    When a batch (or sending statuses again) fails part way, the statuses PVOutput had already added don't need
+    sending again - rows_added(rows, batch_results(error)) gives you those.
+    """
+    return list(getattr(error, "batch_results", []))
+
+
+def parse_getstatus(text: str) -> Dict[str, Any]:
+    """Turns a getstatus response into a dict."""
+    # grab all the things
+    responsedata, extras = utils.responsedata_to_response(text.split(","))
+
+    # if we're fancy, we get more data
+    if extras:
+        for i in range(1, 7):
+            responsedata[f"v{i + 6}"] = None if extras[i - 1] == "NaN" else float(extras[i - 1])
+    return responsedata
+
+
+def parse_getstatus_record(text: str) -> Status:
+    """Turns a getstatus response into a pvoutput.status.Status."""
+    return utils.responsedata_to_status(text.split(","))
+
+
+def parse_getstatus_history(text: str) -> List[Dict[str, Any]]:
+    """Turns a whole getstatus history response into dicts, see pvoutput.utils.history_row_to_response."""
+    return [utils.history_row_to_response(row.split(",")) for row in text.split(";") if row]
+
+
+def parse_getstatus_history_records(text: str) -> List[Status]:
+    """Turns a whole getstatus history response into pvoutput.status.Status records."""
+    return [utils.history_row_to_status(row.split(",")) for row in text.split(";") if row]
+
+
+def parse_getstatus_history_columns(text: str) -> StatusColumns:
+    """Turns a getstatus history response into columns, see pvoutput.columnar."""
+    return parse_status_columns(text, HISTORY_LAYOUT)
@@ -0,0 +1,261 @@
+"""Client-side rate limiting, driven by the X-Rate-Limit headers PVOutput sends back
+
+API spec: https://pvoutput.org/help/api_specification.html#rate-limits
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+import sys
+from typing import Any, Callable, ContextManager, Dict, Iterator, Mapping, Optional, Union
+
+from .exceptions import RateLimitExceeded
+from .utils import private_dir, user_dir
+
+if sys.platform == "win32":  # pragma: no cover
+    import msvcrt
+
+    def _lock_file(fd: int) -> None:
+        """takes an exclusive lock on an open file, waiting for it"""
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(fd: int) -> None:
+        """releases the lock from _lock_file"""
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(fd: int) -> None:
+        """takes an exclusive lock on an open file, waiting for it"""
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_file(fd: int) -> None:
+        """releases the lock from _lock_file"""
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+__all__ = [
+    "RateLimiter",
+    "RateLimitStore",
+    "MemoryRateLimitStore",
+    "FileRateLimitStore",
+    "rate_limit_key",
+    "RATE_LIMIT",
+    "RATE_LIMIT_DONATION",
+]
+
+# requests per hour
+RATE_LIMIT = 60
+RATE_LIMIT_DONATION = 300
+RATE_LIMIT_PERIOD = 3600.0
+
+DEFAULT_KEY = "default"
+
+
+def rate_limit_key(apikey: str, systemid: int) -> str:
+    """The key rate limit state is stored under for an API key / system ID pair, the API key is hashed so it's not stored anywhere."""
+    return hashlib.sha256(f"{apikey}:{systemid}".encode("utf-8")).hexdigest()[:32]
+
+
+class RateLimitStore(ABC):
+    """Somewhere to keep rate limit state, so it can be shared. Subclasses implement transaction()."""
+
+    @abstractmethod
+    def transaction(self, key: str) -> ContextManager[Dict[str, Any]]:
+        """Locks the state for a key, yields it as a dict (empty if it's new) to be read and updated, then saves it."""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Keeps the state in memory, shared between the clients using the same RateLimiter in this process."""
+
+    def __init__(self) -> None:
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, key: str) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            yield self._states.setdefault(key, {})
+
+
+class FileRateLimitStore(RateLimitStore):
+    """Keeps the state in a JSON file per key, locked while it's being updated, so every process on the host shares one budget.
+
+    ```python
+    limiter = RateLimiter(limit=300, store=FileRateLimitStore())
+    ```
+    """
+
+    def __init__(self, directory: Union[str, Path, None] = None) -> None:
+        """Setup code
+
+        :param directory: where to keep the state files, defaults to a ratelimit directory in the user's state
+            directory (see pvoutput.utils.user_dir) - it's created so only the user can use it
+        :type directory: str or pathlib.Path
+
+        :raises PermissionError: if the directory's a symlink, or other users could change what's in it
+        """
+        self.directory = private_dir(directory if directory is not None else user_dir("state") / "ratelimit")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, key: str) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            # a symlink planted in place of the file isn't followed
+            fd = os.open(self.directory / f"{key}.json", os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+            try:
+                _lock_file(fd)
+                with os.fdopen(os.dup(fd), "r+", encoding="utf-8") as file_handle:
+                    try:
+                        state: Dict[str, Any] = json.loads(file_handle.read() or "{}")
+                    except ValueError:
+                        # a half-written or otherwise broken file, start again
+                        state = {}
+                    yield state
+                    file_handle.seek(0)
+                    file_handle.truncate()
+                    file_handle.write(json.dumps(state))
+                    file_handle.flush()
+            finally:
+                _unlock_file(fd)
+                os.close(fd)
+
+
+class RateLimiter:
+    """A token bucket which delays (or rejects) calls before PVOutput starts returning HTTP 403.
+
+    There's two limits, and a call has to wait for both:
+
+    - the bucket holds up to `burst` tokens, refilling at `limit` tokens per `period` seconds, which spreads calls out.
+    - PVOutput's own count of what's left this hour, which is updated from the headers of every response, and
+      refilled when the X-Rate-Limit-Reset time passes.
+
+    Pass it to a client with `PVOutput(..., rate_limiter=RateLimiter(limit=60))`, and the client will request the
+    rate limit headers on every call and feed them back in. The state's kept per API key / system ID, so one limiter
+    can be shared between clients, and with a FileRateLimitStore it's shared between processes too.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        limit: int = RATE_LIMIT,
+        period: float = RATE_LIMIT_PERIOD,
+        burst: Optional[int] = None,
+        wait: bool = True,
+        max_wait: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+        store: Optional[RateLimitStore] = None,
+    ) -> None:
+        """Setup code
+
+        :param limit: requests allowed per period, 60 for most accounts and 300 for donators
+        :type limit: int
+        :param period: the length of the rate limit period, in seconds
+        :type period: float
+        :param burst: the most calls that can be made back-to-back, defaults to limit
+        :type burst: int
+        :param wait: if True, calls are delayed until they're allowed, otherwise RateLimitExceeded is raised
+        :type wait: bool
+        :param max_wait: raise RateLimitExceeded rather than waiting longer than this many seconds
+        :type max_wait: float
+        :param clock: returns the current unix time, for testing
+        :type clock: callable
+        :param store: where to keep the state, defaults to in memory
+        :type store: pvoutput.ratelimit.RateLimitStore
+        """
+        self.limit = limit
+        self.period = period
+        self.burst = burst or limit
+        self.wait = wait
+        self.max_wait = max_wait
+        self.clock = clock
+        self.store = store if store is not None else MemoryRateLimitStore()
+
+    def state(self, key: str = DEFAULT_KEY) -> Dict[str, Any]:
+        """A copy of the current state for a key.
+
+        :returns: tokens in the bucket, the remaining count and reset time PVOutput last sent (None if unknown), and the limit
+        :rtype: dict
+        """
+        with self.store.transaction(key) as state:
+            self._refill(state, self.clock())
+            return dict(state)
+
+    def _refill(self, state: Dict[str, Any], now: float) -> None:
+        """tops up the bucket for the time that's passed, and forgets the server's count once it's reset"""
+        if not state:
+            state.update(tokens=float(self.burst), updated=now, remaining=None, reset_at=None, limit=self.limit)
+        rate = state["limit"] / self.period
+        state["tokens"] = min(float(self.burst), state["tokens"] + max(0.0, now - state["updated"]) * rate)
+        state["updated"] = now
+        if state["reset_at"] is not None and now >= state["reset_at"]:
+            state["remaining"] = None
+            state["reset_at"] = None
+
+    def _delay(self, state: Dict[str, Any], now: float) -> float:
+        """works out the wait for the next call"""
+        self._refill(state, now)
+        delay = 0.0
+        if state["tokens"] < 1:
+            delay = (1 - state["tokens"]) / (state["limit"] / self.period)
+        if state["remaining"] is not None and state["remaining"] <= 0 and state["reset_at"] is not None:
+            delay = max(delay, state["reset_at"] - now)
+        return delay
+
+    def delay(self, key: str = DEFAULT_KEY) -> float:
+        """How long the next call would have to wait, without reserving it.
+
+        :returns: seconds to wait, 0.0 if the call can go now
+        :rtype: float
+        """
+        with self.store.transaction(key) as state:
+            return self._delay(state, self.clock())
+
+    def acquire(self, key: str = DEFAULT_KEY) -> float:
+        """Reserves a call.
+
+        :param key: whose budget to use, clients pass pvoutput.ratelimit.rate_limit_key(apikey, systemid)
+        :type key: str
+
+        :returns: how long to wait before making the call, in seconds
+        :rtype: float
+
+        :raises pvoutput.exceptions.RateLimitExceeded: if the call would have to wait, and waiting's not allowed
+        """
+        with self.store.transaction(key) as state:
+            delay = self._delay(state, self.clock())
+            if delay > 0 and (not self.wait or (self.max_wait is not None and delay > self.max_wait)):
+                raise RateLimitExceeded(f"Rate limit reached, next call allowed in {delay:.1f} seconds", retry_after=delay)
+            state["tokens"] -= 1
+            if state["remaining"] is not None:
+                state["remaining"] -= 1
+            return delay
+
+    def update(self, headers: Mapping[str, str], key: str = DEFAULT_KEY) -> None:
+        """Updates the limits from the X-Rate-Limit-* response headers, anything missing or invalid is ignored.
+
+        :param headers: the response headers, or the output of pvoutput.utils.get_rate_limit_header
+        :type headers: dict
+
+        :param key: whose budget to update, see acquire()
+        :type key: str
+        """
+        values = {name.lower(): value for name, value in headers.items() if name.lower().startswith("x-rate-limit-")}
+        with self.store.transaction(key) as state:
+            self._refill(state, self.clock())
+            try:
+                if "x-rate-limit-limit" in values:
+                    state["limit"] = int(values["x-rate-limit-limit"])
+                if "x-rate-limit-reset" in values:
+                    state["reset_at"] = float(values["x-rate-limit-reset"])
+                if "x-rate-limit-remaining" in values:
+                    state["remaining"] = int(values["x-rate-limit-remaining"])
+            except ValueError:
+                pass
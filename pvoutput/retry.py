@@ -0,0 +1,167 @@
+"""Retrying failed calls, with exponential backoff and jitter, and waiting out the rate limit
+
+Only calls that are safe to repeat are retried: reads, and writes which identify the record they're writing (a status
+with its time, an output with its date), since sending those twice just overwrites the first one.
+"""
+
+import random
+import time
+from typing import Any, Callable, FrozenSet, Mapping, Optional
+
+from .exceptions import PVOutputError, RateLimitedError
+from .transport import error_details, is_network_error
+
+__all__ = [
+    "RetryPolicy",
+    "is_idempotent",
+    "RETRY_STATUSES",
+    "IDEMPOTENT_WRITES",
+]
+
+# server-side errors worth trying again
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+# the writes which are safe to repeat, as long as the field that identifies what's being written is set
+IDEMPOTENT_WRITES = {
+    "addstatus.jsp": "t",
+    "addbatchstatus.jsp": "data",
+    "addoutput.jsp": "d",
+    "deletestatus.jsp": "d",
+}
+
+
+def is_idempotent(endpoint: str, method: str, data: Optional[Mapping[str, Any]] = None) -> bool:
+    """Whether a call can be safely made again if it fails.
+
+    :param endpoint: the URL
+    :type endpoint: str
+    :param method: GET or POST
+    :type method: str
+    :param data: what's being posted
+    :type data: dict
+    """
+    if method == "GET":
+        return True
+    field = IDEMPOTENT_WRITES.get(endpoint.rsplit("/", 1)[-1])
+    return field is not None and data is not None and data.get(field) is not None
+
+
+class RetryPolicy:
+    """Decides whether a failed call's retried, and how long to wait first.
+
+    Network errors and the statuses in retry_statuses are retried with exponential backoff (with full jitter, so lots
+    of clients don't all retry at once), up to max_attempts calls in total, and not past the deadline. If PVOutput says
+    the rate limit's been hit (a pvoutput.exceptions.RateLimitedError), it waits until X-Rate-Limit-Reset instead.
+
+    ```python
+    pvo = PVOutput(apikey=apikey, systemid=systemid, retry=RetryPolicy(max_attempts=5, deadline=120))
+    ```
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        jitter: bool = True,
+        deadline: Optional[float] = 300.0,
+        retry_statuses: FrozenSet[int] = RETRY_STATUSES,
+        wait_for_rate_limit_reset: bool = True,
+        clock: Callable[[], float] = time.time,
+        random_func: Callable[[], float] = random.random,
+    ) -> None:
+        """Setup code
+
+        :param max_attempts: the most times to make a call, including the first
+        :type max_attempts: int
+        :param backoff: the wait before the first retry, in seconds, it doubles for each one after that
+        :type backoff: float
+        :param max_backoff: the longest wait between retries, in seconds
+        :type max_backoff: float
+        :param jitter: wait a random time between 0 and the backoff, rather than the backoff
+        :type jitter: bool
+        :param deadline: don't retry if it'd go more than this many seconds past the first call, None for no limit
+        :type deadline: float
+        :param retry_statuses: HTTP statuses to retry
+        :type retry_statuses: frozenset of ints
+        :param wait_for_rate_limit_reset: when the rate limit's been hit, wait for it to reset (inside the deadline) and retry
+        :type wait_for_rate_limit_reset: bool
+        :param clock: returns the current unix time, for testing
+        :type clock: callable
+        :param random_func: returns a random float in [0, 1), for testing
+        :type random_func: callable
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts should be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_statuses = retry_statuses
+        self.wait_for_rate_limit_reset = wait_for_rate_limit_reset
+        self.clock = clock
+        self.random_func = random_func
+
+    def backoff_delay(self, attempt: int) -> float:
+        """the wait after a call's failed attempt times"""
+        delay = min(self.max_backoff, self.backoff * 2.0 ** (attempt - 1))
+        if self.jitter:
+            delay *= self.random_func()
+        return delay
+
+    def rate_limit_delay(self, error: BaseException) -> Optional[float]:
+        """if the error's because the rate limit's been hit, how long until it resets (None if it isn't, or it's not known)"""
+        if not isinstance(error, RateLimitedError) or error.reset_at is None:
+            return None
+        return max(0.0, error.reset_at - self.clock())
+
+    # pylint: disable=too-many-arguments,too-many-return-statements
+    def delay(
+        self,
+        attempt: int,
+        error: BaseException,
+        started: float,
+        endpoint: str,
+        method: str,
+        data: Optional[Mapping[str, Any]] = None,
+    ) -> Optional[float]:
+        """Works out whether to retry a failed call.
+
+        :param attempt: how many times the call's been made
+        :type attempt: int
+        :param error: why it failed
+        :type error: Exception
+        :param started: when the first call was made, from clock()
+        :type started: float
+        :param endpoint: the URL
+        :type endpoint: str
+        :param method: GET or POST
+        :type method: str
+        :param data: what was posted
+        :type data: dict
+
+        :returns: how long to wait before retrying, or None to give up
+        :rtype: float
+        """
+        if attempt >= self.max_attempts or not is_idempotent(endpoint, method, data):
+            return None
+        status, headers = error_details(error)
+        rate_limit_delay = self.rate_limit_delay(error)
+        if rate_limit_delay is not None:
+            if not self.wait_for_rate_limit_reset:
+                return None
+            delay = rate_limit_delay
+        elif is_network_error(error) or status in self.retry_statuses or (isinstance(error, PVOutputError) and error.retryable):
+            delay = self.backoff_delay(attempt)
+            try:
+                # if the server says how long to wait, wait at least that long
+                delay = max(delay, float(headers.get("Retry-After", 0)))
+            except ValueError:
+                pass
+        else:
+            return None
+        if self.deadline is not None and self.clock() + delay - started > self.deadline:
+            return None
+        return delay
@@ -0,0 +1,294 @@
+"""A durable on-disk spool for statuses, so readings aren't lost while PVOutput can't be reached
+
+Statuses are written to a SQLite database before anything's sent, and replayed in batches (with addbatchstatus)
+once the connection's back. Anything older than PVOutput will accept (14 days, or 90 if you've donated) is dropped.
+
+```python
+spool = StatusSpool("/var/lib/pvoutput/spool.sqlite3")
+spool.send(pvo, {"v2": 500})  # False if it's been spooled for later
+spool.replay(pvo)  # eg, from a timer
+```
+"""
+
+from datetime import timedelta
+from itertools import takewhile
+import json
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .base import PVOutputBase
+from .exceptions import BatchValidationError, PVOutputError, RateLimitExceeded, StatusesNotAddedError
+from .protocol import BatchStatusResult, batch_results, rows_added, rows_not_added
+from .status import StatusLike
+from .transport import error_details, is_network_error
+from .utils import user_dir
+
+__all__ = [
+    "StatusSpool",
+    "SYNCHRONOUS_MODES",
+    "is_transient",
+]
+
+LOGGER = logging.getLogger(__name__)
+
+# the SQLite synchronous settings, FULL syncs to disk on every write, NORMAL can lose the last few writes if the
+# power goes (but won't corrupt anything), OFF leaves it to the OS
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+SpooledBatch = Tuple[List[int], bool, bool, List[Dict[str, Any]]]
+
+
+def is_transient(error: BaseException) -> bool:
+    """whether an error from sending statuses is worth trying again later, rather than the statuses being wrong"""
+    if is_network_error(error):
+        return True
+    if isinstance(error, (PVOutputError, RateLimitExceeded)):
+        return error.retryable
+    status, _ = error_details(error)
+    return status is not None and status >= 500
+
+
+class StatusSpool:
+    """Keeps statuses on disk until they've been sent. One spool can be shared by clients for different systems."""
+
+    def __init__(self, path: Union[str, Path, None] = None, synchronous: str = "FULL") -> None:
+        """Setup code
+
+        :param path: the database file, defaults to spool.sqlite3 in the user's data directory (see
+            pvoutput.utils.user_dir), which survives reboots and only they can use
+        :type path: str or pathlib.Path
+        :param synchronous: how hard SQLite tries to get writes onto the disk, one of SYNCHRONOUS_MODES
+        :type synchronous: str
+
+        :raises ValueError: if synchronous isn't valid
+        """
+        if synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous should be one of {', '.join(SYNCHRONOUS_MODES)}, got {synchronous}")
+        self.path = Path(path) if path is not None else user_dir("data") / "spool.sqlite3"
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={synchronous.upper()}")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS statuses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                system TEXT NOT NULL,
+                d TEXT NOT NULL,
+                t TEXT NOT NULL,
+                c1 INTEGER NOT NULL,
+                n INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT
+            )"""
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS statuses_order ON statuses (system, d, t, id)")
+
+    def close(self) -> None:
+        """Closes the database."""
+        self._connection.close()
+
+    def add(self, client: PVOutputBase, status: StatusLike, c1: bool = False, n: bool = False) -> None:
+        """Validates a status and spools it, without sending anything.
+
+        :param client: the client for the system it's for, sync or asyncio
+        :type client: pvoutput.PVOutput or pvoutput.asyncio.PVOutput
+        :param status: the status, as you'd pass to addstatuses
+        :type status: dict or pvoutput.status.Status
+        :param c1: whether the values are cumulative, see addbatchstatus
+        :type c1: bool
+        :param n: whether the values are net, see addbatchstatus
+        :type n: bool
+
+        :raises ValueError: if the status isn't valid
+        """
+        self._insert(client, [client.prepare_batch_status(status, c1=c1)], c1, n)
+
+    def add_many(self, client: PVOutputBase, statuses: Iterable[StatusLike], c1: bool = False, n: bool = False) -> List[Tuple[int, StatusLike, Exception]]:
+        """Validates statuses and spools the valid ones, without sending anything.
+
+        :returns: an (index, status, exception) for each of the statuses which were invalid, and weren't spooled
+        :rtype: list
+        """
+        try:
+            rows = client.prepare_batch_statuses(statuses, c1=c1)
+            errors: List[Tuple[int, StatusLike, Exception]] = []
+        except BatchValidationError as error:
+            rows, errors = error.valid, error.errors
+        self._insert(client, rows, c1, n)
+        return errors
+
+    def _insert(self, client: PVOutputBase, rows: List[Dict[str, Any]], c1: bool, n: bool) -> None:
+        """spools validated statuses"""
+        for row in rows:
+            # PVOutput would default the date to the day it's sent, which won't be right for a replay
+            if row.get("d") is None:
+                row["d"] = client.clock().strftime("%Y%m%d")
+        with self._lock:
+            self._connection.executemany(
+                "INSERT INTO statuses (system, d, t, c1, n, status) VALUES (?, ?, ?, ?, ?, ?)",
+                [(client._rate_limit_key(), str(row["d"]), str(row["t"]), int(c1), int(n), json.dumps(row)) for row in rows],  # pylint: disable=protected-access
+            )
+
+    def pending(self, client: PVOutputBase) -> int:
+        """The number of statuses waiting to be sent for a client's system."""
+        with self._lock:
+            row = self._connection.execute("SELECT count(*) FROM statuses WHERE system = ? AND error IS NULL", (client._rate_limit_key(),)).fetchone()  # pylint: disable=protected-access
+        return int(row[0])
+
+    def failed(self, client: PVOutputBase) -> List[Tuple[Dict[str, Any], str]]:
+        """Statuses PVOutput rejected, with the error, they're kept aside so they don't hold up the rest."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, error FROM statuses WHERE system = ? AND error IS NOT NULL ORDER BY d, t, id",
+                (client._rate_limit_key(),),  # pylint: disable=protected-access
+            ).fetchall()
+        return [(json.loads(status), error) for status, error in rows]
+
+    def _expire(self, client: PVOutputBase) -> None:
+        """drops the statuses which are too old for PVOutput to accept"""
+        cutoff = (client.clock().date() - timedelta(days=client.status_max_age_days)).strftime("%Y%m%d")
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM statuses WHERE system = ? AND error IS NULL AND d < ?",
+                (client._rate_limit_key(), cutoff),  # pylint: disable=protected-access
+            )
+        if cursor.rowcount:
+            LOGGER.warning("Dropped %d spooled statuses from before %s, PVOutput won't accept them", cursor.rowcount, cutoff)
+
+    def _next_batch(self, client: PVOutputBase) -> Optional[SpooledBatch]:
+        """the oldest statuses, up to a batch of them, with the same c1/n flags"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, c1, n, status FROM statuses WHERE system = ? AND error IS NULL ORDER BY d, t, id LIMIT ?",
+                (client._rate_limit_key(), client.batch_status_size),  # pylint: disable=protected-access
+            ).fetchall()
+        if not rows:
+            return None
+        flags = rows[0][1:3]
+        batch = list(takewhile(lambda row: row[1:3] == flags, rows))
+        return [row[0] for row in batch], bool(flags[0]), bool(flags[1]), [json.loads(row[3]) for row in batch]
+
+    def _sent(self, ids: List[int]) -> None:
+        """removes the statuses that have been sent"""
+        with self._lock:
+            self._connection.executemany("DELETE FROM statuses WHERE id = ?", [(row_id,) for row_id in ids])
+
+    def _rejected(self, ids: List[int], error: BaseException) -> None:
+        """keeps statuses PVOutput's rejected aside, so they don't block the ones after them"""
+        LOGGER.error("PVOutput rejected %d spooled statuses: %s", len(ids), error)
+        with self._lock:
+            self._connection.executemany("UPDATE statuses SET error = ? WHERE id = ?", [(str(error), row_id) for row_id in ids])
+
+    def _unconfirmed(self, ids: List[int], rows: List[Dict[str, Any]], error: BaseException) -> List[int]:
+        """removes the statuses PVOutput added before error was raised, returning the ids of the rest"""
+        added = {id(row) for row in rows_added(rows, batch_results(error))}
+        self._sent([row_id for row_id, row in zip(ids, rows) if id(row) in added])
+        return [row_id for row_id, row in zip(ids, rows) if id(row) not in added]
+
+    def _settle(self, ids: List[int], rows: List[Dict[str, Any]], results: List[BatchStatusResult]) -> Tuple[int, int]:
+        """removes the statuses PVOutput added and keeps aside the ones it didn't, returning how many of each"""
+        not_added = {id(row) for row in rows_not_added(rows, results)}
+        rejected = [(row_id, row) for row_id, row in zip(ids, rows) if id(row) in not_added]
+        if rejected:
+            self._rejected([row_id for row_id, _ in rejected], StatusesNotAddedError([row for _, row in rejected]))
+        self._sent([row_id for row_id, row in zip(ids, rows) if id(row) not in not_added])
+        return len(ids) - len(rejected), len(rejected)
+
+    def replay(self, client: Any) -> int:
+        """Sends the spooled statuses for a client's system, oldest first, in batches.
+
+        Batches PVOutput rejects, and statuses it says it didn't add (after sending them again once), are kept aside
+        (see failed), anything else that goes wrong is raised, and what hasn't been sent stays in the spool. Statuses
+        PVOutput had already added when something went wrong are taken out of the spool either way.
+
+        :param client: the client for the system
+        :type client: pvoutput.PVOutput
+
+        :returns: how many statuses were sent
+        :rtype: int
+        """
+        return self._replay(client)[0]
+
+    def _replay(self, client: Any) -> Tuple[int, int]:
+        """sends the spooled statuses, returning how many were sent and how many were kept aside"""
+        self._expire(client)
+        sent = rejected = 0
+        while (batch := self._next_batch(client)) is not None:
+            ids, c1, n, rows = batch
+            try:
+                # the statuses were validated when they were spooled, so they're not checked again
+                results = client.addbatchstatus_rows(rows, c1=c1, n=n)
+            except Exception as error:  # pylint: disable=broad-except
+                unconfirmed = self._unconfirmed(ids, rows, error)
+                if is_transient(error):
+                    raise
+                if unconfirmed:
+                    self._rejected(unconfirmed, error)
+                sent += len(ids) - len(unconfirmed)
+                rejected += len(unconfirmed)
+                continue
+            batch_sent, batch_rejected = self._settle(ids, rows, results)
+            sent += batch_sent
+            rejected += batch_rejected
+        return sent, rejected
+
+    async def areplay(self, client: Any) -> int:
+        """The same as replay, for the asyncio client."""
+        return (await self._areplay(client))[0]
+
+    async def _areplay(self, client: Any) -> Tuple[int, int]:
+        """the same as _replay, for the asyncio client"""
+        self._expire(client)
+        sent = rejected = 0
+        while (batch := self._next_batch(client)) is not None:
+            ids, c1, n, rows = batch
+            try:
+                # the statuses were validated when they were spooled, so they're not checked again
+                results = await client.addbatchstatus_rows(rows, c1=c1, n=n)
+            except Exception as error:  # pylint: disable=broad-except
+                unconfirmed = self._unconfirmed(ids, rows, error)
+                if is_transient(error):
+                    raise
+                if unconfirmed:
+                    self._rejected(unconfirmed, error)
+                sent += len(ids) - len(unconfirmed)
+                rejected += len(unconfirmed)
+                continue
+            batch_sent, batch_rejected = self._settle(ids, rows, results)
+            sent += batch_sent
+            rejected += batch_rejected
+        return sent, rejected
+
+    def send(self, client: Any, status: StatusLike, c1: bool = False, n: bool = False) -> bool:
+        """Spools a status, then tries to send everything that's spooled for the system, so they arrive in order.
+
+        :returns: True if everything was sent, False if it couldn't get through (and it's all still spooled), or
+            PVOutput rejected or didn't add some of the statuses (they're kept aside, see failed)
+        :rtype: bool
+
+        :raises ValueError: if the status isn't valid
+        """
+        self.add(client, status, c1=c1, n=n)
+        try:
+            _, rejected = self._replay(client)
+        except Exception as error:  # pylint: disable=broad-except
+            if not is_transient(error):
+                raise
+            LOGGER.warning("Couldn't reach PVOutput, %d statuses are spooled: %s", self.pending(client), error)
+            return False
+        return not rejected
+
+    async def asend(self, client: Any, status: StatusLike, c1: bool = False, n: bool = False) -> bool:
+        """The same as send, for the asyncio client."""
+        self.add(client, status, c1=c1, n=n)
+        try:
+            _, rejected = await self._areplay(client)
+        except Exception as error:  # pylint: disable=broad-except
+            if not is_transient(error):
+                raise
+            LOGGER.warning("Couldn't reach PVOutput, %d statuses are spooled: %s", self.pending(client), error)
+            return False
+        return not rejected
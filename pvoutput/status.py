@@ -0,0 +1,216 @@
+"""A compact, immutable record of a single status
+
+A getstatus dict holds 10-18 keys, which adds up when you keep a window of history in memory. A Status keeps the
+same values in slots - about two thirds of the memory of a plain getstatus dict, and under half for history or
+extended rows - and can be passed straight to addstatus, addstatuses and the uploaders. `to_dict` gives you the dict
+getstatus would have.
+
+```python
+status = pvo.getstatus_record()
+print(status.timestamp, status.v2)
+other.addstatus(status)
+```
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, Union
+
+__all__ = [
+    "Status",
+    "StatusLike",
+    "STATUS_VALUES",
+    "EXTENDED_VALUES",
+]
+
+# the values you can upload, in the order PVOutput takes them
+STATUS_VALUES = ("v1", "v2", "v3", "v4", "v5", "v6", "v7", "v8", "v9", "v10", "v11", "v12")
+EXTENDED_VALUES = STATUS_VALUES[6:]
+# the values PVOutput wants as floats, see pvoutput.parameters.ADDSTATUS_PARAMETERS
+FLOAT_VALUES = ("v5", "v6")
+
+
+class Status:
+    """A status - the time it's for, v1-v12, and the derived values PVOutput sends back.
+
+    Values PVOutput had no data for (NaN) are None. Statuses can't be changed once they're made, so they're safe to
+    share between threads and can be used as dict keys.
+    """
+
+    __slots__ = (
+        "timestamp",
+        "v1",
+        "v2",
+        "v3",
+        "v4",
+        "v5",
+        "v6",
+        "v7",
+        "v8",
+        "v9",
+        "v10",
+        "v11",
+        "v12",
+        "normalised_output",
+        "energy_efficiency",
+        "average_power",
+        "extended",
+    )
+
+    timestamp: datetime
+    v1: Optional[float]
+    v2: Optional[float]
+    v3: Optional[float]
+    v4: Optional[float]
+    v5: Optional[float]
+    v6: Optional[float]
+    v7: Optional[float]
+    v8: Optional[float]
+    v9: Optional[float]
+    v10: Optional[float]
+    v11: Optional[float]
+    v12: Optional[float]
+    normalised_output: Optional[float]
+    energy_efficiency: Optional[float]
+    average_power: Optional[float]
+    extended: bool
+
+    # pylint: disable=too-many-arguments,too-many-locals,invalid-name
+    def __init__(
+        self,
+        timestamp: datetime,
+        v1: Optional[float] = None,
+        v2: Optional[float] = None,
+        v3: Optional[float] = None,
+        v4: Optional[float] = None,
+        v5: Optional[float] = None,
+        v6: Optional[float] = None,
+        v7: Optional[float] = None,
+        v8: Optional[float] = None,
+        v9: Optional[float] = None,
+        v10: Optional[float] = None,
+        v11: Optional[float] = None,
+        v12: Optional[float] = None,
+        normalised_output: Optional[float] = None,
+        energy_efficiency: Optional[float] = None,
+        average_power: Optional[float] = None,
+        extended: Optional[bool] = None,
+    ) -> None:
+        """Setup code
+
+        :param timestamp: the date and time of the status, in the system's local time
+        :type timestamp: datetime.datetime
+        :param v1: v1-v12 are the values, see pvoutput.parameters.ADDSTATUS_PARAMETERS
+        :type v1: float
+        :param normalised_output: normalised output (kW/kW), from getstatus
+        :type normalised_output: float
+        :param energy_efficiency: energy efficiency (kWh/kW), from getstatus history
+        :type energy_efficiency: float
+        :param average_power: average power (W), from getstatus history
+        :type average_power: float
+        :param extended: whether v7-v12 were requested, so to_dict includes them - defaults to whether any are set
+        :type extended: bool
+        """
+        setter = object.__setattr__
+        setter(self, "timestamp", timestamp)
+        setter(self, "v1", v1)
+        setter(self, "v2", v2)
+        setter(self, "v3", v3)
+        setter(self, "v4", v4)
+        setter(self, "v5", v5)
+        setter(self, "v6", v6)
+        setter(self, "v7", v7)
+        setter(self, "v8", v8)
+        setter(self, "v9", v9)
+        setter(self, "v10", v10)
+        setter(self, "v11", v11)
+        setter(self, "v12", v12)
+        setter(self, "normalised_output", normalised_output)
+        setter(self, "energy_efficiency", energy_efficiency)
+        setter(self, "average_power", average_power)
+        if extended is None:
+            extended = any(value is not None for value in (v7, v8, v9, v10, v11, v12))
+        setter(self, "extended", extended)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Status is immutable, can't set {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Status is immutable, can't delete {name}")
+
+    def _values(self) -> Tuple[Any, ...]:
+        """every field, in slot order"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Status):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return hash(self._values())
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)}" for name in STATUS_VALUES if getattr(self, name) is not None)
+        return f"Status({self.timestamp.isoformat(timespec='minutes')}, {values})"
+
+    def __reduce__(self) -> Any:
+        # object.__setattr__ is bypassed by the default pickling, so rebuild it with the constructor
+        return (Status, self._values())
+
+    @property
+    def d(self) -> str:  # pylint: disable=invalid-name
+        """the date, as PVOutput formats it (YYYYMMDD)"""
+        return f"{self.timestamp.year:04}{self.timestamp.month:02}{self.timestamp.day:02}"
+
+    @property
+    def t(self) -> str:  # pylint: disable=invalid-name
+        """the time, as PVOutput formats it (HH:MM)"""
+        return f"{self.timestamp.hour:02}:{self.timestamp.minute:02}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The dict getstatus (or getstatus_history, for history rows) would have returned for this status.
+
+        v7-v12 are only included if they were requested, and energy_efficiency and average_power if they're set.
+        """
+        result: Dict[str, Any] = {
+            "d": self.d,
+            "t": self.t,
+            "timestamp": self.timestamp,
+            "v1": self.v1,
+            "v2": self.v2,
+            "v3": self.v3,
+            "v4": self.v4,
+            "v5": self.v5,
+            "v6": self.v6,
+            "normalised_output": self.normalised_output,
+        }
+        if self.energy_efficiency is not None or self.average_power is not None:
+            result["energy_efficiency"] = self.energy_efficiency
+            result["average_power"] = self.average_power
+        if self.extended:
+            for name in EXTENDED_VALUES:
+                result[name] = getattr(self, name)
+        return result
+
+    def to_wire(self) -> Dict[str, Any]:
+        """The addstatus fields for this status - the date, time and whichever of v1-v12 are set.
+
+        Whole numbers are sent as ints, as PVOutput expects for energy and power, apart from temperature and voltage
+        (v5 and v6) which are always floats.
+        """
+        result: Dict[str, Any] = {"d": self.d, "t": self.t}
+        for name in STATUS_VALUES:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if name in FLOAT_VALUES:
+                result[name] = float(value)
+            elif isinstance(value, float) and value.is_integer():
+                result[name] = int(value)
+            else:
+                result[name] = value
+        return result
+
+
+# anything which can be uploaded as a status
+StatusLike = Union[Dict[str, Any], Status]
@@ -0,0 +1,153 @@
+"""The HTTP libraries the clients can send calls with
+
+The sync client uses requests and the asyncio client uses aiohttp, unless you pass `transport="httpx"`, which uses
+httpx instead. httpx can use HTTP/2, so lots of concurrent calls (eg, from a MultiSystemPVOutput) share one connection
+rather than opening one each. It isn't installed with pvoutput, install it with `pip install pvoutput[httpx]`.
+
+None of them are imported until a client needs one, so `import pvoutput` stays quick for short-lived scripts.
+
+```python
+pvo = PVOutput(apikey=apikey, systemid=systemid, transport="httpx")
+```
+"""
+
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Tuple, Type, Union
+
+from .exceptions import PVOutputError
+from .parameters import DEFAULT_MAX_RETRIES, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, DEFAULT_REQUEST_TIMEOUT
+
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+    import requests
+    from urllib3.util import Retry
+
+__all__ = [
+    "TRANSPORTS",
+    "ASYNC_TRANSPORTS",
+    "requests_session",
+    "aiohttp_session",
+    "httpx_client",
+    "httpx_async_client",
+    "error_details",
+    "is_network_error",
+]
+
+# the transports each client can use, the first is the default
+TRANSPORTS = ("requests", "httpx")
+ASYNC_TRANSPORTS = ("aiohttp", "httpx")
+
+
+def _import_httpx() -> Any:
+    """imports httpx, with a helpful error if it's not there"""
+    try:
+        return importlib.import_module("httpx")
+    except ImportError as error:
+        raise ImportError("httpx is needed for this, install it with `pip install pvoutput[httpx]`") from error
+
+
+def requests_session(
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    max_retries: Union[int, "Retry"] = DEFAULT_MAX_RETRIES,
+) -> "requests.Session":
+    """A requests.Session for the sync client, with a connection pool for http and https.
+
+    :param pool_connections: number of connection pools to cache
+    :type pool_connections: int
+    :param pool_maxsize: maximum number of connections to keep in each pool
+    :type pool_maxsize: int
+    :param max_retries: retries for failed connections, or a urllib3 Retry object
+    :type max_retries: int or urllib3.util.Retry
+    """
+    import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=max_retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def aiohttp_session(limit: Optional[int] = None) -> "aiohttp.ClientSession":
+    """An aiohttp.ClientSession for the asyncio client, limit is the most connections to open (aiohttp's default if None)."""
+    import aiohttp  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    if limit is None:
+        return aiohttp.ClientSession()
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit))
+
+
+def _httpx_options(http2: bool, pool_maxsize: int, keep_alive: bool) -> Any:
+    """the arguments for an httpx client"""
+    httpx = _import_httpx()
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize if keep_alive else 0),
+        "timeout": DEFAULT_REQUEST_TIMEOUT,
+    }
+
+
+def httpx_client(http2: bool = True, pool_maxsize: int = DEFAULT_POOL_MAXSIZE, keep_alive: bool = True) -> Any:
+    """An httpx.Client set up for the sync client.
+
+    :param http2: use HTTP/2 if the server supports it, which needs the h2 package
+    :type http2: bool
+    :param pool_maxsize: the most connections to open
+    :type pool_maxsize: int
+    :param keep_alive: keep connections open between calls
+    :type keep_alive: bool
+    """
+    return _import_httpx().Client(**_httpx_options(http2, pool_maxsize, keep_alive))
+
+
+def httpx_async_client(http2: bool = True, pool_maxsize: int = DEFAULT_POOL_MAXSIZE, keep_alive: bool = True) -> Any:
+    """An httpx.AsyncClient set up for the asyncio client, see httpx_client for the parameters."""
+    return _import_httpx().AsyncClient(**_httpx_options(http2, pool_maxsize, keep_alive))
+
+
+def _loaded(module: str) -> Any:
+    """a module, if something's imported it - if nothing has, none of its errors can have been raised"""
+    return sys.modules.get(module)
+
+
+def error_details(error: BaseException) -> Tuple[Optional[int], Mapping[str, str]]:
+    """The HTTP status and headers from a failed call, if it got a response."""
+    if isinstance(error, PVOutputError):
+        return error.status, error.headers
+    requests = _loaded("requests")  # pylint: disable=redefined-outer-name
+    if requests is not None and isinstance(error, requests.HTTPError) and error.response is not None:
+        return int(error.response.status_code), error.response.headers
+    aiohttp = _loaded("aiohttp")  # pylint: disable=redefined-outer-name
+    if aiohttp is not None and isinstance(error, aiohttp.ClientResponseError):
+        return int(error.status), error.headers or {}
+    httpx = _loaded("httpx")
+    if httpx is not None and isinstance(error, httpx.HTTPStatusError):
+        return int(error.response.status_code), error.response.headers
+    return None, {}
+
+
+def _network_errors() -> Tuple[Type[BaseException], ...]:
+    """the errors each of the loaded HTTP libraries raise when a call doesn't get a response"""
+    errors: Tuple[Type[BaseException], ...] = (TimeoutError,)
+    for module, names in (
+        ("asyncio", ("TimeoutError",)),
+        ("requests", ("ConnectionError", "Timeout")),
+        ("aiohttp", ("ClientConnectionError",)),
+        ("httpx", ("TransportError",)),
+    ):
+        loaded = _loaded(module)
+        if loaded is not None:
+            errors += tuple(getattr(loaded, name) for name in names)
+    return errors
+
+
+def is_network_error(error: BaseException) -> bool:
+    """Whether a call failed without getting a response, eg it couldn't connect or timed out."""
+    return isinstance(error, _network_errors())
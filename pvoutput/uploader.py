@@ -0,0 +1,202 @@
+"""Background batch uploading of statuses for the synchronous client"""
+
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+from .exceptions import StatusesNotAddedError
+from .protocol import batch_results, rows_added, rows_not_added
+from .status import StatusLike
+
+if TYPE_CHECKING:
+    from pvoutput import PVOutput
+
+__all__ = [
+    "StatusUploader",
+]
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 60.0
+
+_STOP = object()
+
+
+class StatusUploader:
+    """Buffers statuses and uploads them in batches from a background thread, so collecting data never waits on the network.
+
+    Statuses are sent with PVOutput.addbatchstatus when max_batch_size statuses are waiting, or when the oldest waiting
+    status is flush_interval seconds old, whichever comes first.
+
+    ```python
+    with StatusUploader(PVOutput(apikey=apikey, systemid=systemid)) as uploader:
+        while True:
+            uploader.put({"v2": read_inverter_power()})
+            time.sleep(300)
+    ```
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        client: "PVOutput",
+        max_batch_size: Optional[int] = None,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue_size: int = 0,
+        c1: bool = False,
+        n: bool = False,
+        on_error: Optional[Callable[[Exception, List[Dict[str, Any]]], None]] = None,
+        retries: int = 1,
+    ) -> None:
+        """Setup code
+
+        :param client: the client to upload with
+        :type client: pvoutput.PVOutput
+        :param max_batch_size: upload once this many statuses are waiting, defaults to the most the account can send in one batch
+        :type max_batch_size: int
+        :param flush_interval: upload once the oldest waiting status is this many seconds old
+        :type flush_interval: float
+        :param max_queue_size: the most statuses to hold before put() raises queue.Full, 0 is unlimited
+        :type max_queue_size: int
+        :param c1: send the batches with the cumulative flag set
+        :type c1: bool
+        :param n: send the batches with the net flag set
+        :type n: bool
+        :param on_error: called with the exception and the statuses when an upload fails, otherwise the error is logged and the statuses are dropped
+        :type on_error: callable
+        :param retries: how many more times to send statuses PVOutput says it didn't add, then they're passed to on_error with a StatusesNotAddedError
+        :type retries: int
+        """
+        self.client = client
+        self.max_batch_size = max_batch_size or client.batch_status_size
+        self.flush_interval = flush_interval
+        self.c1 = c1
+        self.n = n
+        self.on_error = on_error
+        self.retries = retries
+        self._queue: "queue.Queue[Union[Dict[str, Any], threading.Event, object]]" = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        # held while checking _closed and queueing, so nothing's queued after _STOP
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="pvoutput-status-uploader", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "StatusUploader":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def put(self, status: StatusLike) -> None:
+        """Queues a status for upload, without waiting on the network.
+
+        The status is validated straight away, so errors are raised here rather than in the background thread.
+        If no time is set, it's set to now (rounded to the stats period), not the time it's sent.
+
+        :param status: the status, as you'd pass to PVOutput.addstatus - only the d, t and v1-v12 fields are supported
+        :type status: dict or pvoutput.status.Status
+
+        :raises ValueError: if the status is invalid, or the uploader's been closed
+        :raises RuntimeError: if the background thread has stopped
+        :raises queue.Full: if max_queue_size statuses are already waiting
+        """
+        row = self.client.prepare_batch_status(status, c1=self.c1)
+        with self._lock:
+            self._check_running()
+            self._queue.put_nowait(row)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Uploads everything queued so far, waiting for it to finish.
+
+        :param timeout: how long to wait, None waits forever
+        :type timeout: float
+
+        :returns: True if the upload finished within the timeout
+        :rtype: bool
+
+        :raises ValueError: if the uploader's been closed, as there's nothing left to flush it
+        :raises RuntimeError: if the background thread has stopped
+        """
+        done = threading.Event()
+        with self._lock:
+            self._check_running()
+            self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Uploads anything that's waiting and stops the background thread.
+
+        :param timeout: how long to wait for the thread, None waits forever
+        :type timeout: float
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _check_running(self) -> None:
+        """raises if nothing's going to take statuses off the queue"""
+        if self._closed:
+            raise ValueError("StatusUploader is closed")
+        if not self._thread.is_alive():
+            raise RuntimeError("StatusUploader's background thread has stopped")
+
+    def _failed(self, error: Exception, rows: List[Dict[str, Any]]) -> None:
+        """passes statuses which couldn't be uploaded to on_error, or logs them"""
+        if self.on_error is None:
+            LOGGER.error("Failed to upload %d statuses", len(rows), exc_info=error)
+            return
+        try:
+            self.on_error(error, rows)
+        except Exception:  # pylint: disable=broad-except
+            # it mustn't stop the background thread
+            LOGGER.exception("on_error raised handling %d statuses which failed to upload", len(rows))
+
+    def _upload(self, batch: List[Dict[str, Any]]) -> None:
+        """sends a batch, passing any errors to on_error"""
+        if not batch:
+            return
+        try:
+            # the statuses were validated by put, so they're not checked again
+            results = self.client.addbatchstatus_rows(batch, c1=self.c1, n=self.n, retries=self.retries)
+            not_added = rows_not_added(batch, results)
+            if not_added:
+                raise StatusesNotAddedError(not_added)
+        except StatusesNotAddedError as error:
+            # only the statuses which weren't added need handling
+            self._failed(error, error.rows)
+        except Exception as error:  # pylint: disable=broad-except
+            # statuses PVOutput added before it went wrong don't need handling either
+            added = {id(row) for row in rows_added(batch, batch_results(error))}
+            self._failed(error, [row for row in batch if id(row) not in added])
+
+    def _run(self) -> None:
+        """the background thread, collects statuses and uploads them"""
+        batch: List[Dict[str, Any]] = []
+        deadline = 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()) if batch else None)
+            except queue.Empty:
+                # the oldest status has waited long enough
+                self._upload(batch)
+                batch = []
+                continue
+
+            if isinstance(item, dict):
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) >= self.max_batch_size:
+                    self._upload(batch)
+                    batch = []
+            elif isinstance(item, threading.Event):
+                self._upload(batch)
+                batch = []
+                item.set()
+            else:
+                self._upload(batch)
+                return
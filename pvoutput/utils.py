@@ -1,21 +1,40 @@
 """Utilities"""
 
+import codecs
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Tuple
+import os
+from pathlib import Path
+import sys
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .status import Status
 
 __all__ = [
+    "BASE_URL",
     "URLS",
+    "ENDPOINTS",
     "validate_delete_status_date",
     "ALERT_TYPES",
+    "BATCH_STATUS_FIELDS",
+    "batch_status_data",
+    "history_row_to_response",
+    "responsedata_to_status",
+    "history_row_to_status",
+    "parse_date",
+    "parse_timestamp",
+    "iter_delimited",
+    "aiter_delimited",
+    "private_dir",
+    "user_dir",
 ]
 
 BASE_URL = "https://pvoutput.org/service/r2/"
 
 URLS = {
-    "addbatchstatus": {
-        "url": BASE_URL + "addbatchstatus.jsp",
-        "method": "POST",
-    },
+    "addbatchstatus": (
+        BASE_URL + "addbatchstatus.jsp",
+        "POST",
+    ),
     "addstatus": (
         BASE_URL + "addstatus.jsp",
         "POST",
@@ -46,6 +65,9 @@ URLS = {
     ),
 }
 
+# the path (from BASE_URL) and method of each call, so they can be sent somewhere else
+ENDPOINTS = {name: (url[len(BASE_URL) :], method) for name, (url, method) in URLS.items()}
+
 ALERT_TYPES = {
     0: "All Notifications",
     1: "Private Message",
@@ -67,6 +89,43 @@ ALERT_TYPES = {
 }
 
 
+# the order of the fields in each status of an addbatchstatus call
+# <https://pvoutput.org/help/api_specification.html#api-add-batch-status-data-structure>
+BATCH_STATUS_FIELDS = ("d", "t", "v1", "v2", "v3", "v4", "v5", "v6", "v7", "v8", "v9", "v10", "v11", "v12")
+
+
+def batch_status_data(statuses: Iterable[Dict[str, Any]]) -> str:
+    """Turns validated addstatus-style dicts into the data field of an addbatchstatus call
+
+    Fields are delimited by `,` and statuses by `;`, unset fields are left empty and trailing empty fields are dropped.
+    """
+    rows = []
+    for status in statuses:
+        fields = ["" if status.get(key) is None else str(status[key]) for key in BATCH_STATUS_FIELDS]
+        while fields and fields[-1] == "":
+            fields.pop()
+        rows.append(",".join(fields))
+    return ";".join(rows)
+
+
+def _date_parts(date_string: str) -> Tuple[int, int, int]:
+    """the year, month and day of a PVOutput date (YYYYMMDD)"""
+    if len(date_string) != 8 or not date_string.isdigit():
+        raise ValueError(f"Invalid date '{date_string}'")
+    return int(date_string[:4]), int(date_string[4:6]), int(date_string[6:])
+
+
+def parse_date(date_string: str) -> date:
+    """turns a PVOutput date (YYYYMMDD) into a date, without the overhead of strptime"""
+    return date(*_date_parts(date_string))
+
+
+def parse_timestamp(date_string: str, time_string: str) -> datetime:
+    """turns a PVOutput date (YYYYMMDD) and time (HH:MM) into a datetime, without the overhead of strptime"""
+    hour, minute = time_string.split(":")
+    return datetime(*_date_parts(date_string), int(hour), int(minute))
+
+
 def responsedata_to_response(input_data: List[str]) -> Tuple[Dict[str, Any], List[str]]:
     """Turns the status output into a dict"""
     # pylint: disable=invalid-name
@@ -76,7 +135,7 @@ def responsedata_to_response(input_data: List[str]) -> Tuple[Dict[str, Any], Lis
     responsedata = {
         "d": d,
         "t": t,
-        "timestamp": datetime.strptime(f"{d} {t}", "%Y%m%d %H:%M"),
+        "timestamp": parse_timestamp(d, t),
         "v1": None if v1 == "NaN" else float(v1),
         "v2": None if v2 == "NaN" else float(v2),
         "v3": None if v3 == "NaN" else float(v3),
@@ -88,6 +147,125 @@ def responsedata_to_response(input_data: List[str]) -> Tuple[Dict[str, Any], Lis
     return responsedata, extras
 
 
+def history_row_to_response(input_data: List[str]) -> Dict[str, Any]:
+    """Turns a row of a getstatus history response into a dict, with the same keys as responsedata_to_response
+
+    The history rows are laid out differently to the single status - instantaneous power is v2, and there's also the
+    energy efficiency (kWh/kW) and average power (W) fields. The extended values are included if they were requested.
+    """
+    # pylint: disable=invalid-name
+    d, t, v1, energy_efficiency, v2, average_power, normalised_output, v3, v4, v5, v6, *extras = input_data
+
+    responsedata: Dict[str, Any] = {
+        "d": d,
+        "t": t,
+        "timestamp": parse_timestamp(d, t),
+        "v1": None if v1 == "NaN" else float(v1),
+        "v2": None if v2 == "NaN" else float(v2),
+        "v3": None if v3 == "NaN" else float(v3),
+        "v4": None if v4 == "NaN" else float(v4),
+        "v5": None if v5 == "NaN" else float(v5),
+        "v6": None if v6 == "NaN" else float(v6),
+        "normalised_output": None if normalised_output == "NaN" else float(normalised_output),
+        "energy_efficiency": None if energy_efficiency == "NaN" else float(energy_efficiency),
+        "average_power": None if average_power == "NaN" else float(average_power),
+    }
+    for index, value in enumerate(extras[:6]):
+        responsedata[f"v{index + 7}"] = None if value == "NaN" else float(value)
+    return responsedata
+
+
+def _value(value: str) -> Optional[float]:
+    """a value from a response, with NaN turned into None"""
+    return None if value == "NaN" else float(value)
+
+
+def _extended_values(extras: List[str]) -> List[Optional[float]]:
+    """v7-v12 from the fields after the standard ones, None for any that are missing"""
+    values = [_value(value) for value in extras[:6]]
+    return values + [None] * (6 - len(values))
+
+
+def responsedata_to_status(input_data: List[str]) -> Status:
+    """Turns the status output into a pvoutput.status.Status, rather than the dict responsedata_to_response makes"""
+    # pylint: disable=invalid-name
+    d, t, v1, v2, v3, v4, v5, v6, normalised_output, *extras = input_data
+    v7, v8, v9, v10, v11, v12 = _extended_values(extras)
+    return Status(
+        parse_timestamp(d, t),
+        _value(v1),
+        _value(v2),
+        _value(v3),
+        _value(v4),
+        _value(v5),
+        _value(v6),
+        v7,
+        v8,
+        v9,
+        v10,
+        v11,
+        v12,
+        normalised_output=float(normalised_output),
+        extended=bool(extras),
+    )
+
+
+def history_row_to_status(input_data: List[str]) -> Status:
+    """Turns a row of a getstatus history response into a pvoutput.status.Status, see history_row_to_response"""
+    # pylint: disable=invalid-name
+    d, t, v1, energy_efficiency, v2, average_power, normalised_output, v3, v4, v5, v6, *extras = input_data
+    v7, v8, v9, v10, v11, v12 = _extended_values(extras)
+    return Status(
+        parse_timestamp(d, t),
+        _value(v1),
+        _value(v2),
+        _value(v3),
+        _value(v4),
+        _value(v5),
+        _value(v6),
+        v7,
+        v8,
+        v9,
+        v10,
+        v11,
+        v12,
+        normalised_output=_value(normalised_output),
+        energy_efficiency=_value(energy_efficiency),
+        average_power=_value(average_power),
+        extended=bool(extras),
+    )
+
+
+def iter_delimited(chunks: Iterable[bytes], delimiter: str = ";", encoding: str = "utf-8") -> Iterator[str]:
+    """Splits a streamed response body on a delimiter, yielding each non-empty part as soon as it's complete"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *parts, buffer = buffer.split(delimiter)
+        for part in parts:
+            if part.strip():
+                yield part.strip()
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def aiter_delimited(chunks: AsyncIterable[bytes], delimiter: str = ";", encoding: str = "utf-8") -> AsyncIterator[str]:
+    """The asyncio version of iter_delimited"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *parts, buffer = buffer.split(delimiter)
+        for part in parts:
+            if part.strip():
+                yield part.strip()
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.strip()
+
+
 def get_rate_limit_header(response_object: Any) -> Dict[str, str]:
     """gets the rate limit header from the returned headers"""
     retval = {}
@@ -107,3 +285,39 @@ def validate_delete_status_date(date_val: date) -> None:
     # you can't delete forward of today
     if date_val >= tomorrow:
         raise ValueError(f"date_val can only be yesterday or today, you provided {date_val}")
+
+
+# where user_dir puts each kind of file, as (environment variable, default under the home directory) on Linux and the like
+USER_DIRS = {
+    "cache": ("XDG_CACHE_HOME", (".cache",)),
+    "data": ("XDG_DATA_HOME", (".local", "share")),
+    "state": ("XDG_STATE_HOME", (".local", "state")),
+}
+
+
+def private_dir(path: Union[str, Path]) -> Path:
+    """Creates a directory only the current user can use, or checks an existing one is.
+
+    :raises PermissionError: if it's a symlink, or (where there's owners) it belongs to someone else or others can write to it
+    """
+    path = Path(path)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    stat = os.lstat(path)
+    if path.is_symlink():
+        raise PermissionError(f"{path} is a symlink, refusing to keep state in it")
+    if hasattr(os, "geteuid") and (stat.st_uid != os.geteuid() or stat.st_mode & 0o022):
+        raise PermissionError(f"{path} isn't private to this user, refusing to keep state in it")
+    return path
+
+
+def user_dir(kind: str) -> Path:
+    """The current user's pvoutput directory for a kind of file ("cache", "data" or "state"), created if it's not there.
+
+    It's under the XDG base directories (eg ~/.local/state/pvoutput), or %LOCALAPPDATA% on Windows.
+    """
+    if sys.platform == "win32":  # pragma: no cover
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local") / "pvoutput" / kind
+    else:
+        variable, default = USER_DIRS[kind]
+        base = Path(os.environ.get(variable) or Path.home().joinpath(*default)) / "pvoutput"
+    return private_dir(base)
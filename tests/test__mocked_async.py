@@ -0,0 +1,421 @@
+"""tests asyncio api things, with a fake aiohttp session"""
+
+import asyncio
+import datetime
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import aiohttp
+import pytest
+
+from pvoutput.asyncio import PVOutput
+from pvoutput import utils
+from pvoutput.asyncio.multi import MultiSystemPVOutput
+from pvoutput.asyncio.uploader import StatusUploader
+from pvoutput.asyncio.singleflight import SingleFlight
+from pvoutput.cache import TTLCache
+from pvoutput.spool import StatusSpool
+from pvoutput.retry import RetryPolicy
+from pvoutput.ratelimit import RateLimiter, rate_limit_key
+
+# All test coroutines will be treated as marked.
+pytestmark = pytest.mark.asyncio
+
+
+class FakeContent:
+    """enough of an aiohttp.StreamReader for testing"""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        """yields the body in tiny chunks, to make sure they're put back together"""
+        for index in range(0, len(self.body), 7):
+            yield self.body[index : index + 7]
+
+
+class FakeResponse:
+    """enough of an aiohttp.ClientResponse for testing"""
+
+    def __init__(self, text: str = "", status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        self._text = text
+        self.status = status
+        self.headers = headers or {}
+        self.charset = "utf-8"
+        self.content = FakeContent(text.encode("utf-8"))
+        self.released = False
+
+    def release(self) -> None:
+        """marks the response released"""
+        self.released = True
+
+    async def text(self) -> str:
+        """returns the body"""
+        return self._text
+
+    def raise_for_status(self) -> None:
+        """like the real one, but only raises RuntimeError"""
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP{self.status}")
+
+
+class FakeSession:
+    """enough of an aiohttp.ClientSession for testing, records the calls and returns canned responses"""
+
+    def __init__(self, text: str = "", status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        self.calls: List[Dict[str, Any]] = []
+        self.response = FakeResponse(text=text, status=status, headers=headers)
+
+    async def get(self, **kwargs: Any) -> FakeResponse:
+        """fake get"""
+        self.calls.append({"method": "GET", **kwargs})
+        return self.response
+
+    async def post(self, **kwargs: Any) -> FakeResponse:
+        """fake post, with the form body decoded back into a dict"""
+        if isinstance(kwargs.get("data"), bytes):
+            kwargs["data"] = dict(parse_qsl(kwargs["data"].decode("utf-8")))
+        self.calls.append({"method": "POST", **kwargs})
+        return self.response
+
+
+def fake_pvo(session: FakeSession, donation_made: bool = False) -> PVOutput:
+    """returns a client using the fake session"""
+    return PVOutput(apikey="helloworld", systemid=1, donation_made=donation_made, session=session)  # type: ignore[arg-type]
+
+
+async def test_addstatuses_chunks() -> None:
+    """addstatuses should send batches of 30 statuses to the addbatchstatus endpoint"""
+    session = FakeSession()
+    today = datetime.date.today().strftime("%Y%m%d")
+    statuses = [{"d": today, "t": f"{index // 12:02}:{(index % 12) * 5:02}", "v2": index} for index in range(65)]
+    responses = await fake_pvo(session).addstatuses(statuses)
+    assert len(responses) == 3
+    assert [call["url"] for call in session.calls] == [utils.URLS["addbatchstatus"][0]] * 3
+    assert [call["data"]["data"].count(";") + 1 for call in session.calls] == [30, 30, 5]
+    assert session.calls[0]["data"]["data"].startswith(f"{today},00:00,,0;")
+
+
+async def test_addstatuses_donation_batch_size() -> None:
+    """donators can send 100 statuses per batch"""
+    session = FakeSession()
+    statuses = [{"t": f"{index // 12:02}:{(index % 12) * 5:02}", "v2": index} for index in range(150)]
+    assert len(await fake_pvo(session, donation_made=True).addstatuses(statuses)) == 2
+
+
+async def test_addstatuses_results() -> None:
+    """statuses PVOutput doesn't add should be sent again on their own"""
+    session = FakeSession(text="20240630,10:00,1;20240630,10:05,0")
+    pvo = PVOutput(apikey="helloworld", systemid=1, session=session, clock=lambda: datetime.datetime(2024, 6, 30, 12, 0))  # type: ignore[arg-type]
+    results = await pvo.addstatuses_results([{"t": "10:00", "v2": 1}, {"t": "10:05", "v2": 2}])
+    assert [call["data"]["data"] for call in session.calls] == ["20240630,10:00,,1;20240630,10:05,,2", "20240630,10:05,,2"]
+    assert [(result.t, result.added) for result in results] == [("10:00", True), ("10:05", False)]
+
+
+async def test_addbatchstatus_url() -> None:
+    """addbatchstatus should call the addbatchstatus endpoint"""
+    session = FakeSession()
+    await fake_pvo(session).addbatchstatus("20110112,10:00,705,1029", n=True)
+    assert session.calls[0]["url"] == utils.URLS["addbatchstatus"][0]
+    assert session.calls[0]["data"] == {"data": "20110112,10:00,705,1029", "n": "1"}
+
+
+async def test_base_url_and_send() -> None:
+    """calls go to base_url, and requests built up front can be sent later"""
+    session = FakeSession(text="20240630,12:00,1,2,3,4,0.5,21.5,240.1")
+    pvo = PVOutput(apikey="helloworld", systemid=1, session=session, base_url="http://localhost:8080/r2/")  # type: ignore[arg-type]
+    assert (await pvo.getstatus())["v2"] == 2.0
+    await pvo.send(pvo.addstatus_request({"v2": 500}))
+    assert [call["url"] for call in session.calls] == ["http://localhost:8080/r2/getstatus.jsp", "http://localhost:8080/r2/addstatus.jsp"]
+
+
+class SlowSession(FakeSession):
+    """a fake session that takes a while to post, tracking how many posts run at once"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.running = 0
+        self.max_running = 0
+
+    async def post(self, **kwargs: Any) -> FakeResponse:
+        """fake slow post"""
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.02)
+        self.running -= 1
+        return await super().post(**kwargs)
+
+
+async def test_uploader_batches_concurrent_puts() -> None:
+    """lots of coroutines putting statuses should end up in a few batches, with limited concurrency"""
+    session = SlowSession()
+    async with StatusUploader(fake_pvo(session), max_batch_size=10, linger=3600, concurrency=2) as uploader:
+        await asyncio.gather(*[uploader.put({"t": f"10:{index:02}", "v2": index}) for index in range(45)])
+        await uploader.flush()
+        assert sorted(call["data"]["data"].count(";") + 1 for call in session.calls) == [5, 10, 10, 10, 10]
+    assert session.max_running == 2
+
+
+async def test_uploader_linger() -> None:
+    """a partial batch should be sent once it's lingered long enough"""
+    session = FakeSession()
+    uploader = StatusUploader(fake_pvo(session), linger=0.01)
+    await uploader.put({"t": "10:00", "v2": 1})
+    for _ in range(100):
+        if session.calls:
+            break
+        await asyncio.sleep(0.01)
+    assert len(session.calls) == 1
+    await uploader.close()
+    assert len(session.calls) == 1
+    with pytest.raises(ValueError, match="StatusUploader is closed"):
+        await uploader.put({"t": "10:05", "v2": 1})
+    with pytest.raises(ValueError, match="StatusUploader is closed"):
+        await uploader.flush()
+
+
+async def test_uploader_on_error() -> None:
+    """failed uploads should be passed to on_error, and invalid statuses rejected on put"""
+    failures: List[Any] = []
+    session = FakeSession(text="Unauthorized 401: Invalid API Key", status=401)
+    async with StatusUploader(fake_pvo(session), on_error=lambda error, batch: failures.append(batch)) as uploader:
+        with pytest.raises(ValueError, match=r"one of .* MUST be set"):
+            await uploader.put({"t": "10:00"})
+        await uploader.put({"t": "10:00", "v2": 1})
+    assert len(failures) == 1
+    assert failures[0][0]["v2"] == 1
+
+
+async def test_uploader_on_error_raises(caplog: pytest.LogCaptureFixture) -> None:
+    """an on_error which raises is logged, and doesn't stop later batches being uploaded"""
+
+    def on_error(error: Exception, batch: List[Dict[str, Any]]) -> None:
+        raise RuntimeError("on_error broke")
+
+    session = FakeSession(text="Internal Server Error", status=500)
+    async with StatusUploader(fake_pvo(session), on_error=on_error) as uploader:
+        await uploader.put({"t": "10:00", "v2": 1})
+        await uploader.flush()
+        await uploader.put({"t": "10:05", "v2": 1})
+    assert len(session.calls) == 2
+    assert caplog.text.count("on_error raised") == 2
+
+
+async def test_rate_limiter_headers() -> None:
+    """the async client should feed the rate limit headers to the limiter"""
+    headers = {"X-Rate-Limit-Remaining": "12", "X-Rate-Limit-Limit": "60", "X-Rate-Limit-Reset": str(int(time.time()) + 3600)}
+    session = FakeSession(headers=headers)
+    limiter = RateLimiter()
+    pvo = PVOutput(apikey="helloworld", systemid=1, session=session, rate_limiter=limiter)  # type: ignore[arg-type]
+    await pvo.addstatus({"t": "10:00", "v2": 1})
+    assert session.calls[0]["headers"]["X-Rate-Limit"] == "1"
+    assert pvo.rate_limit == headers
+    assert limiter.state(rate_limit_key("helloworld", 1))["remaining"] == 12
+
+
+async def test_multi_gather() -> None:
+    """getstatus should run for every system, limited by max_concurrency"""
+    session = SlowSession()
+    multi = MultiSystemPVOutput(apikey="helloworld", systemids=range(1, 7), session=session, max_concurrency=2)  # type: ignore[arg-type]
+    assert all(client.session is multi.session for client in multi.clients.values())
+    status = {"v2": 100}
+    results = await multi.call("addstatus", status)
+    assert list(results) == [1, 2, 3, 4, 5, 6]
+    # each system got its own copy to fill the time in on
+    assert status == {"v2": 100}
+    assert session.max_running == 2
+    assert sorted(call["headers"]["X-Pvoutput-SystemId"] for call in session.calls) == ["1", "2", "3", "4", "5", "6"]
+    with pytest.raises(KeyError):
+        await multi.getstatus(systemids=[7])
+    # the session was passed in, so it's left alone (the fake doesn't have a close to call)
+    await multi.close()
+
+
+async def test_multi_per_system_concurrency() -> None:
+    """lots of calls for one system are held to per_system_concurrency, even when max_concurrency would allow more"""
+    session = SlowSession()
+    multi = MultiSystemPVOutput(apikey="helloworld", systemids=[1], session=session, max_concurrency=6, per_system_concurrency=2)  # type: ignore[arg-type]
+    await asyncio.gather(*[multi.call("addstatus", {"t": "10:00", "v2": 100}) for _ in range(6)])
+    assert len(session.calls) == 6
+    assert session.max_running == 2
+    await multi.close()
+
+
+async def test_getstatus_history() -> None:
+    """getstatus_history should stream the rows"""
+    session = FakeSession(
+        text="20210228,17:30,21888,3.040,0,12,NaN,5024,420,15.2,240.1;20210228,17:25,21888,3.040,52,60,0.007,4989,470,15.4,NaN",
+    )
+    statuses = fake_pvo(session).getstatus_history(limit=2)
+    assert not session.calls
+    rows = [status async for status in statuses]
+    assert session.calls[0]["params"] == {"h": 1, "limit": 2}
+    assert [row["t"] for row in rows] == ["17:30", "17:25"]
+    assert rows[1]["v2"] == 52.0
+    assert rows[1]["normalised_output"] == 0.007
+    assert session.response.released
+
+
+async def test_getstatus_history_columns() -> None:
+    """getstatus_history_columns should parse the whole response into columns"""
+    session = FakeSession(
+        text="20210228,17:30,21888,3.040,0,12,NaN,5024,420,15.2,240.1;20210228,17:25,21888,3.040,52,60,0.007,4989,470,15.4,NaN",
+    )
+    columns = await fake_pvo(session).getstatus_history_columns(limit=2)
+    assert session.calls[0]["params"] == {"h": 1, "limit": 2}
+    assert list(columns.column("v2")) == [0.0, 52.0]
+    assert columns[1]["normalised_output"] == 0.007
+
+
+async def test_getstatus_cached() -> None:
+    """the asyncio client should use the cache too"""
+    session = FakeSession(text="20191012,23:00,15910,0,15973,724,NaN,NaN,239.4")
+    pvo = PVOutput(apikey="helloworld", systemid=1, session=session, cache=TTLCache())  # type: ignore[arg-type]
+    first = await pvo.getstatus()
+    assert await pvo.getstatus() == first
+    assert len(session.calls) == 1
+    await pvo.addoutput({"d": datetime.date.today().strftime("%Y%m%d"), "g": 100})
+    await pvo.getstatus()
+    assert len(session.calls) == 3
+
+
+class SlowGetSession(FakeSession):
+    """a fake session where gets take a while"""
+
+    async def get(self, **kwargs: Any) -> FakeResponse:
+        """fake slow get"""
+        self.calls.append({"method": "GET", **kwargs})
+        await asyncio.sleep(0.02)
+        return self.response
+
+
+async def test_getstatus_coalesced() -> None:
+    """concurrent getstatus calls should share one request, and each get their own dict"""
+    session = SlowGetSession(text="20191012,23:00,15910,0,15973,724,NaN,NaN,239.4", headers={"X-Rate-Limit-Remaining": "10"})
+    pvo = fake_pvo(session)
+    statuses = await asyncio.gather(*[pvo.getstatus() for _ in range(20)])
+    assert len(session.calls) == 1
+    assert all(status == statuses[0] for status in statuses)
+    assert statuses[0] is not statuses[1]
+
+    limits = await asyncio.gather(*[pvo.check_rate_limit() for _ in range(5)])
+    assert len(session.calls) == 2
+    assert limits[0] == {"X-Rate-Limit-Remaining": "10"}
+
+    # once it's finished, the next call goes out again
+    await pvo.getstatus()
+    assert len(session.calls) == 3
+
+    pvo.coalesce = False
+    await asyncio.gather(*[pvo.getstatus() for _ in range(3)])
+    assert len(session.calls) == 6
+
+
+async def test_singleflight_errors_and_cancellation() -> None:
+    """everyone should get the error, and cancelling one waiter shouldn't cancel the call for the rest"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def fails() -> None:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("nope")
+
+    results = await asyncio.gather(*[flight.do("key", fails) for _ in range(3)], return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
+
+    async def works() -> int:
+        await asyncio.sleep(0.02)
+        return 42
+
+    first = asyncio.ensure_future(flight.do("key", works))
+    second = asyncio.ensure_future(flight.do("key", works))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 42
+    assert first.cancelled()
+
+
+async def test_spool_areplay(tmp_path: Path) -> None:
+    """the spool should replay through the asyncio client"""
+    session = FakeSession()
+    pvo = fake_pvo(session)
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    spool.add(pvo, {"t": "10:00", "v2": 1})
+    assert await spool.asend(pvo, {"t": "10:05", "v2": 2})
+    assert len(session.calls) == 1
+    assert session.calls[0]["data"]["data"].endswith(",10:05,,2")
+
+
+class ResendTimeoutSession(FakeSession):
+    """a fake session where posts after the first time out"""
+
+    async def post(self, **kwargs: Any) -> FakeResponse:
+        """fake post, which only works once"""
+        response = await super().post(**kwargs)
+        if len(self.calls) > 1:
+            raise asyncio.TimeoutError()
+        return response
+
+
+async def test_resend_times_out(tmp_path: Path) -> None:
+    """if sending statuses again times out, the ones PVOutput already added aren't sent again or passed to on_error"""
+    today = datetime.date.today().strftime("%Y%m%d")
+    text = f"{today},10:00,1;{today},10:03,1;{today},10:06,0"
+    session = ResendTimeoutSession(text=text)
+    pvo = fake_pvo(session)
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    for minute in range(0, 9, 3):
+        spool.add(pvo, {"t": f"10:{minute:02}", "v2": minute})
+    with pytest.raises(asyncio.TimeoutError):
+        await spool.areplay(pvo)
+    assert spool.pending(pvo) == 1
+
+    failures: List[Any] = []
+    session = ResendTimeoutSession(text=text)
+    async with StatusUploader(fake_pvo(session), on_error=lambda error, batch: failures.append(batch)) as uploader:
+        for minute in range(0, 9, 3):
+            await uploader.put({"t": f"10:{minute:02}", "v2": minute})
+    assert len(session.calls) == 2
+    assert [[row["t"] for row in batch] for batch in failures] == [["10:06"]]
+
+
+class FlakySession(FakeSession):
+    """a fake session where the first few gets can't connect"""
+
+    def __init__(self, failures: int, text: str = "") -> None:
+        super().__init__(text=text)
+        self.failures = failures
+
+    async def get(self, **kwargs: Any) -> FakeResponse:
+        """fake flaky get"""
+        self.calls.append({"method": "GET", **kwargs})
+        if len(self.calls) <= self.failures:
+            raise aiohttp.ClientConnectionError("no route to host")
+        return self.response
+
+
+async def test_retry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """the asyncio client should retry connection errors"""
+    sleeps: List[float] = []
+
+    async def fake_sleep(delay: float) -> None:
+        sleeps.append(delay)
+
+    monkeypatch.setattr("pvoutput.asyncio.asyncio.sleep", fake_sleep)
+    session = FlakySession(failures=2, text="20191012,23:00,15910,0,15973,724,NaN,NaN,239.4")
+    pvo = PVOutput(apikey="helloworld", systemid=1, session=session, retry=RetryPolicy(jitter=False))  # type: ignore[arg-type]
+    assert (await pvo.getstatus())["v1"] == 15910
+    assert len(session.calls) == 3
+    assert sleeps == [1.0, 2.0]
+
+    session = FlakySession(failures=5)
+    pvo = PVOutput(apikey="helloworld", systemid=1, session=session, retry=RetryPolicy(max_attempts=2, jitter=False))  # type: ignore[arg-type]
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await pvo.getstatus()
+    assert len(session.calls) == 2
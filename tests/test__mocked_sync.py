@@ -2,14 +2,17 @@
 
 import datetime
 import re
-from typing import Any
+from urllib.parse import parse_qs
+from typing import Any, Dict, List
 
 import pytest
+import requests
 import requests_mock
 
 import pvoutput
 import pvoutput.parameters
 import pvoutput.exceptions
+import pvoutput.utils
 
 # because we're testing, just grab everything.
 URLMATCHER = re.compile(".*")
@@ -136,7 +139,7 @@ def test_headers_gen(pvo: pvoutput.PVOutput = good_pvo()) -> None:
 
 def test_api_validation_addstatus_shouldwork() -> None:
     """tests the validator for addstatus()"""
-    data = {"d": "20190515", "t": "12:34", "v1": 123}
+    data = {"d": (datetime.date.today() - datetime.timedelta(days=30)).strftime("%Y%m%d"), "t": "12:34", "v1": 123}
     assert good_pvo_with_donation().validate_data(data, pvoutput.parameters.ADDSTATUS_PARAMETERS)
 
 
@@ -386,3 +389,236 @@ def test_datetime_fix(patch_datetime_now: Any) -> None:
         )
         response = pvo.addstatus(test_data)
         assert response.status_code == 200
+
+
+def test_calls_use_session() -> None:
+    """calls should go through the session the client was given"""
+    session = requests.Session()
+    adapter = requests_mock.Adapter()
+    adapter.register_uri("POST", URLMATCHER, text="OK 200: Added Status", status_code=200)
+    session.mount("https://", adapter)
+
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, session=session)
+    response = pvo.addstatus({"t": "12:00", "v1": 123})
+    assert response.text == "OK 200: Added Status"
+    assert adapter.call_count == 1
+    assert adapter.last_request is not None
+    assert adapter.last_request.headers["X-Pvoutput-SystemId"] == "1"
+
+
+def test_default_session_pool_settings() -> None:
+    """the session created for you should be configured with the pool settings"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, pool_maxsize=4, max_retries=2)
+    assert isinstance(pvo.session, requests.Session)
+    adapter = pvo.session.get_adapter(pvoutput.utils.BASE_URL)
+    assert isinstance(adapter, requests.adapters.HTTPAdapter)
+    assert adapter._pool_maxsize == 4  # type: ignore[attr-defined]
+    assert adapter.max_retries.total == 2
+
+
+def test_keep_alive_disabled() -> None:
+    """keep_alive=False should ask the server to close the connection"""
+    with pvoutput.PVOutput(apikey="helloworld", systemid=1, keep_alive=False) as pvo:
+        with requests_mock.mock() as mock:
+            mock.post(URLMATCHER, text="", status_code=200)
+            pvo.addstatus({"t": "12:00", "v1": 123})
+            assert mock.last_request is not None
+            assert mock.last_request.headers["Connection"] == "close"
+
+
+def test_call_unknown_method() -> None:
+    """unknown methods should raise a useful error"""
+    with pytest.raises(pvoutput.exceptions.UnknownMethodError, match="unknown method PUT"):
+        good_pvo()._call(endpoint=pvoutput.utils.BASE_URL, method="PUT")  # pylint: disable=protected-access
+
+
+def test_batch_status_data() -> None:
+    """tests the addbatchstatus data serialiser"""
+    statuses = [
+        {"d": "20110112", "t": "10:00", "v1": 705, "v2": 1029},
+        {"d": "20110112", "t": "10:05", "v2": 775, "v5": 23.5},
+        {"d": "20110112", "t": "10:10", "v1": 800, "v7": 1.0},
+    ]
+    assert pvoutput.utils.batch_status_data(statuses) == "20110112,10:00,705,1029;20110112,10:05,,775,,,23.5;20110112,10:10,800,,,,,,1.0"
+
+
+def test_addstatuses_chunks() -> None:
+    """addstatuses should send batches of 30 statuses to the addbatchstatus endpoint"""
+    today = datetime.date.today().strftime("%Y%m%d")
+    statuses = [{"d": today, "t": f"{index // 12:02}:{(index % 12) * 5:02}", "v2": index} for index in range(65)]
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        responses = good_pvo_no_donation().addstatuses(statuses, c1=True)
+        assert len(responses) == 3
+        assert [request.url for request in mock.request_history] == [pvoutput.utils.URLS["addbatchstatus"][0]] * 3
+        batches = [str(request.text) for request in mock.request_history]
+    assert [batch.count("%3B") + 1 for batch in batches] == [30, 30, 5]
+    assert batches[0].startswith(f"data={today}%2C00%3A00%2C%2C0%3B")
+    assert batches[0].endswith("&c1=1")
+
+
+def test_addstatuses_results() -> None:
+    """only the statuses PVOutput didn't add should be sent again"""
+    today = datetime.date.today().strftime("%Y%m%d")
+    refused = {"00:05", "00:15"}
+    sent: List[List[str]] = []
+
+    def add_batch(request: Any, context: Any) -> str:
+        rows = [row.split(",")[:2] for row in parse_qs(request.text)["data"][0].split(";")]
+        sent.append([t for _, t in rows])
+        results = ";".join(f"{d},{t},{int(t not in refused)}" for d, t in rows)
+        # 00:05 gets added the second time round, 00:15 never does
+        refused.discard("00:05")
+        return results
+
+    statuses = [{"d": today, "t": f"00:{minute:02}", "v2": minute} for minute in range(0, 60, 5)]
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text=add_batch, status_code=200)
+        results = good_pvo_no_donation().addstatuses_results(statuses, retries=2)
+    assert sent == [[status["t"] for status in statuses], ["00:05", "00:15"], ["00:15"]]
+    assert [result.t for result in results if not result.added] == ["00:15"]
+    assert len(results) == 12
+
+
+def test_addstatuses_donation_batch_size() -> None:
+    """donators can send 100 statuses per batch"""
+    statuses = [{"t": f"{index // 12:02}:{(index % 12) * 5:02}", "v2": index} for index in range(150)]
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        assert len(good_pvo_with_donation().addstatuses(statuses)) == 2
+
+
+def test_addstatuses_invalid_sends_nothing() -> None:
+    """if any status is invalid, nothing should be sent"""
+    statuses: List[Dict[str, Any]] = [{"t": "10:00", "v2": 1}, {"t": "10:05"}]
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        with pytest.raises(ValueError, match=r"one of .* MUST be set"):
+            good_pvo().addstatuses(statuses)
+        with pytest.raises(ValueError, match="key m1 isn't valid in a batch status"):
+            good_pvo_with_donation().addstatuses([{"t": "10:00", "v2": 1, "m1": "hello"}])
+        assert not mock.called
+
+
+def test_addbatchstatus_too_many() -> None:
+    """addbatchstatus should refuse data strings with too many statuses"""
+    data = ";".join(["20110112,10:00,705,1029"] * 31)
+    with pytest.raises(ValueError, match="addbatchstatus accepts up to 30 statuses, got 31"):
+        good_pvo_no_donation().addbatchstatus(data)
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        good_pvo_with_donation().addbatchstatus(data, c1=True, n=True)
+        assert mock.last_request is not None
+        assert mock.last_request.url == pvoutput.utils.URLS["addbatchstatus"][0]
+
+
+HISTORY_DATA = (
+    "20210228,17:30,21888,3.040,0,12,NaN,5024,420,15.2,240.1,100.0,NaN,NaN,NaN,NaN,NaN;"
+    "20210228,17:25,21888,3.040,52,60,0.007,4989,470,15.4,NaN,101.0,NaN,NaN,NaN,NaN,NaN;"
+    "20210228,17:20,21883,3.039,93,96,0.013,4950,400,NaN,NaN,102.0,NaN,NaN,NaN,NaN,NaN"
+)
+
+
+def test_iter_delimited() -> None:
+    """rows split across chunks (and multi-byte characters split across chunks) should be put back together"""
+    body = "a,1;b,2;c,°;;d,4\n".encode("utf-8")
+    chunks = [body[index : index + 3] for index in range(0, len(body), 3)]
+    assert list(pvoutput.utils.iter_delimited(chunks)) == ["a,1", "b,2", "c,°", "d,4"]
+
+
+def test_getstatus_history() -> None:
+    """getstatus_history should ask for the history and parse the rows lazily"""
+    pvo = good_pvo_with_donation()
+    with requests_mock.mock() as mock:
+        mock.get(URLMATCHER, text=HISTORY_DATA, status_code=200)
+        statuses = pvo.getstatus_history(
+            date_val=datetime.date(2021, 2, 28),
+            from_time=datetime.time(17, 0),
+            limit=3,
+            ascending=True,
+        )
+        # nothing's been requested until you start iterating
+        assert not mock.called
+        first = next(statuses)
+        assert mock.last_request is not None
+        assert mock.last_request.qs == {"h": ["1"], "d": ["20210228"], "from": ["17:00"], "limit": ["3"], "asc": ["1"], "ext": ["1"], "sid": ["1"]}
+        rest = list(statuses)
+
+    assert first == {
+        "d": "20210228",
+        "t": "17:30",
+        "timestamp": datetime.datetime(2021, 2, 28, 17, 30),
+        "v1": 21888.0,
+        "v2": 0.0,
+        "v3": 5024.0,
+        "v4": 420.0,
+        "v5": 15.2,
+        "v6": 240.1,
+        "normalised_output": None,
+        "energy_efficiency": 3.04,
+        "average_power": 12.0,
+        "v7": 100.0,
+        "v8": None,
+        "v9": None,
+        "v10": None,
+        "v11": None,
+        "v12": None,
+    }
+    assert [status["t"] for status in rest] == ["17:25", "17:20"]
+    assert rest[0]["v2"] == 52.0
+
+
+def test_getstatus_history_validation() -> None:
+    """the history options should be validated before anything's sent"""
+    with pytest.raises(ValueError, match="limit cannot be higher than 288"):
+        good_pvo().getstatus_history(limit=289)
+    with pytest.raises(TypeError):
+        good_pvo().getstatus_history(date_val="20210228")  # type: ignore[arg-type]
+
+
+def test_getstatus_history_columns() -> None:
+    """getstatus_history_columns should parse the same rows as getstatus_history"""
+    pvo = good_pvo_with_donation()
+    with requests_mock.mock() as mock:
+        mock.get(URLMATCHER, text=HISTORY_DATA, status_code=200)
+        columns = pvo.getstatus_history_columns(date_val=datetime.date(2021, 2, 28), limit=3)
+        assert mock.last_request is not None
+        assert mock.last_request.qs["limit"] == ["3"]
+        rows = list(pvo.getstatus_history(date_val=datetime.date(2021, 2, 28), limit=3))
+    assert list(columns.column("v2")) == [0.0, 52.0, 93.0]
+    assert list(columns) == rows
+
+
+def test_addstatus_date_window() -> None:
+    """statuses older than 14 days (90 for donators) should be rejected without a call"""
+    clock = lambda: datetime.datetime(2024, 6, 30, 12, 0)  # noqa: E731
+    free = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=clock)
+    donator = pvoutput.PVOutput(apikey="helloworld", systemid=1, donation_made=True, clock=clock)
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="OK 200: Added Status", status_code=200)
+        free.addstatus({"d": "20240616", "t": "10:00", "v2": 1})
+        with pytest.raises(ValueError, match="d 20240615 is 15 days ago, PVOutput only accepts up to 14 days"):
+            free.addstatus({"d": "20240615", "t": "10:00", "v2": 1})
+        donator.addstatus({"d": "20240401", "t": "10:00", "v2": 1})
+        with pytest.raises(ValueError, match="up to 90 days"):
+            donator.addstatus({"d": "20240331", "t": "10:00", "v2": 1})
+        assert mock.call_count == 2
+    # the default time comes from the clock too
+    assert free.get_time_by_base() == "12:00"
+
+
+def test_addstatuses_reports_every_invalid_status() -> None:
+    """all the invalid statuses should be reported at once, with the valid ones available"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: datetime.datetime(2024, 6, 30, 12, 0))
+    statuses: List[Dict[str, Any]] = [
+        {"d": "20240629", "t": "10:00", "v2": 1},
+        {"d": "20240101", "t": "10:00", "v2": 2},
+        {"d": "20240629", "t": "10:05"},
+        {"d": "20240629", "t": "10:10", "v2": 4},
+    ]
+    with requests_mock.mock() as mock:
+        with pytest.raises(pvoutput.exceptions.BatchValidationError, match="2 of 4 statuses are invalid") as error:
+            pvo.addstatuses(statuses)
+        assert not mock.called
+    assert [index for index, _, _ in error.value.errors] == [1, 2]
+    assert [row["v2"] for row in error.value.valid] == [1, 4]
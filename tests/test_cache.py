@@ -0,0 +1,120 @@
+"""tests for the response cache"""
+
+from pathlib import Path
+import re
+
+import pytest
+import requests_mock
+
+import pvoutput
+from pvoutput.cache import ResponseCache, SqliteCache, TTLCache, seconds_until_next_period
+
+STATUS = "20191012,23:00,15910,0,15973,724,NaN,NaN,239.4"
+
+
+class FakeClock:
+    """a clock that only moves when you tell it to"""
+
+    def __init__(self, now: float = 1_600_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_seconds_until_next_period() -> None:
+    """should line up with the stats_period boundaries"""
+    assert seconds_until_next_period(5, 600.0) == 300.0
+    assert seconds_until_next_period(5, 690.0) == 210.0
+    assert seconds_until_next_period(15, 1799.0) == 1.0
+
+
+def test_ttl_cache_expiry_and_lru() -> None:
+    """values should expire, and the least recently used should be dropped first"""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", "1", ttl=10)
+    cache.set("b", "2", ttl=60)
+    assert cache.get("a") == "1"
+    cache.set("c", "3", ttl=60)
+    # b was used least recently
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    clock.now += 30
+    assert cache.get("a") is None
+    assert cache.get("c") == "3"
+
+
+def test_ttl_cache_invalidate() -> None:
+    """invalidate should only drop the matching keys"""
+    cache = TTLCache()
+    cache.set("one:a", "1", ttl=60)
+    cache.set("one:b", "2", ttl=60)
+    cache.set("two:a", "3", ttl=60)
+    cache.invalidate("one:")
+    assert [cache.get(key) for key in ("one:a", "one:b", "two:a")] == [None, None, "3"]
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_sqlite_cache(tmp_path: Path) -> None:
+    """values should be shared between caches using the same file, and expire"""
+    clock = FakeClock()
+    first = SqliteCache(tmp_path / "cache.sqlite3", clock=clock)
+    second = SqliteCache(tmp_path / "cache.sqlite3", clock=clock)
+    first.set("one:a", "1", ttl=60)
+    first.set("one_b", "2", ttl=60)
+    assert second.get("one:a") == "1"
+    second.invalidate("one:")
+    assert first.get("one:a") is None
+    assert first.get("one_b") == "2"
+    clock.now += 61
+    assert second.get("one_b") is None
+    first.close()
+    second.close()
+
+
+def test_sqlite_cache_default_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """the default database should be in a directory private to the user, not the shared temp dir"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache = SqliteCache()
+    assert cache.path == tmp_path / "pvoutput" / "responses.sqlite3"
+    assert (tmp_path / "pvoutput").stat().st_mode & 0o077 == 0
+    cache.close()
+    with pytest.raises(TypeError):
+        ResponseCache()  # type: ignore[abstract]  # pylint: disable=abstract-class-instantiated
+
+
+def test_getstatus_cached() -> None:
+    """getstatus should be cached until the next stats_period, and sending data should invalidate it"""
+    clock = FakeClock(now=1_600_000_020.0)
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, cache=TTLCache(clock=clock))
+    with requests_mock.mock() as mock:
+        mock.get(re.compile(".*"), text=STATUS, status_code=200)
+        mock.post(re.compile(".*"), text="OK 200: Added Status", status_code=200)
+        first = pvo.getstatus()
+        assert pvo.getstatus() == first
+        assert mock.call_count == 1
+
+        assert pvo.getstatus(use_cache=False) == first
+        assert mock.call_count == 2
+
+        # the cached status is from the last period once the clock passes the boundary
+        clock.now += seconds_until_next_period(pvo.stats_period, clock.now)
+        pvo.getstatus()
+        assert mock.call_count == 3
+
+        pvo.addstatus({"v2": 500, "t": "10:00"})
+        pvo.getstatus()
+        assert mock.call_count == 5
+
+
+def test_cache_is_per_system() -> None:
+    """clients sharing a cache shouldn't see each other's responses"""
+    cache = TTLCache()
+    with requests_mock.mock() as mock:
+        mock.get(re.compile(".*"), text=STATUS, status_code=200)
+        pvoutput.PVOutput(apikey="helloworld", systemid=1, cache=cache).getstatus()
+        pvoutput.PVOutput(apikey="helloworld", systemid=2, cache=cache).getstatus()
+        pvoutput.PVOutput(apikey="helloworld", systemid=2, cache=cache).getstatus()
+        assert mock.call_count == 2
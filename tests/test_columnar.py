@@ -0,0 +1,91 @@
+"""tests for the columnar parser"""
+
+from array import array
+import datetime
+import math
+
+import pytest
+
+from pvoutput import utils
+from pvoutput.columnar import HISTORY_LAYOUT, STATUS_LAYOUT, epoch_seconds, parse_status_columns
+
+HISTORY_DATA = (
+    "20210228,17:30,21888,3.040,0,12,NaN,5024,420,15.2,240.1,100.0,NaN,NaN,NaN,NaN,NaN;"
+    "20210228,17:25,21888,3.040,52,60,0.007,4989,470,15.4,NaN,101.0,NaN,NaN,NaN,NaN,NaN;"
+    "20210301,00:00,21883,3.039,93,96,0.013,4950,400,NaN,NaN,102.0,NaN,NaN,NaN,NaN,NaN"
+)
+
+
+def test_epoch_seconds() -> None:
+    """should match what datetime gives you, including leap years and the start of the epoch"""
+    for value in (
+        datetime.datetime(1970, 1, 1, 0, 0),
+        datetime.datetime(2000, 2, 29, 23, 59),
+        datetime.datetime(2021, 2, 28, 17, 30),
+        datetime.datetime(2024, 12, 31, 12, 5),
+    ):
+        expected = int((value - datetime.datetime(1970, 1, 1)).total_seconds())
+        assert epoch_seconds(value.strftime("%Y%m%d"), value.strftime("%H:%M")) == expected
+
+
+def test_epoch_seconds_invalid() -> None:
+    """bad dates and times should raise ValueError"""
+    for date_string, time_string in (("2021022", "10:00"), ("20211328", "10:00"), ("20210228", "25:00"), ("20210228", "1000")):
+        with pytest.raises(ValueError):
+            epoch_seconds(date_string, time_string)
+
+    # the same dates as utils.parse_timestamp, including the length of each month
+    for date_string in ("20240231", "20230229", "20240431", "00000101"):
+        with pytest.raises(ValueError):
+            utils.parse_timestamp(date_string, "10:00")
+        with pytest.raises(ValueError):
+            epoch_seconds(date_string, "10:00")
+    assert epoch_seconds("20240229", "10:00") == int((datetime.datetime(2024, 2, 29, 10) - datetime.datetime(1970, 1, 1)).total_seconds())
+
+
+def test_parse_history_columns() -> None:
+    """columns should be arrays, keep the NaNs, and the rows should match history_row_to_response"""
+    columns = parse_status_columns(HISTORY_DATA)
+    assert len(columns) == 3
+    assert isinstance(columns.timestamps, array)
+    assert columns.timestamps[0] == epoch_seconds("20210228", "17:30")
+    assert list(columns.column("v2")) == [0.0, 52.0, 93.0]
+    assert math.isnan(columns.column("normalised_output")[0])
+    assert columns.datetimes()[2] == datetime.datetime(2021, 3, 1)
+    assert list(columns) == [utils.history_row_to_response(row.split(",")) for row in HISTORY_DATA.split(";")]
+
+
+def test_parse_status_columns_layout() -> None:
+    """the getstatus layout, without the extended fields"""
+    rows = ["20210228,17:30,21888,0,5024,420,15.2,240.1,0.000", "20210228,17:25,21888,52,4989,NaN,15.4,NaN,0.007"]
+    columns = parse_status_columns(rows, STATUS_LAYOUT)
+    assert set(columns.columns) == set(STATUS_LAYOUT[2:9])
+    for index, row in enumerate(rows):
+        expected, extras = utils.responsedata_to_response(row.split(","))
+        assert not extras
+        assert columns[index] == expected
+
+
+def test_parse_columns_ragged_and_empty() -> None:
+    """short rows are padded with NaN, and an empty response gives empty columns"""
+    columns = parse_status_columns("20210228,17:30,1,2,3;20210228,17:35,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15")
+    assert len(columns.columns) == len(HISTORY_LAYOUT) - 2
+    assert math.isnan(columns.column("v12")[0])
+    assert columns.column("v12")[1] == 15.0
+
+    empty = parse_status_columns("")
+    assert len(empty) == 0
+    assert list(empty) == []
+    assert "v2" in empty.columns
+
+
+def test_parse_timestamp() -> None:
+    """the strptime replacement should give the same answers, and still reject junk"""
+    assert utils.parse_timestamp("20210228", "17:30") == datetime.datetime.strptime("20210228 17:30", "%Y%m%d %H:%M")
+    with pytest.raises(ValueError):
+        utils.parse_timestamp("2021-02-28", "17:30")
+    with pytest.raises(ValueError):
+        utils.parse_timestamp("20210228", "17:61")
+    assert utils.parse_date("20210228") == datetime.date(2021, 2, 28)
+    with pytest.raises(ValueError):
+        utils.parse_date("20210229")
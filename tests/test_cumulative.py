@@ -0,0 +1,105 @@
+"""tests the cumulative meter converter"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import pvoutput
+from pvoutput.cumulative import CumulativeConverter
+
+START = datetime(2024, 6, 30, 23, 50)
+
+
+def test_daily_totals() -> None:
+    """today's totals are the difference from the first reading, and start again at midnight"""
+    converter = CumulativeConverter()
+    with pytest.raises(ValueError):
+        converter.status()
+    converter.update(START, generation=1_000_000.0, consumption=500_000.0)
+    converter.update(START + timedelta(minutes=5), generation=1_000_250.0, consumption=500_100.0)
+    status = converter.status()
+    assert (status.t, status.v1, status.v3) == ("23:55", 250.0, 100.0)
+
+    converter.update(START + timedelta(minutes=15), generation=1_000_400.0, consumption=500_130.0)
+    status = converter.status()
+    assert (status.d, status.t, status.v1, status.v3) == ("20240701", "00:05", 150.0, 30.0)
+
+
+def test_rollover_and_reset() -> None:
+    """a meter wrapping around or being replaced shouldn't lose (or make up) any energy"""
+    wrapping = CumulativeConverter(rollover=1_000_000)
+    wrapping.update(START, generation=999_900.0)
+    wrapping.update(START + timedelta(minutes=5), generation=50.0)
+    assert wrapping.status().v1 == 150.0
+    assert wrapping.c1_status()["v1"] == 1_000_050
+
+    replaced = CumulativeConverter()
+    replaced.update(START, generation=5000.0)
+    replaced.update(START + timedelta(minutes=5), generation=20.0)
+    assert replaced.status().v1 == 20.0
+    assert replaced.c1_status()["v1"] == 5020
+
+    # a new meter which had already counted a bit by its first reading
+    bigger = CumulativeConverter()
+    bigger.update(START, generation=5_000_000.0)
+    bigger.update(START + timedelta(minutes=5), generation=5000.0)
+    assert bigger.c1_status()["v1"] == 5_005_000
+
+    replaced.reset(consumption=False)
+    replaced.update(START + timedelta(minutes=6), generation=2000.0)
+    assert replaced.c1_status()["v1"] == 7020
+
+    with pytest.raises(ValueError):
+        replaced.update(START + timedelta(minutes=7), generation=-1.0)
+    with pytest.raises(ValueError):
+        replaced.update(START, generation=30.0)
+
+
+def test_jitter(caplog: pytest.LogCaptureFixture) -> None:
+    """a reading a little lower than the last one is logged and ignored, rather than taken as a wrap or a reset"""
+    wrapped = CumulativeConverter(rollover=1_000_000)
+    for minute, reading in enumerate((999_000.0, 999_500.0, 200.0, 900.0, 800.0)):
+        wrapped.update(START + timedelta(minutes=minute), generation=reading)
+    assert (wrapped.status().v1, wrapped.c1_status()["v1"]) == (1900.0, 1_000_900)
+    assert "Ignoring a meter reading of 800.0 Wh" in caplog.text
+
+    for rollover in (None, 1_000_000_000.0):
+        converter = CumulativeConverter(rollover=rollover)
+        converter.update(START, generation=5_000_010.0)
+        converter.update(START + timedelta(minutes=5), generation=5_000_009.0)
+        assert converter.status().v1 == 0.0
+        assert converter.c1_status()["v1"] == 5_000_010
+        converter.update(START + timedelta(minutes=9), generation=5_000_015.0)
+        assert converter.status().v1 == 5.0
+        assert converter.c1_status()["v1"] == 5_000_015
+
+
+def test_c1_status() -> None:
+    """the c1 flag should match which meters there are, and lifetime v3 should get past its usual limit"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: START + timedelta(minutes=10))
+    for readings, flag in (({"generation": 1.0, "consumption": 2.0}, 1), ({"generation": 1.0}, 2), ({"consumption": 2.0}, 3)):
+        converter = CumulativeConverter()
+        converter.update(START, **readings)
+        assert converter.c1_status()["c1"] == flag
+
+    converter = CumulativeConverter()
+    converter.update(START, generation=12_000_000.4, consumption=9_000_000.0)
+    assert pvo.status_payload(converter.c1_status()).fields == {"d": "20240630", "t": "23:50", "v1": 12_000_000, "v3": 9_000_000, "c1": 1}
+
+
+def test_saved_state(tmp_path: Path) -> None:
+    """a new converter on the same file carries on from the last reading"""
+    path = tmp_path / "state" / "meter.json"
+    converter = CumulativeConverter(path, rollover=1_000_000)
+    converter.update(START, generation=999_000.0)
+    converter.update(START + timedelta(minutes=5), generation=999_500.0)
+    assert [file.name for file in path.parent.iterdir()] == ["meter.json"]
+
+    restarted = CumulativeConverter(path, rollover=1_000_000)
+    assert restarted.state() == converter.state()
+    restarted.update(START + timedelta(minutes=9), generation=100.0)
+    assert (restarted.status().v1, restarted.c1_status()["v1"]) == (1100.0, 1_000_100)
+
+    path.write_text("{", encoding="utf-8")
+    assert CumulativeConverter(path).timestamp is None
@@ -0,0 +1,99 @@
+"""tests the downsampler"""
+
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+import pvoutput
+from pvoutput.downsample import Downsampler, Sample
+
+START = datetime(2024, 6, 30, 10, 0)
+
+
+def readings(seconds: int, power: float = 1000.0, step: int = 1, start: datetime = START) -> List[Sample]:
+    """a reading every step seconds at a constant power"""
+    return [(start + timedelta(seconds=offset), power, None, 20.0 + offset % 2, 240.0) for offset in range(0, seconds, step)]
+
+
+def test_constant_power() -> None:
+    """an hour at 1kW should be 12 statuses adding up to 1kWh, timestamped with the end of each period"""
+    statuses = list(Downsampler(stats_period=5).downsample(readings(3600)))
+    assert [status.t for status in statuses] == [f"{10 + minute // 60}:{minute % 60:02}" for minute in range(5, 65, 5)]
+    assert [status.v1 for status in statuses] == [round(1000 * minutes / 60) for minutes in range(5, 65, 5)]
+    assert {status.v2 for status in statuses} == {1000.0}
+    assert (statuses[0].v5, statuses[0].v6) == (20.5, 240.0)
+
+
+def test_ramp_and_peak() -> None:
+    """energy should be integrated between readings, split at the end of each period, and the peak kept"""
+    downsampler = Downsampler(stats_period=5, peak_field="v7")
+    ramp: List[Sample] = [(START + timedelta(seconds=offset), float(offset), None, None, None) for offset in range(0, 601, 60)]
+    statuses = list(downsampler.downsample(ramp))
+    # the power's the time in seconds, so the energy's t^2 / 2 watt-seconds
+    assert [(status.v1, status.v2, status.v7) for status in statuses] == [(12.0, 150.0, 240.0), (50.0, 450.0, 540.0), (50.0, 600.0, 600.0)]
+
+
+def test_gaps_and_days() -> None:
+    """energy isn't integrated across gaps, periods without readings are skipped, and the total resets at midnight"""
+    downsampler = Downsampler(stats_period=5, max_gap=60)
+    statuses = list(downsampler.downsample(readings(120) + readings(120, start=START + timedelta(minutes=30))))
+    assert [(status.t, status.v1) for status in statuses] == [("10:05", 33.0), ("10:35", 66.0)]
+
+    late = list(Downsampler(stats_period=5).downsample(readings(240, power=600.0, step=30, start=datetime(2024, 6, 30, 23, 58))))
+    assert [(status.d, status.t, status.v1) for status in late] == [("20240630", "23:59", 20.0), ("20240701", "00:05", 15.0)]
+
+
+def test_other_readings_on_the_boundary() -> None:
+    """the end of a period should be integrated even if the reading that closes it doesn't have a power value"""
+    samples: List[Sample] = sorted(
+        [(START + timedelta(seconds=30 + 60 * minute), 1000.0, None, None, None) for minute in range(15)]
+        + [(START + timedelta(minutes=minute), None, None, 20.0, None) for minute in (5, 10)]
+    )
+    statuses = list(Downsampler(stats_period=5).downsample(samples))
+    # 10:00:30 to 10:14:30 at 1kW
+    assert [status.v1 for status in statuses] == [75.0, 158.0, 233.0]
+    assert {status.v2 for status in statuses} == {1000.0}
+
+
+def test_no_power_no_status() -> None:
+    """periods with only temperature or voltage readings aren't emitted, as PVOutput wouldn't take them"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: START + timedelta(minutes=30))
+    samples: List[Sample] = [(START, 500.0, None, 20.0, None), (START + timedelta(minutes=17), None, None, 20.0, 240.0), (START + timedelta(minutes=22), 400.0, None, None, None)]
+    statuses = list(Downsampler(stats_period=5).downsample(samples))
+    assert [status.t for status in statuses] == ["10:05", "10:25"]
+    for status in statuses:
+        pvo.status_payload(status)
+
+
+def test_gaps_leave_out_v1() -> None:
+    """if the power readings are too far apart to integrate, v1's left out rather than saying nothing was generated"""
+    samples: List[Sample] = [(START + timedelta(minutes=minute), 500.0, None, None, None) for minute in range(0, 22, 7)]
+    statuses = list(Downsampler(stats_period=5).downsample(samples))
+    assert [(status.t, status.v1, status.v2) for status in statuses] == [("10:05", None, 500.0), ("10:10", None, 500.0), ("10:15", None, 500.0), ("10:25", None, 500.0)]
+
+    # once there's been some energy integrated, it's the day's total so far
+    samples.append((START + timedelta(minutes=22), 500.0, None, None, None))
+    statuses = list(Downsampler(stats_period=5).downsample(samples))
+    assert [(status.t, status.v1) for status in statuses][-1] == ("10:25", 8.0)
+
+
+def test_energy_readings() -> None:
+    """if the inverter reports the day's energy, that's used rather than integrating the power"""
+    samples: List[Sample] = [(START + timedelta(seconds=offset), 1000.0, 5000.0 + offset, None, None) for offset in range(0, 600, 10)]
+    assert [status.v1 for status in Downsampler().downsample(samples)] == [5290.0, 5590.0]
+
+
+def test_order_and_upload() -> None:
+    """readings have to be in order, and the statuses can be uploaded as they are"""
+    downsampler = Downsampler()
+    assert downsampler.add(START, power=100.0) is None
+    with pytest.raises(ValueError):
+        downsampler.add(START - timedelta(seconds=1), power=100.0)
+    status = downsampler.add(START + timedelta(minutes=5), power=100.0)
+    assert status is not None and status.v1 == 8.0
+
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: START + timedelta(minutes=6))
+    assert pvo.status_payload(status).fields == {"d": "20240630", "t": "10:05", "v1": 8, "v2": 100}
+    with pytest.raises(ValueError):
+        Downsampler(stats_period=7)
@@ -0,0 +1,65 @@
+"""tests for turning PVOutput's error responses into exceptions"""
+
+import re
+from typing import Type
+
+import pytest
+import requests_mock
+
+import pvoutput
+from pvoutput import exceptions
+
+
+@pytest.mark.parametrize(
+    "status,body,expected",
+    [
+        (400, "Bad request 400: Date is older than 14 days [20100101]", exceptions.DateTooOldError),
+        (400, "Bad request 400: Date is in the future [20990101]", exceptions.DateInFutureError),
+        (400, "Bad request 400: Invalid time format [25:00]", exceptions.InvalidDateTimeError),
+        (400, "Bad request 400: Moon Powered", exceptions.InvalidDataError),
+        (400, "Bad request 400: No status found", exceptions.NoStatusFoundError),
+        (400, "Bad request 400: Something new", exceptions.BadRequestError),
+        (401, "Unauthorized 401: Invalid API Key", exceptions.AuthenticationError),
+        (401, "Unauthorized 401: Invalid System ID", exceptions.UnauthorisedSystemError),
+        (403, "Forbidden 403: Read only key", exceptions.ReadOnlyKeyError),
+        (403, "Forbidden 403: Exceeded number requests per hour", exceptions.RateLimitedError),
+        (403, "Forbidden 403: Donation Mode", exceptions.DonationRequiredError),
+        (405, "Method Not Allowed 405: POST or GET only", exceptions.MethodNotAllowedError),
+        (503, "Service Unavailable", exceptions.ServerError),
+    ],
+)
+def test_error_from_response(status: int, body: str, expected: Type[exceptions.PVOutputError]) -> None:
+    """the documented messages should map to their exceptions"""
+    error = exceptions.error_from_response(status, body)
+    assert type(error) is expected  # pylint: disable=unidiomatic-typecheck
+    assert str(error) == f"HTTP{status}: {body}"
+    assert error.retryable == (expected in (exceptions.RateLimitedError, exceptions.ServerError))
+
+
+def test_error_compatibility() -> None:
+    """400s should still be ValueErrors, unknown statuses aren't mapped, and the rate limit headers are used"""
+    error = exceptions.error_from_response(400, "Bad request 400: Donation required for extended data")
+    assert isinstance(error, ValueError)
+    assert isinstance(error, exceptions.DonationRequired)
+    assert exceptions.error_from_response(404, "Not Found") is None
+
+    # a 401 for the system ID is an authentication error, and still an InvalidSystemError like the 400
+    unauthorised = exceptions.error_from_response(401, "Unauthorized 401: Invalid System ID")
+    assert isinstance(unauthorised, exceptions.AuthenticationError)
+    assert isinstance(unauthorised, exceptions.InvalidSystemError)
+
+    limited = exceptions.error_from_response(403, "", {"X-Rate-Limit-Remaining": "0", "X-Rate-Limit-Reset": "1600000000"})
+    assert isinstance(limited, exceptions.RateLimitedError)
+    assert limited.reset_at == 1600000000.0
+
+
+def test_client_raises_typed_errors() -> None:
+    """the client should raise the typed exception, with the response details"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1)
+    with requests_mock.mock() as mock:
+        mock.post(re.compile(".*"), text="Bad request 400: Date is older than 14 days [20100101]\n", status_code=400)
+        with pytest.raises(exceptions.DateTooOldError) as error:
+            pvo.addstatus({"t": "10:00", "v2": 1})
+    assert error.value.status == 400
+    assert error.value.body == "Bad request 400: Date is older than 14 days [20100101]"
+    assert not error.value.retryable
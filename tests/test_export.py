@@ -0,0 +1,58 @@
+"""tests for the numpy/pandas export"""
+
+import datetime
+import math
+
+import pytest
+
+from pvoutput.columnar import STATUS_LAYOUT, parse_status_columns
+from pvoutput.export import to_dataframe, to_numpy
+
+DAY_ONE = "20210228,17:30,21888,3.040,0,12,NaN,5024,420,15.2,240.1;20210228,17:25,21888,3.040,52,60,0.007,4989,470,15.4,NaN"
+DAY_TWO = "20210301,09:00,100,0.010,500,400,0.100,0,NaN,NaN,NaN,100.0"
+
+
+def test_to_numpy() -> None:
+    """should make a structured array with the timestamps and every field"""
+    numpy = pytest.importorskip("numpy")
+    result = to_numpy(parse_status_columns(DAY_ONE))
+    assert result.dtype.names == ("timestamp", "v1", "energy_efficiency", "v2", "average_power", "normalised_output", "v3", "v4", "v5", "v6")
+    assert result["timestamp"][0] == numpy.datetime64("2021-02-28T17:30:00")
+    assert list(result["v2"]) == [0.0, 52.0]
+    assert math.isnan(result["normalised_output"][0])
+
+
+def test_to_numpy_joins_days() -> None:
+    """several days should be joined, with NaN for fields only some of them have"""
+    pytest.importorskip("numpy")
+    result = to_numpy([parse_status_columns(DAY_ONE), parse_status_columns(DAY_TWO)])
+    assert len(result) == 3
+    assert result.dtype.names is not None and result.dtype.names[-1] == "v7"
+    assert math.isnan(result["v7"][0])
+    assert result["v7"][2] == 100.0
+    assert len(to_numpy([])) == 0
+
+
+def test_to_dataframe() -> None:
+    """should make a frame indexed by timestamp, from columns or a raw response"""
+    pytest.importorskip("pandas")
+    frame = to_dataframe(DAY_ONE)
+    assert list(frame.index) == [datetime.datetime(2021, 2, 28, 17, 30), datetime.datetime(2021, 2, 28, 17, 25)]
+    assert frame.index.name == "timestamp"
+    assert list(frame["v2"]) == [0.0, 52.0]
+    assert math.isnan(frame["v6"].iloc[1])
+
+    status = to_dataframe("20210228,17:30,21888,0,5024,420,15.2,240.1,0.000,1,2,3,4,5,6", layout=STATUS_LAYOUT)
+    assert list(status.columns) == list(STATUS_LAYOUT[2:])
+    assert status["v12"].iloc[0] == 6.0
+
+
+def test_missing_dependency(monkeypatch: pytest.MonkeyPatch) -> None:
+    """should say how to install what's missing"""
+
+    def no_modules(name: str) -> None:
+        raise ImportError(f"No module named '{name}'")
+
+    monkeypatch.setattr("pvoutput.export.importlib.import_module", no_modules)
+    with pytest.raises(ImportError, match=r"pip install pvoutput\[pandas\]"):
+        to_dataframe(DAY_ONE)
@@ -0,0 +1,29 @@
+"""tests that importing pvoutput doesn't import the HTTP libraries until a client needs one"""
+
+import subprocess
+import sys
+from typing import List
+
+import pytest
+
+HEAVY = ("requests", "aiohttp", "httpx")
+
+
+def loaded_after(code: str) -> List[str]:
+    """the HTTP libraries a fresh interpreter has imported after running code"""
+    check = f"{code}\nimport sys\nprint(' '.join(name for name in {HEAVY!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], check=True, capture_output=True, text=True)
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize("module", ["pvoutput", "pvoutput.asyncio", "pvoutput.multi", "pvoutput.asyncio.multi", "pvoutput.uploader", "pvoutput.spool"])
+def test_import_is_lazy(module: str) -> None:
+    """importing any of the modules shouldn't import an HTTP library"""
+    assert loaded_after(f"import {module}") == []
+
+
+def test_clients_import_their_transport() -> None:
+    """each client should import only the library it sends calls with"""
+    assert loaded_after("import pvoutput; pvoutput.PVOutput(apikey='helloworld', systemid=1)") == ["requests"]
+    code = "import asyncio, pvoutput.asyncio\nasync def main():\n    await pvoutput.asyncio.PVOutput(apikey='helloworld', systemid=1).close()\nasyncio.run(main())"
+    assert loaded_after(code) == ["aiohttp"]
@@ -71,6 +71,7 @@ async def test_configured_async_addstatus(config: Dict[str, Any]) -> None:
             session=session,
         )
         addstatus_response = await pvo.addstatus(data)
+        assert isinstance(addstatus_response, aiohttp.ClientResponse)
         assert addstatus_response.status == 200
         assert await addstatus_response.text() == "OK 200: Added Status"
 
@@ -102,6 +103,7 @@ async def test_configured_deletestatus(config: Dict[str, Any]) -> None:
         )
         delete_result = await pvo.delete_status(testdate, testtime)
         assert delete_result
+        assert isinstance(delete_result, aiohttp.ClientResponse)
         assert delete_result.status == 200
         assert await delete_result.text() == "OK 200: Deleted Status"
 
@@ -124,6 +126,7 @@ async def test_configured_addoutput(config: Dict[str, Any]) -> None:
             session=session,
         )
         addoutput_response = await pvo.addoutput(data)
+        assert isinstance(addoutput_response, aiohttp.ClientResponse)
         assert addoutput_response.status == 200
         assert await addoutput_response.text() == "OK 200: Added Output"
 
@@ -141,6 +144,7 @@ async def test_register_notification(config: Dict[str, Any]) -> None:
 
         result = await pvo.register_notification("my.application.id.async", "http://my.application.com/api/alert.php", 0)
         assert result
+        assert isinstance(result, aiohttp.ClientResponse)
         assert result.status == 200
         assert await result.text() == "OK 200: Registered Notification"
 
@@ -158,5 +162,6 @@ async def test_deregister_notification(config: Dict[str, Any]) -> None:
 
         result = await pvo.deregister_notification("my.application.id.async", 0)
         assert result
+        assert isinstance(result, aiohttp.ClientResponse)
         assert result.status == 200
         assert await result.text() == "OK 200: Deregistered Notification"
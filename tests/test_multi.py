@@ -0,0 +1,95 @@
+"""tests the multi-system client"""
+
+import re
+import threading
+import time
+from typing import Any
+
+import pytest
+import requests
+import requests_mock
+
+from pvoutput.exceptions import UnauthorisedSystemError
+from pvoutput.multi import MultiSystemPVOutput
+
+URLMATCHER = re.compile(".*")
+
+
+def test_multi_getstatus() -> None:
+    """getstatus should be called for every system, over the shared session"""
+
+    def status_for_system(request: Any, context: Any) -> str:
+        if request.headers["X-Pvoutput-SystemId"] == "3":
+            context.status_code = 401
+            return "Unauthorized 401: Invalid System ID"
+        return f"20191012,23:00,{request.headers['X-Pvoutput-SystemId']},0,15973,724,NaN,NaN,239.4"
+
+    with MultiSystemPVOutput(apikey="helloworld", systemids=[1, 2]) as multi:
+        multi.add_system(3, apikey="otherkey")
+        assert multi.client(3).apikey == "otherkey"
+        assert all(client.session is multi.session for client in multi.clients.values())
+        with requests_mock.mock() as mock:
+            mock.get(URLMATCHER, text=status_for_system)
+            results = multi.getstatus(return_exceptions=True)
+            assert list(results) == [1, 2, 3]
+            assert results[1]["v1"] == 1
+            assert results[2]["v1"] == 2
+            assert isinstance(results[3], Exception)
+
+            assert list(multi.getstatus(systemids=[2])) == [2]
+            with pytest.raises(UnauthorisedSystemError):
+                multi.getstatus()
+            with pytest.raises(KeyError):
+                multi.getstatus(systemids=[4])
+
+
+def test_multi_session_and_arguments() -> None:
+    """a session that's passed in isn't closed, and each system gets its own copy of dict arguments"""
+    session = requests.Session()
+    closed = []
+    session.close = lambda: closed.append(True)  # type: ignore[method-assign]
+    status = {"v2": 500}
+    with MultiSystemPVOutput(apikey="helloworld", systemids=[1, 2], session=session) as multi:
+        with requests_mock.mock() as mock:
+            mock.post(URLMATCHER, text="OK 200: Added Status")
+            multi.call("addstatus", status)
+            assert all("t=" in str(request.text) for request in mock.request_history)
+    assert status == {"v2": 500}
+    assert not closed
+
+
+def test_multi_concurrency_limits() -> None:
+    """calls should run concurrently, but not more than the limits allow"""
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def slow(request: Any, context: Any) -> str:
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return ""
+
+    # requests_mock.mock() serialises calls, the adapter doesn't
+    adapter = requests_mock.Adapter()
+    adapter.register_uri("POST", URLMATCHER, text=slow)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    with MultiSystemPVOutput(apikey="helloworld", systemids=range(1, 9), max_workers=3, session=session) as multi:
+        results = multi.call("addstatus", {"t": "10:00", "v2": 100})
+    assert len(results) == 8
+    assert adapter.call_count == 8
+    assert running["max"] == 3
+
+    # lots of calls for one system are held to per_system_concurrency, even with workers to spare
+    running["max"] = 0
+    with MultiSystemPVOutput(apikey="helloworld", systemids=[1], max_workers=6, per_system_concurrency=2, session=session) as multi:
+        callers = [threading.Thread(target=multi.call, args=("addstatus", {"t": "10:00", "v2": 100})) for _ in range(6)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+    assert adapter.call_count == 14
+    assert running["max"] == 2
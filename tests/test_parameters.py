@@ -6,7 +6,8 @@ from typing import Any, Dict
 import pytest
 from pvoutput import PVOutput
 from pvoutput.base import PVOutputBase
-from pvoutput.parameters import ADDSTATUS_PARAMETERS
+from pvoutput.exceptions import DonationRequired, InvalidRegexpError
+from pvoutput.parameters import ADDSTATUS_PARAMETERS, ADDSTATUS_SCHEMA, ParameterSchema, compile_parameters
 
 
 def test_addstatus_default_date() -> None:
@@ -116,3 +117,30 @@ class TestC1V3Validation:
         # Note: This would also fail format validation, but testing the maxval logic specifically
         with pytest.raises(ValueError):
             self.pvo_base.validate_data(data, ADDSTATUS_PARAMETERS)
+
+
+def test_compile_parameters_builtin_is_precompiled() -> None:
+    """the built-in parameter sets should hand back the schema compiled at import time"""
+    assert compile_parameters(ADDSTATUS_PARAMETERS) is ADDSTATUS_SCHEMA
+    assert compile_parameters(ADDSTATUS_SCHEMA) is ADDSTATUS_SCHEMA
+    # copies aren't the same object, so they get compiled on the fly
+    assert compile_parameters(copy.deepcopy(ADDSTATUS_PARAMETERS)) is not ADDSTATUS_SCHEMA
+
+
+def test_compiled_schema_matches_raw_validation() -> None:
+    """validating against the schema or the raw dict should do the same thing"""
+    pvo_base = PVOutputBase(apikey="test", systemid=123)
+    for apiset in (ADDSTATUS_PARAMETERS, ADDSTATUS_SCHEMA):
+        data: Dict[str, Any] = {"v1": 100, "t": "12:00"}
+        assert pvo_base.validate_data(data, apiset) is True
+        assert data["d"] == datetime.today().strftime("%Y%m%d")
+        with pytest.raises(ValueError, match="key v99 isn't valid in the API spec"):
+            pvo_base.validate_data({"v1": 100, "v99": 1}, apiset)
+        with pytest.raises(DonationRequired):
+            pvo_base.validate_data({"v1": 100, "v7": 1}, apiset)
+
+
+def test_compile_parameters_invalid_regexp() -> None:
+    """broken regular expressions are found when the schema is compiled"""
+    with pytest.raises(InvalidRegexpError, match="Error for key 'd' with format"):
+        ParameterSchema({"d": {"format": r"^([0-9]{8}$"}})
@@ -0,0 +1,158 @@
+"""tests the sans-IO request building and response parsing"""
+
+import datetime
+from typing import Any
+from urllib.parse import parse_qs
+
+import pytest
+import requests_mock
+
+import pvoutput
+from pvoutput import utils
+from pvoutput.retry import RetryPolicy
+from pvoutput.exceptions import DateTooOldError, ServerError
+from pvoutput.protocol import (
+    BatchStatusResult,
+    Payload,
+    Request,
+    check_response,
+    parse_addbatchstatus,
+    parse_getstatus,
+    parse_getstatus_history,
+    parse_getstatus_history_columns,
+    parse_rate_limit,
+    rows_not_added,
+)
+
+
+def test_requests() -> None:
+    """the request builders shouldn't need a network to describe a call"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, donation_made=True, clock=lambda: datetime.datetime(2024, 6, 30, 12, 7))
+    headers = {"X-Pvoutput-Apikey": "helloworld", "X-Pvoutput-SystemId": "1"}
+
+    assert pvo.getstatus_request() == Request("getstatus", "GET", utils.URLS["getstatus"][0], params={"ext": 1, "sid": 1}, headers=headers)
+    assert pvo.addstatus_request({"v2": 500}) == Request("addstatus", "POST", utils.URLS["addstatus"][0], data={"v2": 500, "t": "12:05", "d": "20240630"}, headers=headers)
+    assert pvo.check_rate_limit_request().headers == {**headers, "X-Rate-Limit": "1"}
+    today = datetime.date.today()
+    assert pvo.delete_status_request(today, datetime.time(10, 0)).data == {"d": today.strftime("%Y%m%d"), "t": "10:00"}
+    assert pvo.register_notification_request("example.app.id", "http://example.com/api/", 0).params == {"appid": "example.app.id", "type": 0, "url": "http://example.com/api/"}
+
+    history = pvo.getstatus_history_request(limit=10, ascending=True, stream=True)
+    assert (history.method, history.params, history.stream) == ("GET", {"h": 1, "limit": 10, "asc": 1, "ext": 1, "sid": 1}, True)
+
+    batches = pvo.addstatuses_requests([{"t": f"{hour:02}:00", "v2": hour} for hour in range(12)], c1=True)
+    assert len(batches) == 1
+    assert batches[0].data == {"data": ";".join(f"20240630,{hour:02}:00,,{hour}" for hour in range(12)), "c1": "1"}
+
+    with pytest.raises(ValueError):
+        pvo.addoutput_request({"d": "not a date"})
+
+
+def test_base_url() -> None:
+    """calls should go to base_url, with the trailing slash added if it's missing"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, base_url="http://localhost:8080/r2")
+    assert pvo.getstatus_request().url == "http://localhost:8080/r2/getstatus.jsp"
+    with requests_mock.mock() as mock:
+        mock.get("http://localhost:8080/r2/getstatus.jsp", text="20240630,12:00,1,2,3,4,0.5,21.5,240.1")
+        assert pvo.getstatus()["v2"] == 2.0
+
+
+def test_send() -> None:
+    """a request built up front can be sent later"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1)
+    request = pvo.addstatus_request({"v2": 500})
+    with requests_mock.mock() as mock:
+        mock.post(request.url, text="OK 200: Added Status")
+        assert pvo.send(request).text == "OK 200: Added Status"
+        assert mock.last_request.headers["X-Pvoutput-Apikey"] == "helloworld"
+
+
+def test_payloads(monkeypatch: pytest.MonkeyPatch) -> None:
+    """a payload's validated and encoded once, however many times it's sent"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: datetime.datetime(2024, 6, 30, 12, 7), retry=RetryPolicy(backoff=0, jitter=False))
+    status = {"d": "20240630", "t": "12:00", "v2": 500}
+    payload = pvo.status_payload(status)
+    assert payload == pvo.status_payload(dict(status))
+    assert dict(payload.fields) == status
+
+    # the fields are a read-only copy, so they can't drift from the body
+    status["v2"] = -99999
+    assert payload.fields["v2"] == 500
+    with pytest.raises(TypeError):
+        payload.fields["v2"] = -99999  # type: ignore[index]
+    untimed = {"v2": 500}
+    assert pvo.status_payload(untimed).fields["t"] == "12:05"
+    assert untimed == {"v2": 500}
+    # and they're only made by the builders, which validate them
+    with pytest.raises(TypeError):
+        Payload("addstatus", {"v2": -99999})
+    assert pvo.addstatus_request({"d": "20240630", "t": "12:00", "v2": 500}).body == payload.body == b"d=20240630&t=12%3A00&v2=500"
+
+    def fail(*args: Any, **kwargs: Any) -> None:
+        raise AssertionError("validated again")
+
+    monkeypatch.setattr(pvo, "validate_data", fail)
+    with requests_mock.mock() as mock:
+        mock.post(utils.URLS["addstatus"][0], [{"status_code": 503, "text": "Service Unavailable"}, {"text": "OK 200: Added Status"}])
+        pvo.addstatus(payload)
+        pvo.addstatus(payload)
+        assert mock.call_count == 3
+        assert {request.body for request in mock.request_history} == {payload.body}
+        assert mock.last_request.headers["Content-Type"] == "application/x-www-form-urlencoded"
+
+    with pytest.raises(ValueError, match="addoutput can't send a addstatus payload"):
+        pvo.addoutput_request(payload)
+
+
+def test_batch_payloads() -> None:
+    """prepared statuses can be chunked into batches without validating them again"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: datetime.datetime(2024, 6, 30, 12, 7))
+    rows = pvo.prepare_batch_statuses([{"t": f"{minute // 60:02}:{minute % 60:02}", "v2": minute} for minute in range(0, 35 * 5, 5)], c1=True)
+    payloads = pvo.batch_payloads(rows, c1=True)
+    assert [payload.fields["data"].count(";") + 1 for payload in payloads] == [30, 5]
+    assert parse_qs(payloads[1].body.decode("utf-8"))["c1"] == ["1"]
+    assert payloads == pvo.statuses_payloads([{"t": row["t"], "v2": row["v2"]} for row in rows], c1=True)
+
+
+def test_batch_results() -> None:
+    """each status in an addbatchstatus response should get a result, and the ones which weren't added picked out"""
+    results = parse_addbatchstatus("20240630,10:00,1;20240630,10:05,0\n")
+    assert results == [BatchStatusResult("20240630", "10:00", True), BatchStatusResult("20240630", "10:05", False)]
+    assert parse_addbatchstatus("") == parse_addbatchstatus("OK 200: Added Status") == []
+
+    rows = [{"d": "20240630", "t": "10:00", "v2": 1}, {"d": "20240630", "t": "10:05", "v2": 2}, {"t": "10:00", "v2": 3}, {"d": "20240630", "t": "10:10", "v2": 4}]
+    # left out of the results counts as not added, but no results at all means there's nothing to go on
+    assert [row["v2"] for row in rows_not_added(rows, results)] == [2, 4]
+    assert rows_not_added(rows, []) == []
+
+
+@pytest.mark.parametrize(
+    "status,body,expected",
+    [
+        (200, "OK 200: Added Status", None),
+        (400, "Bad request 400: Date too old [20100101]", DateTooOldError),
+        (503, "Service Unavailable", ServerError),
+        (404, "Not Found", None),
+    ],
+)
+def test_check_response(status: int, body: str, expected: Any) -> None:
+    """documented errors should raise, anything else is left to the transport"""
+    if expected is None:
+        check_response(status, body)
+    else:
+        with pytest.raises(expected):
+            check_response(status, body)
+
+
+def test_parsers() -> None:
+    """responses should parse the same whichever client got them"""
+    status = parse_getstatus("20240630,12:00,12936,1476,11911,1051,0.111,21.5,240.1")
+    assert (status["d"], status["v1"], status["v6"]) == ("20240630", 12936.0, 21.5)
+
+    body = "20240630,12:05,100,0.1,12,10,0.2,5,NaN,NaN,21.5,240.1;20240630,12:00,90,0.1,11,10,0.2,4,NaN,NaN,21.0,240.0"
+    rows = parse_getstatus_history(body)
+    columns = parse_getstatus_history_columns(body)
+    assert len(rows) == len(columns) == 2
+    assert [row["v2"] for row in rows] == list(columns.column("v2"))
+
+    assert parse_rate_limit({"X-Rate-Limit-Remaining": "59", "Content-Type": "text/plain"}) == {"X-Rate-Limit-Remaining": "59"}
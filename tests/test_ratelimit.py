@@ -0,0 +1,155 @@
+"""tests the client-side rate limiter"""
+
+import multiprocessing
+from pathlib import Path
+import re
+import sys
+from typing import List
+
+import pytest
+import requests_mock
+
+import pvoutput
+from pvoutput.exceptions import RateLimitExceeded
+from pvoutput.ratelimit import FileRateLimitStore, RateLimiter, RateLimitStore, rate_limit_key
+
+URLMATCHER = re.compile(".*")
+
+
+class FakeClock:
+    """a clock that only moves when you tell it to"""
+
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_burst_then_paced() -> None:
+    """the burst goes straight through, then calls are spread out"""
+    clock = FakeClock()
+    limiter = RateLimiter(limit=60, burst=2, clock=clock)
+    assert limiter.acquire() == 0
+    assert limiter.acquire() == 0
+    # 60 per hour is one a minute
+    assert limiter.acquire() == pytest.approx(60)
+    clock.now += 120
+    assert limiter.acquire() == 0
+
+
+def test_headers_drive_the_limit() -> None:
+    """once PVOutput says there's nothing left, wait for the reset"""
+    clock = FakeClock()
+    limiter = RateLimiter(limit=60, clock=clock)
+    limiter.update({"X-Rate-Limit-Remaining": "1", "X-Rate-Limit-Limit": "300", "X-Rate-Limit-Reset": str(clock.now + 600)})
+    assert limiter.state()["limit"] == 300
+    assert limiter.acquire() == 0
+    assert limiter.delay() == pytest.approx(600)
+    clock.now += 601
+    assert limiter.delay() == 0
+    assert limiter.state()["remaining"] is None
+
+
+def test_no_wait_raises() -> None:
+    """with wait=False, or a wait longer than max_wait, the limiter should raise"""
+    clock = FakeClock()
+    limiter = RateLimiter(limit=60, burst=1, wait=False, clock=clock)
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded) as error:
+        limiter.acquire()
+    assert error.value.retry_after == pytest.approx(60)
+
+    limiter = RateLimiter(limit=60, burst=1, max_wait=10, clock=clock)
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+
+
+def test_update_ignores_junk() -> None:
+    """invalid header values shouldn't break anything"""
+    limiter = RateLimiter()
+    limiter.update({"X-Rate-Limit-Remaining": "lots", "Content-Type": "text/plain"})
+    assert limiter.state()["remaining"] is None
+
+
+def test_client_feeds_limiter(monkeypatch: pytest.MonkeyPatch) -> None:
+    """the client should ask for the rate limit headers, and feed them to the limiter"""
+    sleeps: List[float] = []
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, rate_limiter=limiter)
+    headers = {"X-Rate-Limit-Remaining": "0", "X-Rate-Limit-Limit": "60", "X-Rate-Limit-Reset": str(clock.now + 30)}
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200, headers=headers)
+        pvo.addstatus({"t": "10:00", "v2": 1})
+        assert mock.last_request is not None
+        assert mock.last_request.headers["X-Rate-Limit"] == "1"
+        assert pvo.rate_limit == headers
+        assert limiter.state(rate_limit_key("helloworld", 1))["remaining"] == 0
+        # other systems have their own budget
+        assert limiter.state(rate_limit_key("helloworld", 2))["remaining"] is None
+
+        monkeypatch.setattr("pvoutput.time.sleep", sleeps.append)
+        pvo.addstatus({"t": "10:05", "v2": 1})
+    assert sleeps == [pytest.approx(30)]
+
+
+def test_file_store_shared_between_limiters(tmp_path: Path) -> None:
+    """two limiters (as if they were in different processes) using the same directory share one budget"""
+    clock = FakeClock()
+    first = RateLimiter(limit=60, burst=2, clock=clock, store=FileRateLimitStore(tmp_path))
+    second = RateLimiter(limit=60, burst=2, clock=clock, store=FileRateLimitStore(tmp_path))
+    key = rate_limit_key("helloworld", 1)
+    assert first.acquire(key) == 0
+    assert second.acquire(key) == 0
+    assert first.acquire(key) == pytest.approx(60)
+    second.update({"X-Rate-Limit-Remaining": "17"}, key=key)
+    assert first.state(key)["remaining"] == 17
+    assert "helloworld" not in "".join(path.read_text() + path.name for path in tmp_path.iterdir())
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs POSIX permissions and symlinks")
+def test_file_store_private(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """the state should default to a per-user directory, and not be kept anywhere other users could tamper with it"""
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    assert FileRateLimitStore().directory == tmp_path / "state" / "pvoutput" / "ratelimit"
+    assert (tmp_path / "state" / "pvoutput").stat().st_mode & 0o777 == 0o700
+
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError):
+        FileRateLimitStore(shared)
+
+    # a symlink planted where the state file goes isn't followed
+    store = FileRateLimitStore(tmp_path / "limits")
+    target = tmp_path / "target"
+    target.write_text("precious", encoding="utf-8")
+    (tmp_path / "limits" / "planted.json").symlink_to(target)
+    with pytest.raises(OSError):
+        RateLimiter(store=store).acquire("planted")
+    assert target.read_text(encoding="utf-8") == "precious"
+
+    with pytest.raises(TypeError):
+        RateLimitStore()  # type: ignore[abstract]  # pylint: disable=abstract-class-instantiated
+
+
+def _acquire_in_process(directory: str, count: int) -> None:
+    """takes tokens from a limiter in another process"""
+    limiter = RateLimiter(limit=1000, store=FileRateLimitStore(directory))
+    for _ in range(count):
+        limiter.acquire("shared")
+
+
+def test_file_store_across_processes(tmp_path: Path) -> None:
+    """tokens taken in other processes should all be counted"""
+    processes = [multiprocessing.Process(target=_acquire_in_process, args=(str(tmp_path), 50)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+    state = RateLimiter(limit=1000, store=FileRateLimitStore(tmp_path)).state("shared")
+    # the bucket refills a little while the processes run, so allow some slack
+    assert 800 <= state["tokens"] < 805
@@ -0,0 +1,109 @@
+"""tests for retrying failed calls"""
+
+import re
+from typing import List
+
+import pytest
+import requests
+import requests_mock
+
+import pvoutput
+from pvoutput.exceptions import InvalidSystemError, RateLimitedError, ServerError
+from pvoutput.retry import RetryPolicy, is_idempotent
+
+URLMATCHER = re.compile(".*")
+NOW = 1_600_000_000.0
+
+
+@pytest.fixture(name="sleeps")
+def fixture_sleeps(monkeypatch: pytest.MonkeyPatch) -> List[float]:
+    """records the sleeps instead of sleeping"""
+    sleeps: List[float] = []
+    monkeypatch.setattr("pvoutput.time.sleep", sleeps.append)
+    return sleeps
+
+
+def retrying_pvo(max_attempts: int = 4, backoff: float = 1.0, deadline: float = 300.0) -> pvoutput.PVOutput:
+    """a client with a predictable retry policy"""
+    policy = RetryPolicy(max_attempts=max_attempts, backoff=backoff, deadline=deadline, jitter=False, clock=lambda: NOW)
+    return pvoutput.PVOutput(apikey="helloworld", systemid=1, retry=policy)
+
+
+def test_is_idempotent() -> None:
+    """reads, and writes which say what they're writing, are safe to repeat"""
+    url = pvoutput.utils.URLS["addstatus"][0]
+    assert is_idempotent(pvoutput.utils.URLS["getstatus"][0], "GET")
+    assert is_idempotent(url, "POST", {"t": "10:00", "v2": 1})
+    assert not is_idempotent(url, "POST", {"v2": 1})
+    assert not is_idempotent("https://example.com/somethingelse.jsp", "POST", {"t": "10:00"})
+
+
+def test_backoff() -> None:
+    """backoff should double up to the maximum, with jitter scaling it down"""
+    policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+    assert [policy.backoff_delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+    assert RetryPolicy(backoff=4, random_func=lambda: 0.25).backoff_delay(2) == 2.0
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+def test_retries_server_errors(sleeps: List[float]) -> None:
+    """5xx and connection errors should be retried with backoff, until one works"""
+    with requests_mock.mock() as mock:
+        mock.get(
+            URLMATCHER,
+            [
+                {"status_code": 503, "text": "down"},
+                {"exc": requests.exceptions.ConnectionError},
+                {"status_code": 200, "text": "20191012,23:00,15910,0,15973,724,NaN,NaN,239.4"},
+            ],
+        )
+        assert retrying_pvo().getstatus()["v1"] == 15910
+        assert mock.call_count == 3
+        assert mock.last_request is not None
+        assert mock.last_request.headers["X-Rate-Limit"] == "1"
+    assert sleeps == [1.0, 2.0]
+
+
+def test_gives_up(sleeps: List[float]) -> None:
+    """after max_attempts, on errors that aren't transient, or if it'd go past the deadline"""
+    with requests_mock.mock() as mock:
+        mock.get(URLMATCHER, status_code=500)
+        with pytest.raises(ServerError):
+            retrying_pvo(max_attempts=3).getstatus()
+        assert mock.call_count == 3
+
+    with requests_mock.mock() as mock:
+        mock.get(URLMATCHER, status_code=400, text="Bad request 400: Invalid System ID")
+        with pytest.raises(InvalidSystemError):
+            retrying_pvo().getstatus()
+        assert mock.call_count == 1
+
+    with requests_mock.mock() as mock:
+        mock.get(URLMATCHER, status_code=500)
+        with pytest.raises(ServerError):
+            retrying_pvo(backoff=10, deadline=15).getstatus()
+        assert mock.call_count == 2
+    assert sleeps == [1.0, 2.0, 10.0]
+
+
+def test_waits_for_rate_limit_reset(sleeps: List[float]) -> None:
+    """a rate limited 403 should wait until the reset time, rather than backing off"""
+    headers = {"X-Rate-Limit-Remaining": "0", "X-Rate-Limit-Reset": str(int(NOW + 120))}
+    with requests_mock.mock() as mock:
+        mock.post(
+            URLMATCHER,
+            [
+                {"status_code": 403, "text": "Forbidden 403: Exceeded number requests per hour", "headers": headers},
+                {"status_code": 200, "text": "OK 200: Added Status"},
+            ],
+        )
+        retrying_pvo().addstatus({"t": "10:00", "v2": 1})
+        assert mock.call_count == 2
+    assert sleeps == [120.0]
+
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, status_code=403, headers=headers)
+        with pytest.raises(RateLimitedError):
+            retrying_pvo(deadline=60).addstatus({"t": "10:00", "v2": 1})
+        assert mock.call_count == 1
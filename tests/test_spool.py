@@ -0,0 +1,132 @@
+"""tests for the status spool"""
+
+from datetime import date, datetime
+from pathlib import Path
+import re
+from typing import Any, Dict
+
+import pytest
+import requests
+import requests_mock
+
+import pvoutput
+from pvoutput.spool import StatusSpool
+
+URLMATCHER = re.compile(".*")
+
+
+def good_pvo() -> pvoutput.PVOutput:
+    """returns a valid PVOutput API object"""
+    return pvoutput.PVOutput(apikey="helloworld", systemid=1)
+
+
+def test_spool_and_replay(tmp_path: Path) -> None:
+    """statuses should stay spooled while PVOutput's unreachable, then go in order, in batches"""
+    pvo = good_pvo()
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    today = date.today().strftime("%Y%m%d")
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, exc=requests.exceptions.ConnectTimeout)
+        for index in range(40):
+            assert not spool.send(pvo, {"t": f"{index // 12:02}:{(index % 12) * 5:02}", "v2": index})
+        assert spool.pending(pvo) == 40
+
+    # it survives being reopened
+    spool.close()
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        assert spool.replay(pvo) == 40
+        batches = [str(request.text) for request in mock.request_history]
+    assert [batch.count("%3B") + 1 for batch in batches] == [30, 10]
+    assert batches[0].startswith(f"data={today}%2C00%3A00%2C%2C0%3B")
+    assert spool.pending(pvo) == 0
+
+
+def test_spool_expires_old_statuses(tmp_path: Path) -> None:
+    """statuses which get too old for PVOutput to accept while they're spooled should be dropped, not sent"""
+    now = datetime(2024, 6, 1, 12, 0)
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: now)
+    # donators can go back 90 days, and each system has its own statuses
+    donator = pvoutput.PVOutput(apikey="helloworld", systemid=2, donation_made=True, clock=lambda: now)
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    spool.add(pvo, {"t": "10:00", "v2": 1})
+    spool.add(donator, {"t": "10:00", "v2": 3})
+    now = datetime(2024, 6, 20, 12, 0)
+    spool.add(pvo, {"t": "10:00", "v2": 2})
+    # and statuses that are already too old aren't spooled
+    rejected = spool.add_many(pvo, [{"d": "20240101", "t": "10:00", "v2": 4}, {"t": "10:05", "v2": 5}])
+    assert [index for index, _, _ in rejected] == [0]
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        assert spool.replay(pvo) == 2
+        assert spool.replay(donator) == 1
+
+
+def test_spool_rejected(tmp_path: Path) -> None:
+    """a batch PVOutput rejects is kept aside, and invalid statuses are never spooled"""
+    pvo = good_pvo()
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    with pytest.raises(ValueError):
+        spool.add(pvo, {"t": "10:00"})
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="Bad request 400: Invalid data", status_code=400)
+        # it's not all been sent, it's been put aside
+        assert not spool.send(pvo, {"t": "10:00", "v2": 1})
+    assert spool.pending(pvo) == 0
+    assert [error for _, error in spool.failed(pvo)] == ["HTTP400: Bad request 400: Invalid data"]
+
+
+def test_spool_not_added(tmp_path: Path) -> None:
+    """statuses PVOutput doesn't add are kept aside on their own, the rest of the batch is sent"""
+    pvo = good_pvo()
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    today = date.today().strftime("%Y%m%d")
+    for minute in range(0, 15, 5):
+        spool.add(pvo, {"t": f"10:{minute:02}", "v2": minute})
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text=f"{today},10:00,1;{today},10:05,0;{today},10:10,1", status_code=200)
+        assert spool.replay(pvo) == 2
+        # and it was sent again on its own before being given up on
+        assert mock.call_count == 2
+    assert spool.pending(pvo) == 0
+    assert [(status["t"], error) for status, error in spool.failed(pvo)] == [("10:05", f"PVOutput didn't add 1 statuses - {today} 10:05")]
+
+
+@pytest.mark.parametrize(
+    "resend",
+    [{"text": "Bad request 400: Invalid data", "status_code": 400}, {"exc": requests.exceptions.ConnectTimeout}],
+)
+def test_spool_resend_fails(tmp_path: Path, resend: Dict[str, Any]) -> None:
+    """if sending statuses again fails, the ones PVOutput already added are still taken out of the spool"""
+    pvo = good_pvo()
+    spool = StatusSpool(tmp_path / "spool.sqlite3")
+    today = date.today().strftime("%Y%m%d")
+    for minute in range(0, 9, 3):
+        spool.add(pvo, {"t": f"10:{minute:02}", "v2": minute})
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, [{"text": f"{today},10:00,1;{today},10:03,1;{today},10:06,0", "status_code": 200}, resend])
+        assert not spool.send(pvo, {"t": "10:09", "v2": 9})
+        assert mock.call_count == 2
+    if "exc" in resend:
+        # PVOutput couldn't be reached, so the rest are still waiting to be sent
+        assert spool.pending(pvo) == 2
+        assert spool.failed(pvo) == []
+    else:
+        assert spool.pending(pvo) == 0
+        assert [status["t"] for status, _ in spool.failed(pvo)] == ["10:06", "10:09"]
+
+
+def test_spool_default_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """the default database should be somewhere private to the user that survives a reboot, not the temp dir"""
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path))
+    spool = StatusSpool()
+    assert spool.path == tmp_path / "pvoutput" / "spool.sqlite3"
+    assert (tmp_path / "pvoutput").stat().st_mode & 0o077 == 0
+    spool.close()
+
+def test_spool_synchronous_mode(tmp_path: Path) -> None:
+    """only SQLite's synchronous modes should be allowed"""
+    StatusSpool(tmp_path / "normal.sqlite3", synchronous="normal").close()
+    with pytest.raises(ValueError, match="synchronous should be one of"):
+        StatusSpool(tmp_path / "spool.sqlite3", synchronous="sometimes")
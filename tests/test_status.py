@@ -0,0 +1,82 @@
+"""tests the Status record"""
+
+import datetime
+import pickle
+import sys
+import tracemalloc
+from typing import Any, Callable
+
+import pytest
+import requests_mock
+
+import pvoutput
+from pvoutput import utils
+from pvoutput.protocol import parse_getstatus, parse_getstatus_history, parse_getstatus_history_records, parse_getstatus_record
+from pvoutput.status import Status
+
+GETSTATUS = "20240630,12:00,12936,1476,11911,1051,0.111,21.5,240.1"
+GETSTATUS_EXTENDED = GETSTATUS + ",1.5,NaN,3,NaN,NaN,6"
+HISTORY = "20240630,12:05,100,0.1,12,10,0.2,5,NaN,NaN,21.5,240.1,NaN,NaN,NaN,NaN,NaN;20240630,12:00,90,0.1,11,10,0.2,4,NaN,NaN,21.0,240.0,NaN,NaN,NaN,NaN,NaN"
+
+
+@pytest.mark.parametrize("body", [GETSTATUS, GETSTATUS_EXTENDED])
+def test_to_dict(body: str) -> None:
+    """to_dict should give the same dict as the dict parsers"""
+    assert parse_getstatus_record(body).to_dict() == parse_getstatus(body)
+
+
+def test_history_to_dict() -> None:
+    """history rows should keep energy_efficiency and average_power"""
+    records = parse_getstatus_history_records(HISTORY)
+    assert [record.to_dict() for record in records] == parse_getstatus_history(HISTORY)
+    assert (records[0].energy_efficiency, records[0].average_power, records[0].v4) == (0.1, 10.0, None)
+
+
+def test_immutable() -> None:
+    """a Status can't be changed, but can be hashed and pickled"""
+    status = parse_getstatus_record(GETSTATUS_EXTENDED)
+    with pytest.raises(AttributeError):
+        setattr(status, "v2", 5)
+    with pytest.raises(AttributeError):
+        setattr(status, "foo", 5)
+    assert len({status, parse_getstatus_record(GETSTATUS_EXTENDED)}) == 1
+    assert pickle.loads(pickle.dumps(status)) == status
+
+
+def allocated_per_row(parse: Callable[[], Any], rows: int = 1000) -> float:
+    """the memory held by each of a list of parsed rows, including everything they refer to"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [parse() for _ in range(rows)]
+        return (tracemalloc.get_traced_memory()[0] - before - sys.getsizeof(kept)) / rows
+    finally:
+        tracemalloc.stop()
+
+
+def test_smaller_than_dict() -> None:
+    """the point of it - a Status should take about two thirds of the memory of a getstatus dict, and under half for history or extended rows"""
+    for body, ratio in ((GETSTATUS, 1.4), (GETSTATUS_EXTENDED, 2.0)):
+        status_size = allocated_per_row(lambda: parse_getstatus_record(body))  # pylint: disable=cell-var-from-loop
+        dict_size = allocated_per_row(lambda: parse_getstatus(body))  # pylint: disable=cell-var-from-loop
+        assert dict_size > status_size * ratio
+    history = HISTORY.split(";")[0]
+    assert allocated_per_row(lambda: parse_getstatus_history(history)[0]) > allocated_per_row(lambda: parse_getstatus_history_records(history)[0]) * 2
+
+
+def test_upload() -> None:
+    """a Status should upload the same as the dict of its fields"""
+    pvo = pvoutput.PVOutput(apikey="helloworld", systemid=1, clock=lambda: datetime.datetime(2024, 6, 30, 12, 7))
+    status = Status(datetime.datetime(2024, 6, 30, 12, 0), v1=12936.0, v2=1476.0, v5=21.5, v6=240)
+    assert status.to_wire() == {"d": "20240630", "t": "12:00", "v1": 12936, "v2": 1476, "v5": 21.5, "v6": 240.0}
+    assert isinstance(status.to_wire()["v6"], float)
+    assert pvo.addstatus_request(status).data == status.to_wire()
+    assert pvo.prepare_batch_statuses([status, {"t": "12:05", "v2": 1500}])[0] == status.to_wire()
+
+    with requests_mock.mock() as mock:
+        mock.get(utils.URLS["getstatus"][0], text=GETSTATUS)
+        mock.post(utils.URLS["addbatchstatus"][0], text="OK 200: Added Status")
+        record = pvo.getstatus_record()
+        assert record.v1 == 12936.0
+        pvo.addstatuses([record])
+        assert mock.last_request.text == "data=20240630%2C12%3A00%2C12936%2C1476%2C11911%2C1051%2C0.111%2C21.5"
@@ -0,0 +1,135 @@
+"""tests the transports against a local stand-in for PVOutput"""
+
+import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from typing import Any, Dict, Iterator, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import pvoutput
+import pvoutput.asyncio
+import pvoutput.multi
+from pvoutput.exceptions import DateTooOldError, NoStatusFoundError
+from pvoutput.transport import error_details, is_network_error
+
+httpx = pytest.importorskip("httpx")
+
+STATUS = "20240630,12:00,12936,1476,11911,1051,0.111,21.5,240.1"
+HISTORY = ";".join(f"20240630,12:{minute:02},{minute * 10},0.1,{minute},10,0.2,5,NaN,NaN,21.5,240.1" for minute in range(55, -1, -5))
+
+
+class FakePVOutput(BaseHTTPRequestHandler):
+    """answers like PVOutput does, and records what it's sent"""
+
+    protocol_version = "HTTP/1.1"
+    calls: List[Tuple[str, str, Dict[str, List[str]], Dict[str, str]]] = []
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        """keeps the test output quiet"""
+
+    def _respond(self, status: int, body: str) -> None:
+        """sends a text response"""
+        encoded = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain;charset=UTF-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.send_header("X-Rate-Limit-Remaining", "299")
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _record(self, fields: Dict[str, List[str]]) -> str:
+        """records the call, returning the endpoint"""
+        endpoint = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        self.calls.append((self.command, endpoint, fields, dict(self.headers)))
+        return endpoint
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """getstatus, with or without history"""
+        query = parse_qs(urlsplit(self.path).query)
+        endpoint = self._record(query)
+        if endpoint != "getstatus.jsp":
+            self._respond(404, "Not Found")
+        elif query.get("d") == ["20000101"]:
+            self._respond(400, "Bad request 400: No status found")
+        else:
+            self._respond(200, HISTORY if "h" in query else STATUS)
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """addstatus, which rejects the year 2000"""
+        length = int(self.headers.get("Content-Length", 0))
+        fields = parse_qs(self.rfile.read(length).decode("utf-8"))
+        self._record(fields)
+        if fields.get("d") == ["20000101"]:
+            self._respond(400, "Bad request 400: Date too old")
+        else:
+            self._respond(200, "OK 200: Added Status")
+
+
+@pytest.fixture(name="server")
+def fixture_server() -> Iterator[str]:
+    """runs the stand-in server, returning its base URL"""
+    FakePVOutput.calls = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakePVOutput)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/service/r2/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("transport", ["requests", "httpx"])
+def test_sync_transports(server: str, transport: str) -> None:
+    """both sync transports should make the same calls, and get the same answers"""
+    with pvoutput.PVOutput(apikey="helloworld", systemid=1, base_url=server, transport=transport) as pvo:
+        assert pvo.getstatus()["v1"] == 12936.0
+        assert pvo.addstatus({"v2": 500}).text == "OK 200: Added Status"
+        history = list(pvo.getstatus_history(limit=12))
+        assert [row["t"] for row in history][:2] == ["12:55", "12:50"]
+        assert len(pvo.getstatus_history_columns()) == 12
+        assert pvo.rate_limit == {"X-Rate-Limit-Remaining": "299"}
+        # it'd fail validation, so skip that to see the server's error
+        with pytest.raises(DateTooOldError):
+            pvo._call(endpoint=f"{server}addstatus.jsp", data={"d": "20000101"})  # pylint: disable=protected-access
+    method, endpoint, fields, headers = FakePVOutput.calls[1]
+    assert (method, endpoint, fields["v2"]) == ("POST", "addstatus.jsp", ["500"])
+    assert headers["X-Pvoutput-Apikey"] == "helloworld"
+
+
+@pytest.mark.asyncio
+async def test_async_httpx(server: str) -> None:
+    """the asyncio client with httpx should make the same calls, and get the same answers"""
+    pvo = pvoutput.asyncio.PVOutput(apikey="helloworld", systemid=1, base_url=server, transport="httpx")
+    try:
+        assert (await pvo.getstatus())["v1"] == 12936.0
+        response = await pvo.addstatus({"v2": 500})
+        assert isinstance(response, httpx.Response)
+        assert response.text == "OK 200: Added Status"
+        assert [row["t"] async for row in pvo.getstatus_history(limit=12)][-1] == "12:00"
+        with pytest.raises(NoStatusFoundError):
+            await pvo.getstatus_history_columns(date_val=datetime.date(2000, 1, 1))
+    finally:
+        await pvo.close()
+    assert [endpoint for _, endpoint, _, _ in FakePVOutput.calls] == ["getstatus.jsp", "addstatus.jsp", "getstatus.jsp", "getstatus.jsp"]
+
+
+def test_multi_httpx(server: str) -> None:
+    """the multi-system client should share one httpx client between the systems"""
+    with pvoutput.multi.MultiSystemPVOutput(apikey="helloworld", systemids=[1, 2, 3], transport="httpx") as multi:
+        for client in multi.clients.values():
+            client.base_url = server
+        assert {systemid: status["v1"] for systemid, status in multi.getstatus().items()} == {1: 12936.0, 2: 12936.0, 3: 12936.0}
+        assert len({id(client.session) for client in multi.clients.values()}) == 1
+    assert sorted(headers["X-Pvoutput-SystemId"] for _, _, _, headers in FakePVOutput.calls) == ["1", "2", "3"]
+
+
+def test_httpx_errors() -> None:
+    """httpx's errors should be treated like the other transports' ones"""
+    request = httpx.Request("GET", "http://127.0.0.1:1/")
+    assert is_network_error(httpx.ConnectError("refused", request=request))
+    response = httpx.Response(404, request=request, headers={"Retry-After": "5"})
+    status, headers = error_details(httpx.HTTPStatusError("not found", request=request, response=response))
+    assert (status, headers["Retry-After"]) == (404, "5")
+    with pytest.raises(ValueError, match="transport should be one of"):
+        pvoutput.PVOutput(apikey="helloworld", systemid=1, transport="urllib")
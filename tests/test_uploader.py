@@ -0,0 +1,185 @@
+"""tests the background status uploader"""
+
+import queue
+import re
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List
+from urllib.parse import parse_qs
+
+import pytest
+import requests
+import requests_mock
+
+import pvoutput
+from pvoutput.exceptions import StatusesNotAddedError
+from pvoutput.uploader import _STOP, StatusUploader
+
+URLMATCHER = re.compile(".*")
+
+
+def good_pvo() -> pvoutput.PVOutput:
+    """returns a valid PVOutput API object"""
+    return pvoutput.PVOutput(apikey="helloworld", systemid=1, donation_made=False)
+
+
+def test_uploader_flushes_on_size() -> None:
+    """a full batch should be sent without waiting for the interval"""
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        with StatusUploader(good_pvo(), max_batch_size=5, flush_interval=3600) as uploader:
+            for index in range(12):
+                uploader.put({"t": f"10:{index:02}", "v2": index})
+            assert uploader.flush(timeout=5)
+            assert [str(request.text).count("%3B") + 1 for request in mock.request_history] == [5, 5, 2]
+
+
+def test_uploader_flushes_on_interval() -> None:
+    """a partial batch should be sent once it's waited for flush_interval"""
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        uploader = StatusUploader(good_pvo(), flush_interval=0.05)
+        uploader.put({"t": "10:00", "v2": 1})
+        for _ in range(100):
+            if mock.called:
+                break
+            time.sleep(0.01)
+        assert mock.call_count == 1
+        uploader.close(timeout=5)
+        assert mock.call_count == 1
+
+
+def test_uploader_close_sends_everything() -> None:
+    """closing the uploader should send whatever's left, and stop taking statuses"""
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="", status_code=200)
+        uploader = StatusUploader(good_pvo(), flush_interval=3600)
+        uploader.put({"t": "10:00", "v2": 1})
+        uploader.close(timeout=5)
+        assert mock.call_count == 1
+        with pytest.raises(ValueError, match="StatusUploader is closed"):
+            uploader.put({"t": "10:05", "v2": 1})
+        with pytest.raises(ValueError, match="StatusUploader is closed"):
+            uploader.flush()
+
+
+def test_uploader_validates_on_put() -> None:
+    """invalid statuses should be rejected when they're queued"""
+    with StatusUploader(good_pvo()) as uploader:
+        with pytest.raises(ValueError, match=r"one of .* MUST be set"):
+            uploader.put({"t": "10:00"})
+
+
+def test_uploader_queue_full() -> None:
+    """put() shouldn't block when the queue is full"""
+    release = threading.Event()
+    uploading = threading.Event()
+
+    def slow_upload(request: Any, context: Any) -> str:
+        uploading.set()
+        release.wait(5)
+        return ""
+
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text=slow_upload, status_code=200)
+        with StatusUploader(good_pvo(), max_batch_size=1, max_queue_size=1) as uploader:
+            uploader.put({"t": "10:00", "v2": 1})
+            # the thread's now stuck uploading, so this fills the queue
+            assert uploading.wait(5)
+            uploader.put({"t": "10:05", "v2": 1})
+            with pytest.raises(queue.Full):
+                uploader.put({"t": "10:10", "v2": 1})
+            release.set()
+        assert mock.call_count == 2
+
+
+def test_uploader_on_error() -> None:
+    """failed uploads should be passed to on_error"""
+    failures: List[Any] = []
+
+    def on_error(error: Exception, batch: List[Dict[str, Any]]) -> None:
+        failures.append((error, batch))
+
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="Unauthorized 401: Invalid API Key", status_code=401)
+        with StatusUploader(good_pvo(), on_error=on_error) as uploader:
+            uploader.put({"t": "10:00", "v2": 1})
+            uploader.flush(timeout=5)
+    assert len(failures) == 1
+    assert failures[0][1][0]["v2"] == 1
+
+
+def test_uploader_on_error_raises(caplog: pytest.LogCaptureFixture) -> None:
+    """an on_error which raises shouldn't stop the background thread"""
+
+    def on_error(error: Exception, batch: List[Dict[str, Any]]) -> None:
+        raise RuntimeError("on_error broke")
+
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text="Internal Server Error", status_code=500)
+        with StatusUploader(good_pvo(), on_error=on_error) as uploader:
+            uploader.put({"t": "10:00", "v2": 1})
+            assert uploader.flush(timeout=5)
+            uploader.put({"t": "10:05", "v2": 1})
+            assert uploader.flush(timeout=5)
+        assert mock.call_count == 2
+    assert "on_error raised" in caplog.text
+
+
+def test_uploader_thread_stopped() -> None:
+    """statuses shouldn't be taken, or flushes waited for, once the background thread's stopped"""
+    uploader = StatusUploader(good_pvo())
+    uploader._queue.put(_STOP)  # pylint: disable=protected-access
+    uploader._thread.join(5)  # pylint: disable=protected-access
+    with pytest.raises(RuntimeError, match="background thread has stopped"):
+        uploader.put({"t": "10:00", "v2": 1})
+    with pytest.raises(RuntimeError, match="background thread has stopped"):
+        uploader.flush()
+
+
+def test_uploader_not_added() -> None:
+    """statuses PVOutput doesn't add should be sent again, then only those passed to on_error"""
+    failures: List[Any] = []
+
+    def on_error(error: Exception, batch: List[Dict[str, Any]]) -> None:
+        failures.append((error, batch))
+
+    def add_batch(request: Any, context: Any) -> str:
+        rows = [row.split(",")[:2] for row in parse_qs(request.text)["data"][0].split(";")]
+        return ";".join(f"{d},{t},{int(t != '10:05')}" for d, t in rows)
+
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, text=add_batch, status_code=200)
+        with StatusUploader(good_pvo(), on_error=on_error) as uploader:
+            for minute in range(0, 15, 5):
+                uploader.put({"t": f"10:{minute:02}", "v2": minute})
+            uploader.flush(timeout=5)
+        assert [str(request.text).count("%3B") + 1 for request in mock.request_history] == [3, 1]
+    assert len(failures) == 1
+    assert isinstance(failures[0][0], StatusesNotAddedError)
+    assert [row["t"] for row in failures[0][1]] == ["10:05"]
+
+
+@pytest.mark.parametrize(
+    "resend",
+    [{"text": "Bad request 400: Invalid data", "status_code": 400}, {"exc": requests.exceptions.ConnectTimeout}],
+)
+def test_uploader_resend_fails(resend: Dict[str, Any]) -> None:
+    """if sending statuses again fails, only the ones PVOutput hadn't added are passed to on_error"""
+    failures: List[Any] = []
+
+    def on_error(error: Exception, batch: List[Dict[str, Any]]) -> None:
+        failures.append((error, batch))
+
+    today = date.today().strftime("%Y%m%d")
+    with requests_mock.mock() as mock:
+        mock.post(URLMATCHER, [{"text": f"{today},10:00,1;{today},10:03,1;{today},10:06,0", "status_code": 200}, resend])
+        with StatusUploader(good_pvo(), on_error=on_error) as uploader:
+            for minute in range(0, 9, 3):
+                uploader.put({"t": f"10:{minute:02}", "v2": minute})
+            uploader.flush(timeout=5)
+        assert mock.call_count == 2
+    assert len(failures) == 1
+    assert not isinstance(failures[0][0], StatusesNotAddedError)
+    assert [row["t"] for row in failures[0][1]] == ["10:06"]